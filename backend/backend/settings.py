@@ -13,6 +13,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'django_extensions',
@@ -24,6 +25,8 @@ INSTALLED_APPS = [
 AUTH_USER_MODEL = 'cars.User'
 
 MIDDLEWARE = [
+    # Outermost: query count / DB time / Server-Timing for the whole request
+    'cars.instrumentation.RequestMetricsMiddleware',
     "corsheaders.middleware.CorsMiddleware", 
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -64,12 +67,88 @@ DATABASES = {
 }
 
 # -- Caching (required for DRF throttling to work in dev).
-# For production use a persistent cache like Redis (django-redis).
-CACHES = {
-    "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
-        "LOCATION": "unique-snowflake",
+# The car caches key on versions stored in the database, so LocMem stays
+# correct across processes, but every worker then fills (and counts hits
+# on) its own copy. Set CAR_CACHE_URL to share one between all workers:
+# redis://host:6379/0 (needs the redis package) or memcached://host:11211
+# (needs pymemcache).
+CAR_CACHE_URL = os.environ.get('CAR_CACHE_URL', '')
+if CAR_CACHE_URL.startswith(('redis://', 'rediss://')):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CAR_CACHE_URL,
+        }
     }
+elif CAR_CACHE_URL.startswith('memcached://'):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.memcached.PyMemcacheCache",
+            "LOCATION": CAR_CACHE_URL[len('memcached://'):],
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "unique-snowflake",
+        }
+    }
+
+# Car detail/list response cache. Keys are versioned and bumped on every
+# car write, so this only bounds how long superseded entries linger.
+CAR_RESPONSE_CACHE_TIMEOUT = int(os.environ.get('CAR_RESPONSE_CACHE_TIMEOUT', '3600'))
+
+# Listing totals: exact counts are cached per filter set; above this many
+# (planner-estimated) rows the estimate is returned instead. 0 = always exact.
+CAR_COUNT_ESTIMATE_THRESHOLD = int(os.environ.get('CAR_COUNT_ESTIMATE_THRESHOLD', '10000'))
+CAR_COUNT_CACHE_TIMEOUT = int(os.environ.get('CAR_COUNT_CACHE_TIMEOUT', '3600'))
+
+# ?search= backend: "fts" (tsvector + pg_trgm) or "legacy" (icontains).
+# Overridable per request with ?search_mode=.
+CAR_SEARCH_MODE = os.environ.get('CAR_SEARCH_MODE', 'fts')
+CAR_SEARCH_TRIGRAM = os.environ.get('CAR_SEARCH_TRIGRAM', '1') == '1'
+
+# Seconds between inventory version checks of the in-process autocomplete index
+CAR_SUGGEST_REFRESH_INTERVAL = float(os.environ.get('CAR_SUGGEST_REFRESH_INTERVAL', '5'))
+
+# Serve listing filters / ordering from per-worker NumPy column arrays
+# (cars.columnar; needs numpy installed), SQL for anything unsupported
+CAR_COLUMNAR_FILTERS = os.environ.get('CAR_COLUMNAR_FILTERS', '0') == '1'
+
+# Per-view SQL query budgets ({"CarListAPIView": 12}), overriding the
+# views' query_budget. Exceeding one logs a warning, or raises with
+# CAR_QUERY_BUDGET_ACTION=raise (tests).
+CAR_QUERY_BUDGETS = {}
+CAR_QUERY_BUDGET_ACTION = os.environ.get('CAR_QUERY_BUDGET_ACTION', 'log')
+
+# Dealer CSV uploads (/api/cars/import/csv/) are spooled here and queued
+# for `manage.py run_csv_imports --watch` (the csv-imports service). A
+# value above 0 also imports them in that many threads per web process,
+# which a worker recycle interrupts (the runner then takes them over).
+CAR_IMPORT_DIR = os.environ.get('CAR_IMPORT_DIR', str(BASE_DIR / 'imports'))
+CAR_IMPORT_WORKERS = int(os.environ.get('CAR_IMPORT_WORKERS', '0'))
+
+# Responsive image variants (cars/images.py): widths in px (never upscaled),
+# formats in srcset preference order, encoder processes (0 = one per CPU)
+CAR_IMAGE_WIDTHS = [int(w) for w in os.environ.get('CAR_IMAGE_WIDTHS', '320,640,1280').split(',')]
+CAR_IMAGE_FORMATS = os.environ.get('CAR_IMAGE_FORMATS', 'avif,webp,jpeg').split(',')
+CAR_IMAGE_WORKERS = int(os.environ.get('CAR_IMAGE_WORKERS', '0'))
+
+# One JSON line per request (queries, timings, cache) on the "cars.requests" logger
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'cars.requests': {
+            'handlers': ['console'],
+            'level': os.environ.get('CAR_REQUEST_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
 }
 
 AUTH_PASSWORD_VALIDATORS = []
@@ -104,6 +183,12 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # DRF settings — preserved your auth & permissions, added throttling
 REST_FRAMEWORK = {
 
+    # orjson-backed when installed (pip install orjson), same bytes as JSONRenderer
+    "DEFAULT_RENDERER_CLASSES": [
+        "cars.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+
     "DEFAULT_FILTER_BACKENDS": [
         "django_filters.rest_framework.DjangoFilterBackend",
         "rest_framework.filters.OrderingFilter",  # optional
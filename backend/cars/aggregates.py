@@ -0,0 +1,209 @@
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models import Avg, Case, Count, Max, Min, Q, Value, When
+from django.db.models.functions import Round
+from django.utils import timezone
+
+from .cache import invalidate_cars
+from .models import (
+    Car,
+    CarFeature,
+    CarHighlight,
+    CarImage,
+    CarInspectionSectionScore,
+    CarReasonToBuy,
+    InspectionItem,
+)
+
+
+# -------------------------
+# DENORMALIZED CAR COLUMNS
+# -------------------------
+# Child model -> {Car column: aggregate over that car's rows}
+AGGREGATES = {
+    CarImage: {
+        "image_count": Count("pk"),
+    },
+    CarReasonToBuy: {
+        "reason_count": Count("pk"),
+    },
+    CarHighlight: {
+        "highlight_count": Count("pk"),
+    },
+    CarFeature: {
+        "feature_flawless_count": Count("pk", filter=Q(status="flawless")),
+        "feature_little_flaw_count": Count("pk", filter=Q(status="little_flaw")),
+        "feature_damaged_count": Count("pk", filter=Q(status="damaged")),
+    },
+    CarInspectionSectionScore: {
+        "inspection_score": Round(Avg("score"), 1),
+        "min_section_score": Min("score"),
+    },
+    InspectionItem: {
+        "has_major_flaw": Max(Case(When(status="major", then=Value(1)), default=Value(0))),
+    },
+}
+
+AGGREGATE_FIELDS = [field for exprs in AGGREGATES.values() for field in exprs]
+
+_state = threading.local()
+
+
+def _clean(field_name, value):
+    field = Car._meta.get_field(field_name)
+    if value is None:
+        return field.get_default()
+    return field.to_python(value)
+
+
+def compute_car_aggregates(car_ids, models=None):
+    """{car_id: {column: value}} recomputed from the child tables (one GROUP BY per model)."""
+    models = models or list(AGGREGATES)
+    car_ids = list(car_ids)
+
+    values = {
+        car_id: {
+            field: Car._meta.get_field(field).get_default()
+            for model in models
+            for field in AGGREGATES[model]
+        }
+        for car_id in car_ids
+    }
+
+    for model in models:
+        rows = (
+            model.objects
+            .filter(car_id__in=car_ids)
+            .order_by()
+            .values("car")
+            .annotate(**AGGREGATES[model])
+        )
+        for row in rows:
+            car_id = row.pop("car")
+            values[car_id].update({field: _clean(field, value) for field, value in row.items()})
+
+    return values
+
+
+def sync_car_aggregates(car_ids=None, models=None, chunk_size=1000, write=True):
+    """
+    Recompute the aggregate columns (all cars when car_ids is None) and
+    write back the cars whose stored values differ (unless write=False).
+    Returns {column: number of cars that had drifted}.
+
+    When writing, the car rows are locked before the child rows are
+    counted: a concurrent transaction changing the same cars' children
+    waits, then counts again with this one's rows committed, so neither
+    writes back a total that misses the other's rows.
+    """
+    models = models or list(AGGREGATES)
+    fields = [field for model in models for field in AGGREGATES[model]]
+
+    if car_ids is None:
+        car_ids = Car.objects.order_by("pk").values_list("pk", flat=True)
+    car_ids = list(car_ids)
+
+    drift = Counter()
+    for start in range(0, len(car_ids), chunk_size):
+        chunk = car_ids[start:start + chunk_size]
+        with transaction.atomic():
+            cars = Car.objects.filter(pk__in=chunk).only("pk", *fields)
+            if write:
+                # In pk order, so two syncs of overlapping cars cannot deadlock
+                cars = list(cars.select_for_update().order_by("pk"))
+            computed = compute_car_aggregates(chunk, models)
+
+            changed = []
+            for car in cars:
+                dirty = False
+                for field, value in computed[car.pk].items():
+                    if getattr(car, field) != value:
+                        setattr(car, field, value)
+                        drift[field] += 1
+                        dirty = True
+                if dirty:
+                    changed.append(car)
+
+            if changed and write:
+                # bulk_update skips auto_now: stamp updated_at so readers that
+                # catch up by it (cars.columnar, the detail ETag) see the change
+                now = timezone.now()
+                for car in changed:
+                    car.updated_at = now
+                Car.objects.bulk_update(changed, [*fields, "updated_at"])
+                # Filters / ordering on these columns may now match differently
+                invalidate_cars([car.pk for car in changed])
+
+    return dict(drift)
+
+
+# -------------------------
+# MAINTENANCE
+# -------------------------
+def child_rows_changed(model, car_ids):
+    """
+    Child rows of `model` were written: recompute those cars' columns in
+    the same transaction, or collect them when inside
+    defer_car_aggregates().
+    """
+    if model not in AGGREGATES:
+        return
+
+    if getattr(_state, "depth", 0):
+        _state.pending_ids.update(car_ids)
+        _state.pending_models.add(model)
+        return
+
+    sync_car_aggregates(car_ids, [model])
+
+
+@contextmanager
+def defer_car_aggregates():
+    """
+    Collect the cars whose child rows change inside the block and
+    recompute them in bulk on exit (imports) instead of once per row.
+    Nested blocks flush with the outermost one. Nothing is recomputed
+    when the block raises: its writes roll back with the caller's
+    transaction (repair_car_aggregates fixes a failed run that had none).
+    """
+    if not getattr(_state, "depth", 0):
+        _state.pending_ids = set()
+        _state.pending_models = set()
+    _state.depth = getattr(_state, "depth", 0) + 1
+    try:
+        yield
+    finally:
+        _state.depth -= 1
+        outermost = not _state.depth
+        if outermost:
+            car_ids, models = _state.pending_ids, list(_state.pending_models)
+            _state.pending_ids, _state.pending_models = set(), set()
+
+    # Only reached on a normal exit
+    if outermost and car_ids:
+        sync_car_aggregates(car_ids, models)
+
+
+@contextmanager
+def collect_car_aggregates():
+    """
+    Defer like defer_car_aggregates() but sync nothing: the block yields
+    a list that receives (model, car_ids) for what is pending on exit, for
+    the caller to pass to child_rows_changed() (parallel import workers,
+    which may also have inherited an open deferral from a fork).
+    """
+    saved = (
+        getattr(_state, "depth", 0),
+        getattr(_state, "pending_ids", set()),
+        getattr(_state, "pending_models", set()),
+    )
+    _state.depth, _state.pending_ids, _state.pending_models = 1, set(), set()
+    collected = []
+    try:
+        yield collected
+    finally:
+        collected.extend((model, list(_state.pending_ids)) for model in _state.pending_models)
+        _state.depth, _state.pending_ids, _state.pending_models = saved
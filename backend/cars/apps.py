@@ -3,3 +3,7 @@ from django.apps import AppConfig
 class CarsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "cars"
+
+    def ready(self):
+        from .signals import connect_signals
+        connect_signals()
@@ -0,0 +1,189 @@
+import hashlib
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.utils import timezone
+from rest_framework.response import Response
+
+from .instrumentation import record_cache
+from .models import CacheVersion
+from .utils import on_commit_once
+
+
+# -------------------------
+# VERSIONS
+# -------------------------
+# Read from the database rather than CACHES, so every process (each web
+# worker, import_all_data, the upload runner) keys its caches on the same
+# values and a write anywhere makes them stale everywhere:
+# car      -> Car.updated_at (touched whenever the car, one of its child
+#             rows or the master data it renders changes, cars/conditional.py)
+#             and CarDocument.updated_at (rebuilt after it)
+# catalog  -> the "catalog" CacheVersion, bumped on any car or master write
+CATALOG_VERSION = "catalog"
+
+_state = threading.local()
+
+
+def car_version(updated_at, document_updated_at):
+    """Detail cache version of a car from its two timestamps."""
+    return "{}.{}".format(
+        updated_at.isoformat() if updated_at else "-",
+        document_updated_at.isoformat() if document_updated_at else "-",
+    )
+
+
+def catalog_state():
+    """(version, time of the last bump) of the catalog, one row read."""
+    return (
+        CacheVersion.objects
+        .filter(name=CATALOG_VERSION)
+        .values_list("version", "updated_at")
+        .first()
+    ) or (0, None)
+
+
+def catalog_version():
+    return catalog_state()[0]
+
+
+def _bump(name):
+    now = timezone.now()
+    if not CacheVersion.objects.filter(name=name).update(version=F("version") + 1, updated_at=now):
+        CacheVersion.objects.bulk_create([CacheVersion(name=name, version=1, updated_at=now)], ignore_conflicts=True)
+
+
+def bump_catalog_version():
+    """Bump the catalog version now (after a post-commit write readers depend on)."""
+    _bump(CATALOG_VERSION)
+
+
+# -------------------------
+# INVALIDATION
+# -------------------------
+def _flush_pending():
+    pending = getattr(_state, "pending", False)
+    _state.pending = False
+    if pending:
+        bump_catalog_version()
+
+
+def invalidate_cars(car_ids):
+    """
+    Bump the catalog version once the current transaction commits, so no
+    reader can re-cache pre-commit data under the new version. The cars'
+    own versions move with their updated_at (touch_cars).
+    """
+    if car_ids:
+        _state.pending = True
+        on_commit_once(_flush_pending)
+
+
+def invalidate_catalog():
+    """Dealer / category / inspection master change: every key goes stale."""
+    _state.pending = True
+    on_commit_once(_flush_pending)
+
+
+# -------------------------
+# HIT / MISS COUNTERS
+# -------------------------
+STATS_KEY = "cars:cache-stats:{}:{}"
+
+
+def cache_is_shared():
+    """False for per-process backends (LocMem, dummy): caches and counters are per worker."""
+    backend = settings.CACHES["default"]["BACKEND"]
+    return not backend.endswith(("LocMemCache", "DummyCache"))
+
+
+def record_cache_event(name, event):
+    record_cache(event)
+    key = STATS_KEY.format(name, event)
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+def get_cache_stats(names=("detail", "list")):
+    keys = [STATS_KEY.format(name, event) for name in names for event in ("hit", "miss")]
+    values = cache.get_many(keys)
+
+    stats = {}
+    for name in names:
+        hits = values.get(STATS_KEY.format(name, "hit"), 0)
+        misses = values.get(STATS_KEY.format(name, "miss"), 0)
+        total = hits + misses
+        stats[name] = {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / total, 4) if total else None,
+        }
+    # Counted by this worker only unless CACHES is shared (CAR_CACHE_URL)
+    stats["scope"] = "shared" if cache_is_shared() else "process"
+    return stats
+
+
+# -------------------------
+# RESPONSE CACHE
+# -------------------------
+def normalize_query_params(query_params, ignore=(), only=None):
+    """
+    Order-independent representation of a query string: sorted keys,
+    stripped values, empty values dropped. `only` restricts it to a set
+    of keys (e.g. the CarFilter params).
+    """
+    items = []
+    for key in sorted(query_params.keys()):
+        if key in ignore or (only is not None and key not in only):
+            continue
+        for value in query_params.getlist(key):
+            value = value.strip()
+            if value:
+                items.append((key, value))
+    return tuple(items)
+
+
+def response_cache_key(name, version, request):
+    # Scheme + host are part of the key: pagination links and file URLs are absolute
+    raw = repr((
+        request.scheme,
+        request.get_host(),
+        request.path,
+        normalize_query_params(request.query_params),
+    ))
+    digest = hashlib.sha1(raw.encode("utf-8")).hexdigest()
+    return f"cars:response:{name}:{version}:{digest}"
+
+
+class VersionedResponseCacheMixin:
+    """
+    Cache successful GET responses under a key made of the view's data
+    version and the normalized request. Writes move the version in the
+    database (see VERSIONS), so stale entries are never read again and
+    simply expire, whichever process wrote. Adds an `X-Cache: HIT|MISS` header.
+    """
+    response_cache_name = None
+
+    def get_response_cache_version(self):
+        raise NotImplementedError
+
+    def get(self, request, *args, **kwargs):
+        name = self.response_cache_name
+        key = response_cache_key(name, self.get_response_cache_version(), request)
+
+        data = cache.get(key)
+        if data is not None:
+            record_cache_event(name, "hit")
+            return Response(data, headers={"X-Cache": "HIT"})
+
+        record_cache_event(name, "miss")
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, settings.CAR_RESPONSE_CACHE_TIMEOUT)
+        response["X-Cache"] = "MISS"
+        return response
@@ -0,0 +1,516 @@
+"""
+Optional in-process columnar filter engine for the car listing.
+
+Every worker keeps the filterable Car columns as NumPy arrays (numbers,
+categorical codes, boolean flag sets for tags / features / inspection
+rows). CarFilter params are evaluated as vectorized masks, the ordering
+with argsort, and only the requested page's ids are loaded through the
+ORM. Anything it cannot express (search, specs, JSON metadata, ...) and
+any request made while it lags behind the catalog version falls back to
+SQL. Enabled with CAR_COLUMNAR_FILTERS=1 when numpy is installed.
+"""
+import copy
+import threading
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.utils import timezone
+from django_filters.constants import EMPTY_VALUES
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+from .cache import catalog_version
+from .models import (
+    Car,
+    CarFeature,
+    CarInspectionSectionScore,
+    CarInspectionSubSectionRemarks,
+)
+
+
+NUMERIC_COLUMNS = [
+    "price",
+    "discount_price",
+    "year",
+    "km",
+    "seats",
+    "owner_count",
+    "image_count",
+    "reason_count",
+    "highlight_count",
+    "feature_flawless_count",
+    "feature_little_flaw_count",
+    "feature_damaged_count",
+    "inspection_score",
+    "min_section_score",
+]
+
+# Engine column -> Car lookup
+CATEGORICAL_COLUMNS = {
+    "car_code": "car_code",
+    "brand": "brand",
+    "model": "model",
+    "fuel": "fuel",
+    "transmission": "transmission",
+    "body": "body",
+    "city": "city",
+    "rto": "rto",
+    "colorKey": "colorKey",
+    "availability_status": "availability_status",
+    "insurance_type": "insurance_type",
+    "dealer_id": "dealer_id",
+    "dealer_tier": "dealer__tier",
+    "dealer_city": "dealer__city",
+    "dealer_code": "dealer__dealer_code",
+}
+
+# Flag set -> (child model, value lookup); one boolean array per value
+FLAG_SETS = {
+    "feature": (CarFeature, "name"),
+    "feature_category": (CarFeature, "category__key"),
+    "feature_status": (CarFeature, "status"),
+    "rating": (CarInspectionSectionScore, "rating"),
+    "subsection_status": (CarInspectionSubSectionRemarks, "status"),
+}
+
+OTHER_COLUMNS = [
+    "id",
+    "created_at",
+    "updated_at",
+    "insurance_valid_till",
+    "thumbnail",
+    "has_major_flaw",
+    "tags",
+]
+
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+# updated_at is set in Python before commit: re-read a margin so rows
+# committed late by long transactions are not missed
+REFRESH_OVERLAP = timedelta(minutes=1)
+
+
+def _micros(value):
+    return (value - EPOCH) // timedelta(microseconds=1) if value is not None else 0
+
+
+# -------------------------
+# COLUMN STORE
+# -------------------------
+class CarColumns:
+    """
+    Column arrays for every car, row i <-> self.ids[i]. Updated in place
+    from the rows changed since the last refresh; deleted cars are only
+    marked dead, a full rebuild compacts them away.
+    """
+
+    def __init__(self):
+        self.ids = []
+        self.rows = {}  # car id -> row
+        self.alive = np.zeros(0, dtype=bool)
+        self.numeric = {name: np.zeros(0) for name in NUMERIC_COLUMNS}
+        self.numeric["max_section_score"] = np.zeros(0)
+        self.numeric["insurance_valid_till"] = np.zeros(0)
+        self.created_at = np.zeros(0, dtype=np.int64)
+        self.updated_at = np.zeros(0, dtype=np.int64)
+        self.has_thumbnail = np.zeros(0, dtype=bool)
+        self.has_major_flaw = np.zeros(0, dtype=bool)
+        self.codes = {name: np.zeros(0, dtype=np.int32) for name in CATEGORICAL_COLUMNS}
+        self.vocab = {name: {} for name in CATEGORICAL_COLUMNS}
+        self.flags = {name: {} for name in [*FLAG_SETS, "tag"]}
+
+        self.version = None
+        self.max_updated_at = None
+
+    def __len__(self):
+        return int(self.alive.sum())
+
+    def clone(self):
+        """Copy to refresh while requests keep reading this one."""
+        other = copy.copy(self)
+        other.ids = list(self.ids)
+        other.rows = dict(self.rows)
+        other.alive = self.alive.copy()
+        other.numeric = {name: array.copy() for name, array in self.numeric.items()}
+        other.created_at = self.created_at.copy()
+        other.updated_at = self.updated_at.copy()
+        other.has_thumbnail = self.has_thumbnail.copy()
+        other.has_major_flaw = self.has_major_flaw.copy()
+        other.codes = {name: array.copy() for name, array in self.codes.items()}
+        other.vocab = {name: dict(vocab) for name, vocab in self.vocab.items()}
+        other.flags = {
+            name: {value: array.copy() for value, array in flags.items()}
+            for name, flags in self.flags.items()
+        }
+        return other
+
+    # ---- loading ----
+    def _grow(self, extra):
+        def pad(array, fill):
+            return np.concatenate([array, np.full(extra, fill, dtype=array.dtype)])
+
+        self.alive = pad(self.alive, False)
+        for name, array in self.numeric.items():
+            self.numeric[name] = pad(array, np.nan)
+        self.created_at = pad(self.created_at, 0)
+        self.updated_at = pad(self.updated_at, 0)
+        self.has_thumbnail = pad(self.has_thumbnail, False)
+        self.has_major_flaw = pad(self.has_major_flaw, False)
+        for name, array in self.codes.items():
+            self.codes[name] = pad(array, -1)
+        for flag_set in self.flags.values():
+            for value, array in flag_set.items():
+                flag_set[value] = pad(array, False)
+
+    def _code(self, column, value):
+        if value in (None, ""):
+            return -1
+        vocab = self.vocab[column]
+        if value not in vocab:
+            vocab[value] = len(vocab)
+        return vocab[value]
+
+    def _set_flag(self, flag_set, value, row):
+        flags = self.flags[flag_set]
+        if value not in flags:
+            flags[value] = np.zeros(len(self.ids), dtype=bool)
+        flags[value][row] = True
+
+    def apply(self, car_rows):
+        """Insert / overwrite rows (dicts from Car.objects.values())."""
+        car_rows = list(car_rows)
+        new = [row for row in car_rows if row["id"] not in self.rows]
+        for row in new:
+            self.rows[row["id"]] = len(self.ids)
+            self.ids.append(row["id"])
+        if new:
+            self._grow(len(new))
+
+        changed = []
+        for data in car_rows:
+            row = self.rows[data["id"]]
+            changed.append(row)
+            self.alive[row] = True
+            for name in NUMERIC_COLUMNS:
+                value = data[name]
+                self.numeric[name][row] = np.nan if value is None else float(value)
+            valid_till = data["insurance_valid_till"]
+            self.numeric["insurance_valid_till"][row] = (
+                np.nan if valid_till is None else valid_till.toordinal()
+            )
+            self.created_at[row] = _micros(data["created_at"])
+            self.updated_at[row] = _micros(data["updated_at"])
+            self.has_thumbnail[row] = data["thumbnail"] is not None
+            self.has_major_flaw[row] = data["has_major_flaw"]
+            for name, lookup in CATEGORICAL_COLUMNS.items():
+                value = data[lookup]
+                self.codes[name][row] = self._code(name, str(value) if value is not None else None)
+
+            for flags in self.flags.values():
+                for array in flags.values():
+                    array[row] = False
+            for tag in data["tags"] or []:
+                if isinstance(tag, str):
+                    self._set_flag("tag", tag, row)
+
+            if self.max_updated_at is None or data["updated_at"] > self.max_updated_at:
+                self.max_updated_at = data["updated_at"]
+
+        self._load_children([self.ids[row] for row in changed], changed)
+
+    def _load_children(self, car_ids, rows):
+        self.numeric["max_section_score"][rows] = np.nan
+        for start in range(0, len(car_ids), 5000):
+            chunk = car_ids[start:start + 5000]
+            for flag_set, (model, lookup) in FLAG_SETS.items():
+                pairs = model.objects.filter(car_id__in=chunk).values_list("car_id", lookup).distinct()
+                for car_id, value in pairs:
+                    if flag_set == "feature":
+                        value = value.upper()  # has_features is case-insensitive
+                    self._set_flag(flag_set, value, self.rows[car_id])
+
+            scores = CarInspectionSectionScore.objects.filter(car_id__in=chunk).values_list("car_id", "score")
+            column = self.numeric["max_section_score"]
+            for car_id, score in scores:
+                row = self.rows[car_id]
+                column[row] = float(score) if np.isnan(column[row]) else max(column[row], float(score))
+
+    def remove(self, car_ids):
+        for car_id in car_ids:
+            row = self.rows.get(car_id)
+            if row is not None:
+                self.alive[row] = False
+
+    # ---- evaluation helpers ----
+    def isin(self, column, values):
+        codes = [self.vocab[column][v] for v in values if v in self.vocab[column]]
+        return np.isin(self.codes[column], codes)
+
+    def flag(self, flag_set, value):
+        array = self.flags[flag_set].get(value)
+        return array if array is not None else np.zeros(len(self.ids), dtype=bool)
+
+    def compare(self, column, op, value):
+        array = self.numeric[column]
+        with np.errstate(invalid="ignore"):
+            return op(array, float(value))  # NaN (NULL) never matches
+
+    def sort_key(self, field):
+        """Ascending key with NULLs last (as Postgres does)."""
+        if field in ("created_at", "updated_at"):
+            return getattr(self, field).astype(float)
+        array = self.numeric[field]
+        return np.where(np.isnan(array), np.inf, array)
+
+
+# -------------------------
+# FILTERS
+# -------------------------
+def _ge(a, b):
+    return a >= b
+
+
+def _le(a, b):
+    return a <= b
+
+
+def _eq(a, b):
+    return a == b
+
+
+def _lt(a, b):
+    return a < b
+
+
+def _split(value):
+    return value.split(",")
+
+
+def _bool_filter(mask_fn):
+    """BooleanFilter methods that are a no-op for False."""
+    return lambda cols, value: mask_fn(cols) if value else None
+
+
+def _date_ordinal(days=0):
+    return (timezone.now().date() + timedelta(days=days)).toordinal()
+
+
+# CarFilter param -> mask(columns, cleaned value); None means "no-op"
+FILTERS = {
+    "price_min": lambda c, v: c.compare("price", _ge, v),
+    "price_max": lambda c, v: c.compare("price", _le, v),
+    "exact_price": lambda c, v: c.compare("price", _eq, v),
+    "has_discount": _bool_filter(lambda c: ~np.isnan(c.numeric["discount_price"])),
+    "discount_price_min": lambda c, v: c.compare("discount_price", _ge, v),
+    "discount_price_max": lambda c, v: c.compare("discount_price", _le, v),
+    "car_code": lambda c, v: c.isin("car_code", _split(v)),
+    "brand": lambda c, v: c.isin("brand", _split(v)),
+    "model": lambda c, v: c.isin("model", _split(v)),
+    "year_min": lambda c, v: c.compare("year", _ge, v),
+    "year_max": lambda c, v: c.compare("year", _le, v),
+    "km_min": lambda c, v: c.compare("km", _ge, v),
+    "km_max": lambda c, v: c.compare("km", _le, v),
+    "fuel": lambda c, v: c.isin("fuel", _split(v)),
+    "transmission": lambda c, v: c.isin("transmission", _split(v)),
+    "body": lambda c, v: c.isin("body", _split(v)),
+    "seats_min": lambda c, v: c.compare("seats", _ge, v),
+    "seats_exact": lambda c, v: c.compare("seats", _eq, v),
+    "color": lambda c, v: c.isin("colorKey", _split(v)),
+    "city": lambda c, v: c.isin("city", _split(v)),
+    "rto": lambda c, v: c.isin("rto", _split(v)),
+    "owner_count": lambda c, v: c.compare("owner_count", _eq, v),
+    "owner_count_lte": lambda c, v: c.compare("owner_count", _le, v),
+    "first_owner_only": _bool_filter(lambda c: c.compare("owner_count", _eq, 1)),
+    "insurance_type": lambda c, v: c.isin("insurance_type", _split(v)),
+    "insurance_valid": _bool_filter(
+        lambda c: c.compare("insurance_valid_till", _ge, _date_ordinal())
+    ),
+    "insurance_expired": _bool_filter(
+        lambda c: c.compare("insurance_valid_till", _lt, _date_ordinal())
+    ),
+    "insurance_expiring_within_days": lambda c, v: (
+        c.compare("insurance_valid_till", _ge, _date_ordinal())
+        & c.compare("insurance_valid_till", _le, _date_ordinal(float(v)))
+    ),
+    "availability_status": lambda c, v: c.isin("availability_status", _split(v)),
+    "dealer_id": lambda c, v: c.isin("dealer_id", [str(v)]),
+    "dealer_tier": lambda c, v: c.isin("dealer_tier", _split(v)),
+    "dealer_city": lambda c, v: c.isin("dealer_city", _split(v)),
+    "dealer_code": lambda c, v: c.isin("dealer_code", _split(v)),
+    "has_thumbnail": lambda c, v: c.has_thumbnail if v else ~c.has_thumbnail,
+    "image_count_min": lambda c, v: c.compare("image_count", _ge, v),
+    "reason_count_min": lambda c, v: c.compare("reason_count", _ge, v),
+    "highlight_count_min": lambda c, v: c.compare("highlight_count", _ge, v),
+    "has_features": lambda c, v: np.logical_and.reduce(
+        [c.flag("feature", name.upper()) for name in _split(v)]
+    ),
+    "feature_status": lambda c, v: c.flag("feature_status", v),
+    "feature_category": lambda c, v: np.logical_or.reduce(
+        [c.flag("feature_category", key) for key in _split(v)]
+    ),
+    "flawless_features_min": lambda c, v: c.compare("feature_flawless_count", _ge, v),
+    "little_flaw_features_max": lambda c, v: c.compare("feature_little_flaw_count", _le, v),
+    "damaged_features_max": lambda c, v: c.compare("feature_damaged_count", _le, v),
+    "inspection_score_min": lambda c, v: c.compare("max_section_score", _ge, v),
+    "overall_score_min": lambda c, v: c.compare("inspection_score", _ge, v),
+    "min_section_score": lambda c, v: c.compare("min_section_score", _ge, v),
+    "inspection_rating": lambda c, v: np.logical_or.reduce(
+        [c.flag("rating", rating) for rating in _split(v)]
+    ),
+    "inspection_subsection_status": lambda c, v: np.logical_or.reduce(
+        [c.flag("subsection_status", status) for status in _split(v)]
+    ),
+    "has_major_flaws": lambda c, v: c.has_major_flaw if v else ~c.has_major_flaw,
+    "tags_any": lambda c, v: np.logical_or.reduce([c.flag("tag", tag) for tag in _split(v)]),
+    "tags_all": lambda c, v: np.logical_and.reduce([c.flag("tag", tag) for tag in _split(v)]),
+    "listed_last_n_days": lambda c, v: (
+        c.created_at >= _micros(timezone.now() - timedelta(days=float(v)))
+    ),
+    # only read by ?search=, which is not supported here
+    "search_mode": lambda c, v: None,
+}
+
+SORT_FIELDS = set(NUMERIC_COLUMNS) | {"created_at"}
+
+
+class ColumnarResult:
+    """
+    Ordered ids of the matching cars. Slicing (what the paginator does)
+    loads just those rows through `queryset`, in order.
+    """
+
+    def __init__(self, ids, queryset):
+        self.ids = ids
+        self.queryset = queryset
+
+    def __len__(self):
+        return len(self.ids)
+
+    def count(self):
+        return len(self.ids)
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        ids = self.ids[key]
+        cars = self.queryset.in_bulk(ids)
+        return [cars[car_id] for car_id in ids if car_id in cars]
+
+
+def evaluate(columns, cleaned_data, ordering, queryset):
+    """
+    ColumnarResult for the cleaned CarFilter params and OrderingFilter
+    ordering, or None when a param / ordering is not supported.
+    """
+    mask = columns.alive.copy()
+    for name, value in cleaned_data.items():
+        if value in EMPTY_VALUES:
+            continue
+        if name not in FILTERS:
+            return None
+        condition = FILTERS[name](columns, value)
+        if condition is not None:
+            mask &= condition
+
+    keys = []
+    for term in ordering:
+        field = term.lstrip("-")
+        if field not in SORT_FIELDS:
+            return None
+        key = columns.sort_key(field)
+        # Descending: negate; NULLs (inf) then sort first, as in Postgres
+        keys.append(-key if term.startswith("-") else key)
+
+    rows = np.flatnonzero(mask)
+    if keys:
+        # lexsort: last key is the primary one
+        rows = rows[np.lexsort([key[rows] for key in reversed(keys)])]
+
+    return ColumnarResult([columns.ids[row] for row in rows], queryset)
+
+
+# -------------------------
+# PER-PROCESS ENGINE
+# -------------------------
+_lock = threading.Lock()
+_state = {
+    "columns": None,
+    "rebuilding": False,
+}
+
+
+def _car_rows(queryset):
+    lookups = ["id", *NUMERIC_COLUMNS, *OTHER_COLUMNS[1:], *CATEGORICAL_COLUMNS.values()]
+    return queryset.order_by().values(*lookups).iterator(chunk_size=5000)
+
+
+def build_columns():
+    columns = CarColumns()
+    version = catalog_version()
+    columns.apply(_car_rows(Car.objects.all()))
+    columns.version = version
+    return columns
+
+
+def refresh_columns(columns):
+    """
+    Catch up with the catalog: re-read the cars whose updated_at moved
+    (child / dealer writes bump it too) and drop deleted ones. Rebuilds
+    from scratch when rows went missing in a way updated_at can't show.
+    """
+    version = catalog_version()
+    columns = columns.clone()
+    changed = Car.objects.all()
+    if columns.max_updated_at is not None:
+        changed = changed.filter(updated_at__gte=columns.max_updated_at - REFRESH_OVERLAP)
+    columns.apply(_car_rows(changed))
+
+    if Car.objects.count() != len(columns):
+        live = set(Car.objects.values_list("pk", flat=True))
+        columns.remove([car_id for car_id in columns.ids if car_id not in live])
+    columns.version = version
+    return columns
+
+
+def _refresh():
+    try:
+        columns = _state["columns"]
+        if columns is None or len(columns.ids) > 2 * max(len(columns), 1):
+            columns = build_columns()  # first load, or compact deleted rows
+        else:
+            columns = refresh_columns(columns)
+        with _lock:
+            _state["columns"] = columns
+    except DatabaseError:
+        pass
+    finally:
+        _state["rebuilding"] = False
+        connections.close_all()
+
+
+def get_columns():
+    """
+    The worker's column store when it is current with the catalog
+    version (read from the database, so imports and writes in other
+    processes count), else None (caller uses SQL) while a background
+    refresh runs. The first call starts the initial load.
+    """
+    if np is None or not settings.CAR_COLUMNAR_FILTERS:
+        return None
+
+    columns = _state["columns"]
+    if columns is not None and columns.version == catalog_version():
+        return columns
+
+    with _lock:
+        start = not _state["rebuilding"]
+        _state["rebuilding"] = True
+    if start:
+        threading.Thread(target=_refresh, daemon=True).start()
+    return None
+
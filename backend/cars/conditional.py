@@ -0,0 +1,99 @@
+import hashlib
+import threading
+
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .cache import bump_catalog_version
+from .models import Car
+from .utils import on_commit_once
+
+
+_state = threading.local()
+
+
+# -------------------------
+# Car.updated_at TRACKING
+# -------------------------
+def _flush_pending():
+    car_ids = getattr(_state, "car_ids", None) or set()
+    touch_all = getattr(_state, "touch_all", False)
+    _state.car_ids = set()
+    _state.touch_all = False
+
+    # queryset.update() sends no signals, so this never loops back
+    if touch_all:
+        Car.objects.update(updated_at=timezone.now())
+    elif car_ids:
+        Car.objects.filter(pk__in=car_ids).update(updated_at=timezone.now())
+    else:
+        return
+    # The catalog version may have been bumped by an earlier on-commit
+    # callback: move it again so readers that catch up by updated_at
+    # (cars.columnar) never settle on a version older than these touches
+    bump_catalog_version()
+
+
+def touch_cars(car_ids):
+    """
+    Bump Car.updated_at for these cars once the current transaction
+    commits (child row / dealer changed). One UPDATE per transaction.
+    """
+    pending = getattr(_state, "car_ids", None)
+    if pending is None:
+        pending = _state.car_ids = set()
+
+    pending.update(car_ids)
+    on_commit_once(_flush_pending)
+
+
+def touch_all_cars():
+    """Master data rendered in every car changed."""
+    _state.touch_all = True
+    on_commit_once(_flush_pending)
+
+
+# -------------------------
+# CONDITIONAL GET
+# -------------------------
+def make_etag(*parts):
+    return quote_etag(hashlib.sha1(repr(parts).encode("utf-8")).hexdigest())
+
+
+class ConditionalGetMixin:
+    """
+    ETag / Last-Modified validators computed from Car.updated_at before
+    anything is serialized. Matching If-None-Match / If-Modified-Since
+    requests get a 304 straight away.
+
+    get_conditional_validators() returns (etag_parts, last_modified) or
+    None to skip (e.g. unknown object, handled by the normal 404 path).
+    """
+
+    def get_conditional_validators(self):
+        raise NotImplementedError
+
+    def get(self, request, *args, **kwargs):
+        validators = self.get_conditional_validators()
+        if validators is None:
+            return super().get(request, *args, **kwargs)
+
+        etag_parts, last_modified = validators
+        # The same data renders differently per host (absolute URLs) and format
+        etag = make_etag(
+            request.get_host(),
+            request.accepted_renderer.format,
+            *etag_parts,
+        )
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+
+        if response.status_code in (200, 304):
+            response["ETag"] = etag
+            if timestamp is not None:
+                response["Last-Modified"] = http_date(timestamp)
+        return response
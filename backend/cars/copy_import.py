@@ -0,0 +1,743 @@
+"""
+COPY-based loader for the importer CSV layout (import_all_data --loader copy).
+
+Every CSV file is streamed with COPY FROM STDIN into a temporary (so
+unlogged, session-private) staging table of text columns. Foreign keys
+are then resolved with joins and the rows upserted with one
+INSERT ... SELECT ... ON CONFLICT per table, all in one transaction.
+Rows pass through Python only as csv module reads / writes (to number
+them); the Python-literal JSON columns (tags / metadata) are converted
+once per distinct value. Postgres only.
+"""
+import ast
+import csv
+import io
+import json
+import time
+from functools import lru_cache
+from itertools import islice
+from pathlib import Path
+
+from django.db import connection, models, transaction
+
+from .aggregates import defer_car_aggregates
+from .importer import BATCH_SIZE, StepResult, forget_imports, has_unique_constraint, rows_written
+from .models import (
+    Car,
+    CarFeature,
+    CarHighlight,
+    CarImage,
+    CarImageCategory,
+    CarInspectionSectionScore,
+    CarInspectionSubSectionRemarks,
+    CarReasonToBuy,
+    CarSpec,
+    Dealer,
+    FeatureCategory,
+    InspectionItem,
+    InspectionSection,
+    InspectionSubSection,
+    SpecCategory,
+)
+from .signals import CAR_CHILD_MODELS
+
+
+# -------------------------
+# SQL EXPRESSIONS OVER THE STAGED ROW `s`
+# -------------------------
+# Each mirrors the parsing in the matching scripts/import_*.py
+def _quote(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def col(name):
+    return f's."{name}"'
+
+
+def text(name, default=""):
+    """r.get(name, default)"""
+    return f"coalesce({col(name)}, {_quote(default)})"
+
+
+def stripped(name, default=""):
+    """r.get(name, default).strip()"""
+    return f"trim({text(name, default)})"
+
+
+def number(name, cast, default=None):
+    """cast(r[name]) if r.get(name) else default"""
+    value = f"nullif(trim({col(name)}), '')"
+    if default is not None:
+        value = f"coalesce({value}, {_quote(default)})"
+    return f"{value}::{cast}"
+
+
+def iso_date(name):
+    """parse_date(): YYYY-MM-DD or NULL"""
+    return f"CASE WHEN trim({col(name)}) ~ '^[0-9]{{4}}-[0-9]{{2}}-[0-9]{{2}}$' THEN trim({col(name)})::date END"
+
+
+def literal(name, default):
+    """ast.literal_eval(r.get(name) or default), staged as JSON text"""
+    return f"coalesce({col(name)}, {_quote(default)})::jsonb"
+
+
+def titled(name, fallback):
+    """(r.get(name) or fallback).strip().title()"""
+    return f"initcap(trim(coalesce(nullif({col(name)}, ''), {col(fallback)})))"
+
+
+class CopyTable:
+    """
+    One CSV file -> one model.
+
+    `columns` maps model attnames to SQL over the staged row `s` and the
+    `joins` aliases; joins are (alias, model, model field, staged column)
+    and rows whose key does not resolve are reported, like the rows
+    missing a `required` column. `literals` are the Python-literal
+    columns converted to JSON while staging ({column: default}), and
+    `categories` (model, staged key column, {field: SQL}) the category
+    rows created before the joins. Upserts follow ImportStep:
+    `unique` + `update` (insert-only when update is empty, last row
+    wins otherwise), plain inserts when unique is None, and the rows of
+    each `replace_by` value (a car's images) replaced together.
+    """
+
+    def __init__(
+        self,
+        filename,
+        model,
+        headers,
+        columns,
+        required=(),
+        joins=(),
+        unique=None,
+        update=(),
+        categories=(),
+        literals=None,
+        optional=False,
+        replace_by=None,
+    ):
+        self.filename = filename
+        self.model = model
+        self.headers = headers
+        self.columns = columns
+        self.required = required
+        self.joins = joins
+        self.unique = unique
+        self.update = list(update)
+        self.categories = categories
+        self.literals = literals or {}
+        self.optional = optional
+        self.replace_by = replace_by
+
+        if self.update:
+            self.update += [
+                field.attname for field in model._meta.concrete_fields
+                if getattr(field, "auto_now", False) and field.attname not in self.update
+            ]
+
+    @property
+    def name(self):
+        return self.filename.removesuffix(".csv").replace("_", " ")
+
+
+def _car_join():
+    return ("c", Car, "car_code", "car_code")
+
+
+COPY_TABLES = [
+    CopyTable(
+        "dealers.csv", Dealer,
+        headers=["dealer_code", "name", "phone", "email", "address", "city", "state", "postal_code", "tier", "tags"],
+        columns={
+            "dealer_code": stripped("dealer_code"),
+            "name": col("name"),
+            "phone": text("phone"),
+            "email": text("email"),
+            "address": text("address"),
+            "city": text("city"),
+            "state": text("state"),
+            "postal_code": text("postal_code"),
+            "tier": text("tier", "standard"),
+            "tags": literal("tags", "[]"),
+        },
+        required=["dealer_code"],
+        unique=["dealer_code"],
+        literals={"tags": "[]"},
+    ),
+    CopyTable(
+        "cars.csv", Car,
+        headers=[
+            "car_code", "dealer_code", "availability_status", "insurance_valid_till", "insurance_type",
+            "owner_count", "title", "brand", "model", "year", "price", "discount_price", "emi", "km",
+            "fuel", "transmission", "body", "seats", "city", "rto", "colorKey", "registration_number",
+            "tags", "metadata",
+        ],
+        columns={
+            "car_code": stripped("car_code"),
+            "dealer_id": "d.id",
+            "title": col("title"),
+            "brand": text("brand"),
+            "model": text("model"),
+            "year": number("year", "integer"),
+            "price": number("price", "numeric", 0),
+            "discount_price": number("discount_price", "numeric"),
+            "emi": stripped("emi"),
+            "km": number("km", "integer"),
+            "owner_count": number("owner_count", "integer", 1),
+            "availability_status": text("availability_status", "available"),
+            "insurance_type": text("insurance_type"),
+            "insurance_valid_till": iso_date("insurance_valid_till"),
+            "fuel": text("fuel"),
+            "transmission": text("transmission"),
+            "body": text("body"),
+            "seats": number("seats", "integer"),
+            "city": text("city"),
+            "rto": text("rto"),
+            "colorKey": text("colorKey"),
+            "registration_number": text("registration_number"),
+            "tags": literal("tags", "[]"),
+            "metadata": literal("metadata", "{}"),
+        },
+        required=["car_code"],
+        joins=[("d", Dealer, "dealer_code", "dealer_code")],
+        unique=["car_code"],
+        update=[
+            "dealer_id", "title", "brand", "model", "year", "price", "discount_price", "emi",
+            "km", "owner_count", "availability_status", "insurance_type", "insurance_valid_till",
+            "fuel", "transmission", "body", "seats", "city", "rto", "colorKey",
+            "registration_number", "tags", "metadata",
+        ],
+        literals={"tags": "[]", "metadata": "{}"},
+    ),
+    CopyTable(
+        "car_images.csv", CarImage,
+        headers=["car_code", "category_key", "category_label", "image", "caption", "sort_order"],
+        columns={
+            "car_id": "c.id",
+            "category_id": "cat.id",
+            "image": stripped("image"),
+            "caption": text("caption"),
+            "sort_order": number("sort_order", "integer", 0),
+        },
+        required=["car_code", "category_key", "image"],
+        joins=[_car_join(), ("cat", CarImageCategory, "key", "category_key")],
+        replace_by="car_id",
+        categories=[
+            (CarImageCategory, "category_key", {
+                "label": f"coalesce(nullif({col('category_label')}, ''), {stripped('category_key')})",
+            }),
+        ],
+    ),
+    CopyTable(
+        "car_highlights.csv", CarHighlight,
+        headers=["car_code", "text"],
+        columns={"car_id": "c.id", "text": stripped("text")},
+        required=["car_code", "text"],
+        joins=[_car_join()],
+        unique=["car_id", "text"],
+    ),
+    CopyTable(
+        "car_specs.csv", CarSpec,
+        headers=["car_code", "category_key", "category_title", "label", "value"],
+        columns={
+            "car_id": "c.id",
+            "category_id": "cat.id",
+            "label": stripped("label"),
+            "value": stripped("value"),
+        },
+        required=["car_code", "category_key", "label"],
+        joins=[_car_join(), ("cat", SpecCategory, "key", "category_key")],
+        unique=["car_id", "category_id", "label"],
+        update=["value"],
+        categories=[(SpecCategory, "category_key", {"title": titled("category_title", "category_key")})],
+    ),
+    CopyTable(
+        "car_features.csv", CarFeature,
+        headers=["car_code", "category_key", "category_title", "name", "status"],
+        columns={
+            "car_id": "c.id",
+            "category_id": "cat.id",
+            "name": stripped("name"),
+            "status": f"trim(coalesce(nullif({col('status')}, ''), 'flawless'))",
+        },
+        required=["car_code", "category_key", "name"],
+        joins=[_car_join(), ("cat", FeatureCategory, "key", "category_key")],
+        unique=["car_id", "category_id", "name"],
+        update=["status"],
+        categories=[(FeatureCategory, "category_key", {"title": titled("category_title", "category_key")})],
+    ),
+    CopyTable(
+        "car_reasons.csv", CarReasonToBuy,
+        headers=["car_code", "title", "description", "sort_order"],
+        columns={
+            "car_id": "c.id",
+            "title": stripped("title"),
+            "description": stripped("description"),
+            "sort_order": number("sort_order", "integer", 0),
+        },
+        required=["car_code", "title"],
+        joins=[_car_join()],
+        unique=["car_id", "title"],
+        update=["description", "sort_order"],
+    ),
+    CopyTable(
+        "inspection_sections.csv", InspectionSection,
+        headers=["key", "title", "description"],
+        columns={"key": stripped("key"), "title": col("title"), "description": text("description")},
+        required=["key"],
+        unique=["key"],
+        update=["title", "description"],
+    ),
+    CopyTable(
+        "inspection_subsections.csv", InspectionSubSection,
+        headers=["section_key", "key", "title", "order", "remarks"],
+        columns={
+            "section_id": "sec.id",
+            "key": stripped("key"),
+            "title": col("title"),
+            "order": number("order", "integer", 0),
+            "remarks": text("remarks"),
+        },
+        required=["section_key", "key"],
+        joins=[("sec", InspectionSection, "key", "section_key")],
+        unique=["section_id", "key"],
+        update=["title", "order", "remarks"],
+    ),
+    CopyTable(
+        "inspection_items.csv", InspectionItem,
+        headers=["car_code", "section_key", "subsection_key", "name", "status", "remarks"],
+        columns={
+            "car_id": "c.id",
+            "subsection_id": "sub.id",
+            "name": stripped("name"),
+            "status": text("status", "pending"),
+            "remarks": text("remarks"),
+        },
+        required=["car_code", "subsection_key", "name"],
+        joins=[_car_join(), ("sub", InspectionSubSection, "key", "subsection_key")],
+        unique=["car_id", "subsection_id", "name"],
+        update=["status", "remarks"],
+    ),
+    CopyTable(
+        "car_inspection_scores.csv", CarInspectionSectionScore,
+        headers=["car_code", "section_key", "score", "rating", "status", "remarks"],
+        columns={
+            "car_id": "c.id",
+            "section_id": "sec.id",
+            "score": number("score", "numeric"),
+            "rating": f"lower(trim({col('rating')}))",
+            "status": stripped("status"),
+            "remarks": stripped("remarks"),
+        },
+        required=["car_code", "section_key", "score", "rating"],
+        joins=[_car_join(), ("sec", InspectionSection, "key", "section_key")],
+        unique=["car_id", "section_id"],
+        update=["score", "rating", "status", "remarks"],
+    ),
+    CopyTable(
+        "car_subsection_remarks.csv", CarInspectionSubSectionRemarks,
+        headers=["car_code", "subsection_key", "status", "remarks"],
+        columns={
+            "car_id": "c.id",
+            "subsection_id": "sub.id",
+            "status": stripped("status"),
+            "remarks": stripped("remarks"),
+        },
+        required=["car_code", "subsection_key"],
+        joins=[_car_join(), ("sub", InspectionSubSection, "key", "subsection_key")],
+        unique=["car_id", "subsection_id"],
+        update=["status", "remarks"],
+        optional=True,
+    ),
+]
+
+
+# -------------------------
+# STAGING
+# -------------------------
+@lru_cache(maxsize=4096)
+def literal_json(value):
+    """JSON text of a Python-literal cell ("['SUV','Premium']"), once per distinct value."""
+    return json.dumps(ast.literal_eval(value))
+
+
+def _copy(cursor, sql, f):
+    raw = cursor.cursor
+    if hasattr(raw, "copy_expert"):  # psycopg2
+        raw.copy_expert(sql, f)
+    else:  # psycopg 3
+        with raw.copy(sql) as copy:
+            while data := f.read(1 << 16):
+                copy.write(data)
+
+
+class _RowStream:
+    """Readable file of the CSV text of `rows`, generated as COPY reads it."""
+
+    def __init__(self, rows):
+        self._rows = iter(rows)
+        self._buffer = ""
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            chunk = io.StringIO()
+            csv.writer(chunk).writerows(islice(self._rows, 1000))
+            if not chunk.tell():
+                break
+            self._buffer += chunk.getvalue()
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+def _staged_rows(table, reader, headers, errors):
+    """
+    Numbered rows as csv.DictReader sees them (blank lines skipped, short
+    rows padded), the literal columns converted to JSON.
+    """
+    width = len(headers)
+    literals = {headers.index(name): default for name, default in table.literals.items() if name in headers}
+    for number, row in enumerate(filter(None, reader), start=1):
+        row = row[:width] + [""] * (width - len(row))
+        try:
+            for index, default in literals.items():
+                row[index] = literal_json(row[index] or default)
+        except (ValueError, SyntaxError) as e:
+            errors.append((number, f"invalid {headers[index]}: {e}"))
+            continue
+        yield [number, *row]
+
+
+def stage(cursor, table, csv_path, errors):
+    """COPY the CSV file into a new staging table; (table name, CSV rows)."""
+    stage_table = f"import_stage_{table.model._meta.model_name}"
+
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        headers = next(reader, [])
+        # Columns the file lacks stay NULL (the r.get() defaults apply)
+        columns = headers + [name for name in table.headers if name not in headers]
+        cursor.execute(
+            f"CREATE TEMPORARY TABLE {stage_table} (_row bigint, "
+            + ", ".join(f'"{name}" text' for name in columns)
+            + ") ON COMMIT DROP"
+        )
+        column_list = ", ".join(f'"{name}"' for name in headers)
+        _copy(
+            cursor,
+            # Empty cells are empty strings, as csv.DictReader reads them
+            f"COPY {stage_table} (_row, {column_list}) FROM STDIN "
+            f"WITH (FORMAT csv, FORCE_NOT_NULL ({column_list}))",
+            _RowStream(_staged_rows(table, reader, headers, errors)),
+        )
+
+    # Temporary tables are never auto-analyzed; the joins below need estimates
+    cursor.execute(f"ANALYZE {stage_table}")
+    cursor.execute(f"SELECT count(*) FROM {stage_table}")
+    return stage_table, cursor.fetchone()[0] + len(errors)
+
+
+# -------------------------
+# UPSERT
+# -------------------------
+def _column(model, attname):
+    return model._meta.get_field(attname).column
+
+
+def _joins(table, kind="JOIN"):
+    return " ".join(
+        f'{kind} {model._meta.db_table} {alias} ON {alias}."{_column(model, field)}" = trim({col(column)})'
+        for alias, model, field, column in table.joins
+    )
+
+
+def _length_limits(table):
+    """(attname, SQL, max_length) of the CharField columns."""
+    for attname, sql in table.columns.items():
+        field = table.model._meta.get_field(attname)
+        if isinstance(field, models.CharField) and field.max_length and not field.is_relation:
+            yield attname, sql, field.max_length
+
+
+def _insert_columns(table):
+    """[(column, SQL, params)] for every column an INSERT needs."""
+    columns = []
+    for field in table.model._meta.concrete_fields:
+        if field.attname in table.columns:
+            columns.append((field.column, table.columns[field.attname], []))
+        elif isinstance(field, (models.AutoField, models.BigAutoField, models.SmallAutoField)):
+            continue
+        elif field.primary_key and isinstance(field, models.UUIDField):
+            columns.append((field.column, "gen_random_uuid()", []))
+        elif getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False):
+            columns.append((field.column, "now()", []))
+        else:
+            # Typed, since the value passes through the SELECT subquery
+            value = field.get_db_prep_save(field.get_default(), connection)
+            columns.append((field.column, f"%s::{field.db_type(connection)}", [value]))
+    return columns
+
+
+def _resolved(table, stage_table):
+    """SELECT of the valid staged rows as model columns (deduplicated on the unique key)."""
+    columns = _insert_columns(table)
+    select = ", ".join(f'{sql} AS "{column}"' for column, sql, _ in columns)
+    params = [param for _, _, column_params in columns for param in column_params]
+
+    conditions = [f"coalesce(trim({col(name)}), '') <> ''" for name in table.required]
+    conditions += [f"length({sql}) <= {limit}" for _, sql, limit in _length_limits(table)]
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    if table.unique is None:
+        if table.replace_by:
+            select += ", s._row"  # file order within a group
+        return f"SELECT {select} FROM {stage_table} s {_joins(table)} {where}", params, columns
+
+    key = ", ".join(table.columns[attname] for attname in table.unique)
+    # Last row wins when upserting (update_or_create), the first when insert-only
+    order = "DESC" if table.update else "ASC"
+    sql = (
+        f"SELECT DISTINCT ON ({key}) {select} FROM {stage_table} s {_joins(table)} {where} "
+        f"ORDER BY {key}, s._row {order}"
+    )
+    return sql, params, columns
+
+
+def _differs(columns, old, new):
+    """SQL: the rows `old` and `new` differ in any of the columns."""
+    return (
+        "(" + ", ".join(f'{old}."{column}"' for column in columns) + ") IS DISTINCT FROM ("
+        + ", ".join(f'{new}."{column}"' for column in columns) + ")"
+    )
+
+
+def _auto_now(model, attname):
+    return getattr(model._meta.get_field(attname), "auto_now", False)
+
+
+def upsert(cursor, table, stage_table, result, full=False):
+    """
+    Write the staged rows (only those that differ from the stored ones
+    unless `full`) and count them into `result`; ids of the cars written.
+    """
+    if table.replace_by:
+        return replace_groups(cursor, table, stage_table, result, full)
+    model = table.model
+    db_table = model._meta.db_table
+    resolved, params, columns = _resolved(table, stage_table)
+
+    names = ", ".join(f'"{column}"' for column, _, _ in columns)
+    values = ", ".join(f'v."{column}"' for column, _, _ in columns)
+    if model is Car:
+        returning = "id"
+    elif model in CAR_CHILD_MODELS:
+        returning = "car_id"
+    else:
+        returning = model._meta.pk.column
+
+    key_columns = [_column(model, attname) for attname in table.unique or ()]
+    updates = [_column(model, attname) for attname in table.update]
+    # Unchanged rows are not rewritten (auto_now columns always differ)
+    compared = [_column(model, attname) for attname in table.update if not _auto_now(model, attname)]
+    statements = []
+    if table.unique is None:
+        statements.append((f"INSERT INTO {db_table} ({names}) SELECT {values} FROM ({resolved}) v RETURNING {returning}, true", params))
+    elif has_unique_constraint(model, table.unique):
+        action = "DO NOTHING"
+        if updates:
+            action = "DO UPDATE SET " + ", ".join(f'"{column}" = EXCLUDED."{column}"' for column in updates)
+            if compared and not full:
+                action += f" WHERE {_differs(compared, 't', 'EXCLUDED')}"
+        conflict = ", ".join(f'"{column}"' for column in key_columns)
+        statements.append((
+            f"INSERT INTO {db_table} AS t ({names}) SELECT {values} FROM ({resolved}) v "
+            # xmax is 0 for a newly inserted row version
+            f"ON CONFLICT ({conflict}) {action} RETURNING t.{returning}, t.xmax = 0",
+            params,
+        ))
+    else:
+        # No constraint to conflict on: update the matching rows, insert the rest
+        match = " AND ".join(f't."{column}" = v."{column}"' for column in key_columns)
+        if updates:
+            changed = f" AND {_differs(compared, 't', 'v')}" if compared and not full else ""
+            statements.append((
+                f"UPDATE {db_table} t SET " + ", ".join(f'"{column}" = v."{column}"' for column in updates)
+                + f" FROM ({resolved}) v WHERE {match}{changed} RETURNING t.{returning}, false",
+                params,
+            ))
+        statements.append((
+            f"INSERT INTO {db_table} ({names}) SELECT {values} FROM ({resolved}) v "
+            f"WHERE NOT EXISTS (SELECT 1 FROM {db_table} t WHERE {match}) RETURNING {returning}, true",
+            params,
+        ))
+
+    car_ids = set()
+    for sql, statement_params in statements:
+        cursor.execute(sql, statement_params)
+        for object_id, inserted in cursor.fetchall():
+            if inserted:
+                result.inserted += 1
+            else:
+                result.updated += 1
+            car_ids.add(object_id)
+
+    cursor.execute(f"SELECT count(*) FROM ({resolved}) v", params)
+    result.unchanged += cursor.fetchone()[0] - result.written
+    return car_ids if model is Car or model in CAR_CHILD_MODELS else set()
+
+
+def replace_groups(cursor, table, stage_table, result, full=False):
+    """
+    Replace all rows of every `replace_by` group (a car's images) whose
+    staged rows differ from the stored ones (all groups if `full`).
+    """
+    model = table.model
+    db_table = model._meta.db_table
+    resolved, params, columns = _resolved(table, stage_table)
+    group = _column(model, table.replace_by)
+    pk = model._meta.pk.column
+    names = ", ".join(f'"{column}"' for column, _, _ in columns)
+    values = ", ".join(f'v."{column}"' for column, _, _ in columns)
+
+    def rows(alias):
+        # As text: the staged expressions are not typed like the table columns
+        fields = ", ".join(f'{alias}."{column}"' for column, _, _ in columns if column != group)
+        return f"ROW({fields})::text"
+
+    groups = f"{stage_table}_groups"
+    cursor.execute(
+        f"CREATE TEMP TABLE {groups} ON COMMIT DROP AS "
+        f"WITH v AS ({resolved}), "
+        f'new AS (SELECT v."{group}" AS grp, array_agg({rows("v")} ORDER BY v._row) AS rows FROM v GROUP BY 1), '
+        f'old AS (SELECT t."{group}" AS grp, array_agg({rows("t")} ORDER BY t."{pk}") AS rows FROM {db_table} t '
+        f'WHERE t."{group}" IN (SELECT grp FROM new) GROUP BY 1) '
+        f"SELECT new.grp, coalesce(cardinality(old.rows), 0) AS old_count, cardinality(new.rows) AS new_count, "
+        f"{'false' if full else 'old.rows IS NOT DISTINCT FROM new.rows'} AS same "
+        f"FROM new LEFT JOIN old USING (grp)",
+        params,
+    )
+    cursor.execute(f'DELETE FROM {db_table} t USING {groups} g WHERE t."{group}" = g.grp AND NOT g.same')
+    cursor.execute(
+        f"INSERT INTO {db_table} ({names}) SELECT {values} FROM ({resolved}) v "
+        f'JOIN {groups} g ON g.grp = v."{group}" AND NOT g.same ORDER BY v._row RETURNING "{group}"',
+        params,
+    )
+    car_ids = {row[0] for row in cursor.fetchall()}
+    cursor.execute(
+        "SELECT coalesce(sum(least(old_count, new_count)) FILTER (WHERE NOT same), 0), "
+        "coalesce(sum(greatest(new_count - old_count, 0)) FILTER (WHERE NOT same), 0), "
+        "coalesce(sum(greatest(old_count - new_count, 0)) FILTER (WHERE NOT same), 0), "
+        f"coalesce(sum(new_count) FILTER (WHERE same), 0) FROM {groups}"
+    )
+    updated, inserted, deleted, unchanged = cursor.fetchone()
+    result.updated += updated
+    result.inserted += inserted
+    result.deleted += deleted
+    result.unchanged += unchanged
+    return car_ids
+
+
+def delete_missing(cursor, table, stage_table, result):
+    """Delete the rows (replace_by: groups) that are not among the valid staged rows."""
+    model = table.model
+    resolved, params, _ = _resolved(table, stage_table)
+    if table.replace_by:
+        field = table.replace_by
+        column = _column(model, field)
+        match = f'v."{column}" = t."{column}"'
+    elif table.unique:
+        field = "pk"
+        column = model._meta.pk.column
+        match = " AND ".join(f'v."{_column(model, attname)}" = t."{_column(model, attname)}"' for attname in table.unique)
+    else:
+        return
+    cursor.execute(
+        f'SELECT DISTINCT t."{column}" FROM {model._meta.db_table} t '
+        f"WHERE NOT EXISTS (SELECT 1 FROM ({resolved}) v WHERE {match})",
+        params,
+    )
+    missing = [row[0] for row in cursor.fetchall()]
+    for start in range(0, len(missing), BATCH_SIZE):
+        # Cascades, and the delete signals keep the cars in sync
+        _, deleted = model.objects.filter(**{f"{field}__in": missing[start:start + BATCH_SIZE]}).delete()
+        result.deleted += deleted.get(model._meta.label, 0)
+
+
+def create_categories(cursor, table, stage_table):
+    for model, column, fields in table.categories:
+        key = f"trim({col(column)})"
+        names = ", ".join(['"key"', *(f'"{_column(model, name)}"' for name in fields)])
+        cursor.execute(
+            f"INSERT INTO {model._meta.db_table} ({names}) "
+            f"SELECT DISTINCT ON ({key}) {key}, {', '.join(fields.values())} FROM {stage_table} s "
+            f"WHERE {key} <> '' ORDER BY {key}, s._row ON CONFLICT (key) DO NOTHING"
+        )
+
+
+def invalid_rows(cursor, table, stage_table):
+    """[(row number, message)] for the staged rows the upsert skipped."""
+    cases = [f"WHEN coalesce(trim({col(name)}), '') = '' THEN 'missing {name}'" for name in table.required]
+    cases += [
+        f"WHEN {alias}.{model._meta.pk.column} IS NULL THEN '{model.__name__} not found: ' || trim({col(column)})"
+        for alias, model, _, column in table.joins
+    ]
+    cases += [
+        f"WHEN length({sql}) > {limit} THEN '{attname} longer than {limit} characters'"
+        for attname, sql, limit in _length_limits(table)
+    ]
+    if not cases:
+        return []
+    cursor.execute(
+        f"SELECT _row, message FROM (SELECT s._row, CASE {' '.join(cases)} END AS message "
+        f"FROM {stage_table} s {_joins(table, 'LEFT JOIN')}) e WHERE message IS NOT NULL ORDER BY _row"
+    )
+    return cursor.fetchall()
+
+
+# -------------------------
+# LOAD
+# -------------------------
+def load_table(cursor, table, csv_path, full=False, delete=False):
+    result = StepResult(table.name)
+    start = time.monotonic()
+    if not csv_path.exists():
+        if not table.optional:
+            raise FileNotFoundError(csv_path)
+        print(f"⚠️  CSV file not found: {csv_path} (optional, skipped)")
+        return result
+
+    stage_table, result.rows = stage(cursor, table, csv_path, result.errors)
+    create_categories(cursor, table, stage_table)
+    car_ids = upsert(cursor, table, stage_table, result, full)
+    result.errors = sorted(result.errors + invalid_rows(cursor, table, stage_table))
+    if result.written or result.deleted:
+        rows_written(table.model, car_ids)
+    if delete:
+        if result.errors:
+            print(f"⚠️  {table.name}: {len(result.errors)} invalid rows, nothing deleted")
+        else:
+            delete_missing(cursor, table, stage_table, result)
+
+    result.seconds = time.monotonic() - start
+    result.report()
+    return result
+
+
+def load(csv_dir, full=False, delete_missing=False):
+    """
+    Stage and upsert every CSV file of the importer layout in `csv_dir`,
+    in one transaction (aggregate columns included). Rows equal to the
+    stored ones are left alone unless `full`; `delete_missing` deletes
+    the rows that are not in the files. StepResults in import order.
+    """
+    csv_dir = Path(csv_dir)
+    with transaction.atomic(), defer_car_aggregates(), connection.cursor() as cursor:
+        # The ORM importers' row digests no longer describe these tables
+        forget_imports([table.model for table in COPY_TABLES])
+        return [
+            load_table(cursor, table, csv_dir / table.filename, full, delete_missing)
+            for table in COPY_TABLES
+        ]
@@ -0,0 +1,65 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+from .cache import catalog_version, normalize_query_params
+from .filters import CarFilter
+
+
+# -------------------------
+# LISTING COUNTS
+# -------------------------
+def filter_params_key(query_params):
+    """Cache key part for the CarFilter params only (page, ordering... ignored)."""
+    params = normalize_query_params(query_params, only=CarFilter.base_filters)
+    return hashlib.sha1(repr(params).encode("utf-8")).hexdigest()
+
+
+def estimate_count(queryset):
+    """
+    Postgres planner row estimate for the queryset (EXPLAIN, nothing is
+    executed). None on other databases.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+        plan = cursor.fetchone()[0]
+
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def count_cars(queryset, query_params):
+    """
+    (count, exact) for a filtered listing queryset.
+
+    Counts are cached per normalized CarFilter param set and catalog
+    version (bumped on every car write). Above
+    CAR_COUNT_ESTIMATE_THRESHOLD the planner estimate is used instead of
+    running COUNT(DISTINCT ...) over the joins.
+    """
+    key = f"cars:count:{catalog_version()}:{filter_params_key(query_params)}"
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    result = None
+    threshold = settings.CAR_COUNT_ESTIMATE_THRESHOLD
+    if threshold:
+        estimate = estimate_count(queryset)
+        if estimate is not None and estimate >= threshold:
+            result = (estimate, False)
+
+    if result is None:
+        result = (queryset.count(), True)
+
+    cache.set(key, result, settings.CAR_COUNT_CACHE_TIMEOUT)
+    return result
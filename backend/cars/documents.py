@@ -0,0 +1,174 @@
+import json
+import threading
+from contextlib import contextmanager
+
+from django.db.models import F, Q
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import Car, CarDocument
+from .inspection_tree import load_inspection_sections
+from .instrumentation import timer
+from .serializers import CarDetailSerializer, car_image_srcsets
+from .utils import on_commit_once
+
+
+# Everything CarDetailSerializer reads, fetched once per chunk of cars
+DOCUMENT_PREFETCHES = [
+    "images__category",
+    "highlights",
+    "reasons_to_buy",
+    "specs__category",
+    "features__category",
+    "inspection_section_scores",
+    "inspection_subsection_remarks",
+    "inspection_items",
+]
+
+_state = threading.local()
+
+
+# -------------------------
+# RENDER / REBUILD
+# -------------------------
+def render_car_documents(cars, sections=None):
+    """
+    {car_id: rendered JSON text} for already-prefetched cars.
+    Rendered without a request, so file fields hold relative URLs.
+    """
+    cars = list(cars)
+    context = {
+        "inspection_sections": sections if sections is not None else load_inspection_sections(),
+        "image_srcsets": car_image_srcsets(cars),
+    }
+    with timer("serialize"):
+        return {
+            car.id: json.dumps(
+                CarDetailSerializer(car, context=context).data,
+                cls=JSONEncoder,
+                ensure_ascii=False,
+            )
+            for car in cars
+        }
+
+
+def rebuild_car_documents(car_ids=None, chunk_size=200):
+    """
+    Re-render and upsert documents for the given cars (all cars when
+    car_ids is None). Returns {car_id: body} for what was written.
+    """
+    qs = Car.objects.order_by("pk")
+    if car_ids is not None:
+        qs = qs.filter(pk__in=list(car_ids))
+    ids = list(qs.values_list("pk", flat=True))
+
+    sections = load_inspection_sections()
+    written = {}
+
+    for start in range(0, len(ids), chunk_size):
+        cars = (
+            Car.objects
+            .filter(pk__in=ids[start:start + chunk_size])
+            .defer("search_vector")
+            .select_related("dealer")
+            .prefetch_related(*DOCUMENT_PREFETCHES)
+        )
+        bodies = render_car_documents(cars, sections)
+
+        CarDocument.objects.bulk_create(
+            [CarDocument(car_id=car_id, body=body) for car_id, body in bodies.items()],
+            update_conflicts=True,
+            unique_fields=["car"],
+            update_fields=["body", "updated_at"],
+        )
+        written.update(bodies)
+
+    return written
+
+
+def stale_car_documents():
+    """Ids of the cars without a document, or changed since it was rendered."""
+    return Car.objects.filter(
+        Q(document__isnull=True) | Q(updated_at__gt=F("document__updated_at"))
+    ).values_list("pk", flat=True)
+
+
+def get_car_documents(car_ids):
+    """
+    {car_id: body} for the given cars, building any missing or stale
+    document on the fly: a document rendered before the car's updated_at
+    (writes that skip the signals, e.g. queryset.update() or the COPY
+    loader, as long as they move updated_at) is rebuilt, not served.
+    Ids of cars that do not exist are simply absent.
+    """
+    car_ids = list(car_ids)
+    documents = dict(
+        CarDocument.objects
+        .filter(car_id__in=car_ids, updated_at__gte=F("car__updated_at"))
+        .values_list("car_id", "body")
+    )
+
+    missing = [car_id for car_id in car_ids if car_id not in documents]
+    if missing:
+        documents.update(rebuild_car_documents(missing))
+
+    return documents
+
+
+def load_document(body, request=None):
+    """Decode a stored document for a response (absolute thumbnail URL)."""
+    data = json.loads(body)
+    if request is not None and data.get("thumbnail"):
+        data["thumbnail"] = request.build_absolute_uri(data["thumbnail"])
+    return data
+
+
+# -------------------------
+# INVALIDATION
+# -------------------------
+def _flush_pending():
+    pending = getattr(_state, "pending", None)
+    if not pending:
+        return
+    _state.pending = set()
+    rebuild_car_documents(pending)
+
+
+def invalidate_car_documents(car_ids):
+    """
+    Schedule a rebuild of these cars' documents once the current
+    transaction commits (immediately in autocommit). Ids are collected
+    per thread, so a transaction touching many rows rebuilds each car once.
+    """
+    if getattr(_state, "suspended", 0):
+        return
+
+    pending = getattr(_state, "pending", None)
+    if pending is None:
+        pending = _state.pending = set()
+
+    pending.update(car_ids)
+    on_commit_once(_flush_pending)
+
+
+def _drop_all_documents():
+    CarDocument.objects.all().delete()
+
+
+def invalidate_all_car_documents():
+    """Master data changed: drop every document, they rebuild on next read."""
+    if getattr(_state, "suspended", 0):
+        return
+    on_commit_once(_drop_all_documents)
+
+
+@contextmanager
+def suspend_document_rebuilds():
+    """
+    Skip per-row rebuilds (bulk imports). The caller is expected to run
+    rebuild_car_documents() afterwards.
+    """
+    _state.suspended = getattr(_state, "suspended", 0) + 1
+    try:
+        yield
+    finally:
+        _state.suspended -= 1
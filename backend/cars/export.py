@@ -0,0 +1,265 @@
+"""
+Streaming catalog export in the layout the importers read
+(backend/csv/*.csv), or as one JSONL line per car.
+
+Rows are read with iterator(chunk_size=...) (server-side cursors on
+Postgres) and written as they arrive, so memory stays constant however
+large the catalog is; gzip compression happens on the fly.
+"""
+import csv
+import json
+import zlib
+from datetime import date, datetime
+
+from .models import (
+    Car,
+    CarFeature,
+    CarHighlight,
+    CarImage,
+    CarInspectionSectionScore,
+    CarInspectionSubSectionRemarks,
+    CarReasonToBuy,
+    CarSpec,
+    Dealer,
+    InspectionItem,
+    InspectionSection,
+    InspectionSubSection,
+)
+
+
+CHUNK_SIZE = 2000
+# Cars per batch when nesting child rows into JSONL lines
+JSONL_BATCH_SIZE = 500
+
+# file -> (model, scope, [(CSV header, lookup)]), in import order.
+# scope: "car" = the exported cars, "child" = their rows,
+# "dealer" = their dealers, None = master data (exported whole)
+EXPORT_TABLES = {
+    "dealers.csv": (Dealer, "dealer", [
+        ("dealer_code", "dealer_code"),
+        ("name", "name"),
+        ("phone", "phone"),
+        ("email", "email"),
+        ("city", "city"),
+        ("state", "state"),
+        ("tier", "tier"),
+        ("tags", "tags"),
+    ]),
+    "inspection_sections.csv": (InspectionSection, None, [
+        ("key", "key"),
+        ("title", "title"),
+        ("description", "description"),
+    ]),
+    "inspection_subsections.csv": (InspectionSubSection, None, [
+        ("section_key", "section__key"),
+        ("key", "key"),
+        ("title", "title"),
+        ("order", "order"),
+    ]),
+    "cars.csv": (Car, "car", [
+        ("car_code", "car_code"),
+        ("dealer_code", "dealer__dealer_code"),
+        ("availability_status", "availability_status"),
+        ("insurance_valid_till", "insurance_valid_till"),
+        ("insurance_type", "insurance_type"),
+        ("owner_count", "owner_count"),
+        ("title", "title"),
+        ("brand", "brand"),
+        ("model", "model"),
+        ("year", "year"),
+        ("price", "price"),
+        ("discount_price", "discount_price"),
+        ("emi", "emi"),
+        ("km", "km"),
+        ("fuel", "fuel"),
+        ("transmission", "transmission"),
+        ("body", "body"),
+        ("seats", "seats"),
+        ("city", "city"),
+        ("rto", "rto"),
+        ("colorKey", "colorKey"),
+        ("registration_number", "registration_number"),
+        ("tags", "tags"),
+        ("metadata", "metadata"),
+    ]),
+    "car_images.csv": (CarImage, "child", [
+        ("car_code", "car__car_code"),
+        ("category_key", "category__key"),
+        ("image", "image"),
+        ("caption", "caption"),
+        ("sort_order", "sort_order"),
+    ]),
+    "car_highlights.csv": (CarHighlight, "child", [
+        ("car_code", "car__car_code"),
+        ("text", "text"),
+    ]),
+    "car_specs.csv": (CarSpec, "child", [
+        ("car_code", "car__car_code"),
+        ("category_key", "category__key"),
+        ("category_title", "category__title"),
+        ("label", "label"),
+        ("value", "value"),
+    ]),
+    "car_features.csv": (CarFeature, "child", [
+        ("car_code", "car__car_code"),
+        ("category_key", "category__key"),
+        ("category_title", "category__title"),
+        ("name", "name"),
+        ("status", "status"),
+    ]),
+    "car_reasons.csv": (CarReasonToBuy, "child", [
+        ("car_code", "car__car_code"),
+        ("title", "title"),
+        ("description", "description"),
+        ("sort_order", "sort_order"),
+    ]),
+    "inspection_items.csv": (InspectionItem, "child", [
+        ("car_code", "car__car_code"),
+        ("section_key", "subsection__section__key"),
+        ("subsection_key", "subsection__key"),
+        ("name", "name"),
+        ("status", "status"),
+        ("remarks", "remarks"),
+    ]),
+    "car_inspection_scores.csv": (CarInspectionSectionScore, "child", [
+        ("car_code", "car__car_code"),
+        ("section_key", "section__key"),
+        ("score", "score"),
+        ("rating", "rating"),
+        ("status", "status"),
+        ("remarks", "remarks"),
+    ]),
+    "car_subsection_remarks.csv": (CarInspectionSubSectionRemarks, "child", [
+        ("car_code", "car__car_code"),
+        ("subsection_key", "subsection__key"),
+        ("status", "status"),
+        ("remarks", "remarks"),
+    ]),
+}
+
+JSONL_FILE = "catalog.jsonl"
+EXPORT_FILES = [*EXPORT_TABLES, JSONL_FILE]
+
+# JSONL: child rows nested under each car (CSV columns minus car_code)
+JSONL_CHILDREN = {
+    "images": "car_images.csv",
+    "highlights": "car_highlights.csv",
+    "specs": "car_specs.csv",
+    "features": "car_features.csv",
+    "reasons_to_buy": "car_reasons.csv",
+    "inspection_items": "inspection_items.csv",
+    "inspection_section_scores": "car_inspection_scores.csv",
+    "inspection_subsection_remarks": "car_subsection_remarks.csv",
+}
+
+
+# -------------------------
+# ROWS
+# -------------------------
+def csv_value(value):
+    """Cell text the importers parse back (JSON columns via ast.literal_eval)."""
+    if value is None:
+        return ""
+    if isinstance(value, (list, dict)):
+        return repr(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+def table_rows(filename, cars):
+    """Value tuples of one export table for the `cars` queryset."""
+    model, scope, columns = EXPORT_TABLES[filename]
+    qs = model.objects.all()
+    if scope == "car":
+        qs = cars
+    elif scope == "child":
+        qs = qs.filter(car__in=cars.values("pk"))
+    elif scope == "dealer":
+        qs = qs.filter(pk__in=cars.values("dealer_id"))
+
+    lookups = [lookup for _, lookup in columns]
+    order = "car_code" if scope == "car" else "pk"
+    return qs.order_by(order).values_list(*lookups).iterator(chunk_size=CHUNK_SIZE)
+
+
+class _Echo:
+    """File-like object for csv.writer that hands back what it is given."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(filename, cars):
+    """CSV text chunks (header first) of one export table."""
+    _, _, columns = EXPORT_TABLES[filename]
+    writer = csv.writer(_Echo())
+
+    yield writer.writerow([header for header, _ in columns])
+    buffer = []
+    for row in table_rows(filename, cars):
+        buffer.append(writer.writerow([csv_value(value) for value in row]))
+        if len(buffer) >= CHUNK_SIZE:
+            yield "".join(buffer)
+            buffer = []
+    if buffer:
+        yield "".join(buffer)
+
+
+def iter_jsonl(cars):
+    """One JSON line per car: the cars.csv columns plus nested child rows."""
+    car_columns = [header for header, _ in EXPORT_TABLES["cars.csv"][2]]
+
+    batch = []
+    for row in table_rows("cars.csv", cars):
+        batch.append(dict(zip(car_columns, row)))
+        if len(batch) >= JSONL_BATCH_SIZE:
+            yield _jsonl_batch(batch)
+            batch = []
+    if batch:
+        yield _jsonl_batch(batch)
+
+
+def _jsonl_batch(cars):
+    by_code = {car["car_code"]: car for car in cars}
+    for key, filename in JSONL_CHILDREN.items():
+        model, _, columns = EXPORT_TABLES[filename]
+        headers = [header for header, _ in columns]
+        for car in cars:
+            car[key] = []
+        rows = (
+            model.objects
+            .filter(car__car_code__in=list(by_code))
+            .order_by("pk")
+            .values_list(*[lookup for _, lookup in columns])
+        )
+        for row in rows:
+            data = dict(zip(headers, row))
+            by_code[data.pop("car_code")][key].append(data)
+
+    return "".join(
+        # Decimals / dates as exact strings, as in the CSV files
+        json.dumps(car, default=str, ensure_ascii=False) + "\n"
+        for car in cars
+    )
+
+
+def iter_export(filename, cars):
+    if filename == JSONL_FILE:
+        return iter_jsonl(cars)
+    return iter_csv(filename, cars)
+
+
+def encode(chunks, compress=False):
+    """UTF-8 bytes of the text chunks, gzip-compressed on the fly if asked."""
+    if not compress:
+        for chunk in chunks:
+            yield chunk.encode("utf-8")
+        return
+
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
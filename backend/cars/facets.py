@@ -0,0 +1,114 @@
+import math
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max, Min, Q
+
+from .cache import catalog_version
+from .counts import filter_params_key
+from .models import Car
+
+
+# Sidebar facet name -> Car lookup
+TERM_FACETS = {
+    "brand": "brand",
+    "model": "model",
+    "fuel": "fuel",
+    "transmission": "transmission",
+    "body": "body",
+    "city": "city",
+    "rto": "rto",
+    "colorKey": "colorKey",
+    "owner_count": "owner_count",
+    "dealer_tier": "dealer__tier",
+}
+
+RANGE_FACETS = ["price", "year", "km"]
+
+DEFAULT_BUCKETS = 10
+MAX_BUCKETS = 50
+
+
+def _buckets(lo, hi, count):
+    """[(from, to), ...] integer edges covering lo..hi, `to` exclusive."""
+    lo, hi = math.floor(lo), math.floor(hi)
+    width = max(1, math.ceil((hi - lo + 1) / count))
+    n = math.ceil((hi - lo + 1) / width)
+    return [(lo + i * width, lo + (i + 1) * width) for i in range(n)]
+
+
+def compute_facets(filtered_queryset, buckets=DEFAULT_BUCKETS):
+    """
+    Term counts and numeric histograms for a filtered car queryset.
+
+    One GROUP BY per term facet, one MIN/MAX aggregate and one aggregate
+    holding every histogram bucket: the query count does not depend on
+    the data.
+    """
+    # Facet over plain ids so annotations of the filtered queryset (e.g.
+    # search_rank) stay out of the GROUP BYs
+    cars = Car.objects.filter(pk__in=filtered_queryset.order_by().values("pk"))
+
+    facets = {}
+    for name, lookup in TERM_FACETS.items():
+        rows = (
+            cars.order_by()
+            .values_list(lookup)
+            .annotate(count=Count("pk"))
+        )
+        values = [
+            {"value": value, "count": count}
+            for value, count in rows
+            if value not in (None, "")
+        ]
+        values.sort(key=lambda row: (-row["count"], str(row["value"])))
+        facets[name] = values
+
+    aggregates = {}
+    for field in RANGE_FACETS:
+        aggregates[f"{field}__min"] = Min(field)
+        aggregates[f"{field}__max"] = Max(field)
+    aggregates["total"] = Count("pk")
+    bounds = cars.aggregate(**aggregates)
+
+    edges = {}
+    bucket_counts = {}
+    for field in RANGE_FACETS:
+        lo, hi = bounds[f"{field}__min"], bounds[f"{field}__max"]
+        edges[field] = _buckets(lo, hi, buckets) if lo is not None else []
+        for i, (start, end) in enumerate(edges[field]):
+            bucket_counts[f"{field}__{i}"] = Count(
+                "pk", filter=Q(**{f"{field}__gte": start, f"{field}__lt": end})
+            )
+    counts = cars.aggregate(**bucket_counts) if bucket_counts else {}
+
+    ranges = {}
+    for field in RANGE_FACETS:
+        ranges[field] = {
+            "min": bounds[f"{field}__min"],
+            "max": bounds[f"{field}__max"],
+            "histogram": [
+                {"from": start, "to": end, "count": counts[f"{field}__{i}"]}
+                for i, (start, end) in enumerate(edges[field])
+            ],
+        }
+
+    return {
+        "total": bounds["total"],
+        "facets": facets,
+        "ranges": ranges,
+    }
+
+
+def get_facets(filtered_queryset, query_params, buckets=DEFAULT_BUCKETS):
+    """
+    compute_facets(), cached per normalized CarFilter params + catalog
+    version (the database counter every writing process bumps, the same
+    key the listing and its counts use).
+    """
+    key = f"cars:facets:{catalog_version()}:{filter_params_key(query_params)}:{buckets}"
+    data = cache.get(key)
+    if data is None:
+        data = compute_facets(filtered_queryset, buckets)
+        cache.set(key, data, settings.CAR_RESPONSE_CACHE_TIMEOUT)
+    return data
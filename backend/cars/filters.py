@@ -1,12 +1,31 @@
 import django_filters
 from django.db.models import Q, Count, Exists, OuterRef
+from django.db.models.functions import Upper
 from django.utils import timezone
 from datetime import timedelta
+from rest_framework.filters import OrderingFilter
 
 from .models import (
     Car,
-    InspectionItem,
+    CarFeature,
+    CarHighlight,
+    CarImage,
+    CarInspectionSectionScore,
+    CarInspectionSubSectionRemarks,
+    CarReasonToBuy,
+    CarSpec,
 )
+from .search import SEARCH_MODE_CHOICES, search_cars
+
+
+# ----------------------------------------------------------------------
+# CHILD-TABLE PREDICATES
+# ----------------------------------------------------------------------
+# Child rows are only ever tested through correlated subqueries, never
+# joined into the car query: a car matches once however many of its rows
+# match, so the listing needs no DISTINCT.
+def child_exists(model, **lookups):
+    return Exists(model.objects.filter(car=OuterRef("pk"), **lookups))
 
 
 class CarFilter(django_filters.FilterSet):
@@ -97,7 +116,7 @@ class CarFilter(django_filters.FilterSet):
     # MEDIA
     # ------------------------------------------------------------------
     has_thumbnail = django_filters.BooleanFilter(method="filter_thumbnail")
-    image_count_min = django_filters.NumberFilter(method="filter_image_count")
+    image_count_min = django_filters.NumberFilter(field_name="image_count", lookup_expr="gte")
     has_image_category = django_filters.CharFilter(method="filter_image_category")
 
     # ------------------------------------------------------------------
@@ -107,7 +126,8 @@ class CarFilter(django_filters.FilterSet):
     highlight_exact = django_filters.CharFilter(method="filter_highlight_exact")
 
     has_reason = django_filters.CharFilter(method="filter_reason_contains")
-    reason_count_min = django_filters.NumberFilter(method="filter_reason_count")
+    reason_count_min = django_filters.NumberFilter(field_name="reason_count", lookup_expr="gte")
+    highlight_count_min = django_filters.NumberFilter(field_name="highlight_count", lookup_expr="gte")
 
     # ------------------------------------------------------------------
     # SPECS & FEATURES
@@ -117,16 +137,23 @@ class CarFilter(django_filters.FilterSet):
     has_features = django_filters.CharFilter(method="filter_features")
     feature_status = django_filters.CharFilter(method="filter_feature_status")
     feature_category = django_filters.CharFilter(method="filter_feature_category")
+    flawless_features_min = django_filters.NumberFilter(field_name="feature_flawless_count", lookup_expr="gte")
+    little_flaw_features_max = django_filters.NumberFilter(field_name="feature_little_flaw_count", lookup_expr="lte")
+    damaged_features_max = django_filters.NumberFilter(field_name="feature_damaged_count", lookup_expr="lte")
 
     # ------------------------------------------------------------------
     # INSPECTION
     # ------------------------------------------------------------------
+    # any section scoring at least this
     inspection_score_min = django_filters.NumberFilter(method="filter_inspection_score")
+    # average of the section scores / every section scoring at least this
+    overall_score_min = django_filters.NumberFilter(field_name="inspection_score", lookup_expr="gte")
+    min_section_score = django_filters.NumberFilter(field_name="min_section_score", lookup_expr="gte")
     inspection_rating = django_filters.CharFilter(method="filter_inspection_rating")
     inspection_subsection_status = django_filters.CharFilter(
         method="filter_inspection_subsection_status"
     )
-    has_major_flaws = django_filters.BooleanFilter(method="filter_major_flaws")
+    has_major_flaws = django_filters.BooleanFilter(field_name="has_major_flaw")
 
     # ------------------------------------------------------------------
     # TAGS & METADATA
@@ -146,6 +173,8 @@ class CarFilter(django_filters.FilterSet):
     # SEARCH
     # ------------------------------------------------------------------
     search = django_filters.CharFilter(method="filter_search")
+    # fts (default) | legacy; read by filter_search
+    search_mode = django_filters.ChoiceFilter(choices=SEARCH_MODE_CHOICES, method="filter_search_mode")
 
     class Meta:
         model = Car
@@ -202,64 +231,63 @@ class CarFilter(django_filters.FilterSet):
     def filter_thumbnail(self, qs, name, value):
         return qs.filter(thumbnail__isnull=not value)
 
-    def filter_image_count(self, qs, name, value):
-        return qs.annotate(img_count=Count("images")).filter(img_count__gte=value)
-
     def filter_image_category(self, qs, name, value):
-        return qs.filter(images__category__key__in=value.split(",")).distinct()
+        return qs.filter(child_exists(CarImage, category__key__in=value.split(",")))
 
     def filter_highlight_contains(self, qs, name, value):
-        return qs.filter(highlights__text__icontains=value)
+        return qs.filter(child_exists(CarHighlight, text__icontains=value))
 
     def filter_highlight_exact(self, qs, name, value):
-        return qs.filter(highlights__text__iexact=value)
+        return qs.filter(child_exists(CarHighlight, text__iexact=value))
 
     def filter_reason_contains(self, qs, name, value):
-        return qs.filter(reasons_to_buy__title__icontains=value)
-
-    def filter_reason_count(self, qs, name, value):
-        return qs.annotate(rc=Count("reasons_to_buy")).filter(rc__gte=value)
+        return qs.filter(child_exists(CarReasonToBuy, title__icontains=value))
 
     def filter_spec(self, qs, name, value):
         # format: category_key:value
         key, val = value.split(":")
         return qs.filter(
-            specs__category__key=key,
-            specs__value__iexact=val
+            child_exists(CarSpec, category__key=key, value__iexact=val)
         )
 
     def filter_features(self, qs, name, value):
-        for f in value.split(","):
-            qs = qs.filter(features__name__iexact=f)
-        return qs.distinct()
+        # All of the (case-insensitive) names: one GROUP BY car HAVING
+        # COUNT(DISTINCT name) = number of names
+        names = {f.upper() for f in value.split(",")}
+        cars_with_all = (
+            CarFeature.objects
+            .annotate(name_upper=Upper("name"))
+            .filter(name_upper__in=names)
+            .order_by()
+            .values("car")
+            .annotate(matched=Count("name_upper", distinct=True))
+            .filter(matched=len(names))
+            .values("car")
+        )
+        return qs.filter(pk__in=cars_with_all)
 
     def filter_feature_status(self, qs, name, value):
-        return qs.filter(features__status=value)
+        return qs.filter(child_exists(CarFeature, status=value))
 
     def filter_feature_category(self, qs, name, value):
-        return qs.filter(features__category__key__in=value.split(","))
+        return qs.filter(
+            child_exists(CarFeature, category__key__in=value.split(","))
+        )
 
     def filter_inspection_score(self, qs, name, value):
-        return qs.filter(inspection_section_scores__score__gte=value).distinct()
+        return qs.filter(
+            child_exists(CarInspectionSectionScore, score__gte=value)
+        )
 
     def filter_inspection_rating(self, qs, name, value):
         return qs.filter(
-            inspection_section_scores__rating__in=value.split(",")
+            child_exists(CarInspectionSectionScore, rating__in=value.split(","))
         )
 
     def filter_inspection_subsection_status(self, qs, name, value):
         return qs.filter(
-            inspection_subsection_remarks__status__in=value.split(",")
-        )
-
-    def filter_major_flaws(self, qs, name, value):
-        subq = Exists(
-            InspectionItem.objects.filter(
-                car=OuterRef("pk"),
-                status="major"
-            )
+            child_exists(CarInspectionSubSectionRemarks, status__in=value.split(","))
         )
-        return qs.annotate(has_major=subq).filter(has_major=value)
 
     def filter_tags_any(self, qs, name, value):
         q = Q()
@@ -283,12 +311,20 @@ class CarFilter(django_filters.FilterSet):
         )
 
     def filter_search(self, qs, name, value):
-        return qs.filter(
-            Q(title__icontains=value) |
-            Q(brand__icontains=value) |
-            Q(model__icontains=value) |
-            Q(city__icontains=value) |
-            Q(colorKey__icontains=value) |
-            Q(car_code__icontains=value) |
-            Q(registration_number__icontains=value)
-        )
+        return search_cars(qs, value, self.form.cleaned_data.get("search_mode"))
+
+    def filter_search_mode(self, qs, name, value):
+        return qs
+
+
+class CarOrderingFilter(OrderingFilter):
+    """
+    OrderingFilter that sorts full-text search results by relevance
+    (search_rank, then the default ordering) when no ?ordering= is given.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        queryset = super().filter_queryset(request, queryset, view)
+        if "search_rank" in queryset.query.annotations and not request.query_params.get(self.ordering_param):
+            queryset = queryset.order_by("-search_rank", *queryset.query.order_by)
+        return queryset
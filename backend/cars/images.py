@@ -0,0 +1,282 @@
+"""
+Responsive derivatives of the car images (CarImage.image, Car.thumbnail).
+
+Each source file under MEDIA_ROOT is resized to CAR_IMAGE_WIDTHS (never
+upscaled) and encoded to CAR_IMAGE_FORMATS with Pillow, in a process
+pool. Files are named after the SHA-256 of the source bytes
+(derivatives/ab/abcdef...-640w.webp), so a source imported again, or
+under another path, costs a hash and no encoding. Every variant is
+recorded as an ImageDerivative row under the source path, and the
+serializers expose them as one srcset string per format (image_srcsets).
+"""
+import hashlib
+import io
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from PIL import Image, ImageOps, features
+
+from .cache import invalidate_cars
+from .conditional import touch_cars
+from .documents import invalidate_car_documents
+from .models import Car, CarImage, ImageDerivative
+
+
+EXTENSIONS = {"avif": "avif", "webp": "webp", "jpeg": "jpg"}
+SAVE_OPTIONS = {
+    "avif": {"quality": 50},
+    "webp": {"quality": 75, "method": 4},
+    "jpeg": {"quality": 80, "optimize": True, "progressive": True},
+}
+# Pillow feature that has to be available for each format
+FORMAT_FEATURES = {"avif": "avif", "webp": "webp", "jpeg": "jpg"}
+# Sources per DB write (and per document invalidation)
+WRITE_BATCH_SIZE = 100
+
+# One background thread per process encodes the single uploads (enqueue_derivatives)
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def available_formats():
+    """CAR_IMAGE_FORMATS that the installed Pillow can encode."""
+    return [
+        fmt for fmt in settings.CAR_IMAGE_FORMATS
+        if fmt in EXTENSIONS and features.check(FORMAT_FEATURES[fmt])
+    ]
+
+
+# -------------------------
+# ENCODING (WORKER PROCESSES)
+# -------------------------
+def _convert(image, fmt):
+    """The image in a mode the format can store (JPEG: alpha flattened on white)."""
+    alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+    if fmt == "jpeg":
+        if alpha:
+            rgba = image.convert("RGBA")
+            flat = Image.new("RGB", rgba.size, "white")
+            flat.paste(rgba, mask=rgba.getchannel("A"))
+            return flat
+        return image if image.mode in ("RGB", "L") else image.convert("RGB")
+    if alpha:
+        return image if image.mode == "RGBA" else image.convert("RGBA")
+    return image if image.mode in ("RGB", "L") else image.convert("RGB")
+
+
+def encode_derivatives(source, path, media_root, widths, formats):
+    """
+    (source, digest, [(format, width, height, name, bytes)]) of one source
+    file; variants whose content-addressed file exists are not encoded again.
+    """
+    data = Path(path).read_bytes()
+    digest = hashlib.sha256(data).hexdigest()
+    variants = []
+    with Image.open(io.BytesIO(data)) as opened:
+        image = ImageOps.exif_transpose(opened)
+        targets = [width for width in widths if width <= image.width] or [image.width]
+        for width in targets:
+            height = max(round(image.height * width / image.width), 1)
+            resized = None
+            for fmt in formats:
+                name = f"derivatives/{digest[:2]}/{digest}-{width}w.{EXTENSIONS[fmt]}"
+                target = Path(media_root) / name
+                if not target.exists():
+                    if resized is None:
+                        resized = image.resize((width, height), Image.LANCZOS, reducing_gap=3.0)
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    # Written aside and renamed: readers never see a partial file
+                    fd, temporary = tempfile.mkstemp(dir=target.parent, suffix=".part")
+                    with os.fdopen(fd, "wb") as f:
+                        _convert(resized, fmt).save(f, format=fmt.upper(), **SAVE_OPTIONS[fmt])
+                    os.replace(temporary, target)
+                variants.append((fmt, width, height, name, target.stat().st_size))
+    return source, digest, variants
+
+
+def _encode(args):
+    try:
+        return encode_derivatives(*args), None
+    except Exception as e:
+        traceback.print_exc()
+        return (args[0], None, []), f"{type(e).__name__}: {e}"
+
+
+def _pool(workers):
+    if workers <= 1:
+        return None  # encoded in the calling process, in order
+    if "fork" in multiprocessing.get_all_start_methods():
+        # Forked children inherit the configured Django; no DB connection is shared
+        connections.close_all()
+        return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork"))
+    return ThreadPoolExecutor(max_workers=workers)
+
+
+# -------------------------
+# GENERATION
+# -------------------------
+class DerivativeResult:
+    def __init__(self):
+        self.sources = 0
+        self.encoded = 0
+        self.skipped = 0
+        self.variants = 0
+        self.missing = []
+        self.failed = []
+        self.seconds = 0.0
+
+    def __str__(self):
+        return (
+            f"image derivatives: {self.sources} sources, {self.encoded} encoded ({self.variants} variants), "
+            f"{self.skipped} up to date, {len(self.missing)} missing, {len(self.failed)} failed "
+            f"in {self.seconds:.2f}s"
+        )
+
+
+def image_sources(car_ids=None):
+    """{source path: {car ids}} of the car images and thumbnails."""
+    images = CarImage.objects.exclude(image="")
+    cars = Car.objects.exclude(thumbnail="").exclude(thumbnail__isnull=True)
+    if car_ids is not None:
+        car_ids = list(car_ids)
+        images = images.filter(car_id__in=car_ids)
+        cars = cars.filter(pk__in=car_ids)
+
+    sources = {}
+    for name, car_id in images.values_list("image", "car_id").iterator():
+        sources.setdefault(name, set()).add(car_id)
+    for name, car_id in cars.values_list("thumbnail", "pk").iterator():
+        sources.setdefault(name, set()).add(car_id)
+    return sources
+
+
+def _local_path(name):
+    if name.startswith(("http://", "https://")):
+        return None
+    try:
+        path = default_storage.path(name)
+    except NotImplementedError:
+        return None  # remote storage
+    return path if os.path.isfile(path) else None
+
+
+def generate_derivatives(sources, workers=None, force=False):
+    """
+    Encode and record the derivatives of `sources` ({path: car ids}).
+    Sources that already have a variant in every format are skipped
+    unless `force`; cars whose images got new variants are touched so
+    their documents and cached responses are rebuilt.
+    """
+    result = DerivativeResult()
+    start = time.monotonic()
+    formats = available_formats()
+    widths = sorted(set(settings.CAR_IMAGE_WIDTHS))
+    if workers is None:
+        workers = settings.CAR_IMAGE_WORKERS or os.cpu_count() or 1
+
+    done = {}
+    if not force:
+        recorded = ImageDerivative.objects.filter(source__in=list(sources)).values_list("source", "format")
+        for source, fmt in recorded.distinct():
+            done.setdefault(source, set()).add(fmt)
+
+    jobs = []
+    for name in sorted(sources):
+        result.sources += 1
+        if set(formats) <= done.get(name, set()):
+            result.skipped += 1
+            continue
+        path = _local_path(name)
+        if path is None:
+            result.missing.append(name)
+            continue
+        jobs.append((name, path, str(settings.MEDIA_ROOT), widths, formats))
+
+    if jobs and formats:
+        pool = _pool(min(workers, len(jobs)))
+        if pool is None:
+            encoded = map(_encode, jobs)
+        else:
+            # Nothing buffered may be copied into a forked worker (printed twice)
+            sys.stdout.flush()
+            sys.stderr.flush()
+            encoded = pool.map(_encode, jobs, chunksize=4)
+        try:
+            batch = []
+            for (source, digest, variants), error in encoded:
+                if error:
+                    result.failed.append((source, error))
+                    continue
+                batch.append((source, digest, variants))
+                if len(batch) >= WRITE_BATCH_SIZE:
+                    record_derivatives(batch, sources, result)
+                    batch = []
+            record_derivatives(batch, sources, result)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+    result.seconds = time.monotonic() - start
+    return result
+
+
+@transaction.atomic
+def record_derivatives(batch, sources, result):
+    """Replace the ImageDerivative rows of the encoded sources, touch their cars."""
+    if not batch:
+        return
+    names = [source for source, _, _ in batch]
+    ImageDerivative.objects.filter(source__in=names).delete()
+    ImageDerivative.objects.bulk_create([
+        ImageDerivative(
+            source=source, source_digest=digest, format=fmt, width=width, height=height, file=name, size=size,
+        )
+        for source, digest, variants in batch
+        for fmt, width, height, name, size in variants
+    ])
+    result.encoded += len(batch)
+    result.variants += sum(len(variants) for _, _, variants in batch)
+
+    car_ids = list({car_id for name in names for car_id in sources.get(name, ())})
+    touch_cars(car_ids)
+    invalidate_car_documents(car_ids)
+    invalidate_cars(car_ids)
+
+
+
+# -------------------------
+# SINGLE UPLOADS (BACKGROUND)
+# -------------------------
+def _generate_in_thread(sources):
+    try:
+        generate_derivatives(sources, workers=1)
+    finally:
+        connections.close_all()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="image-derivatives")
+        return _executor
+
+
+def enqueue_derivatives(sources):
+    """
+    Encode `sources` ({path: car ids}) in a background thread once the
+    current transaction commits, so the saving request does not wait.
+    A process that exits first leaves them to generate_image_derivatives,
+    which only encodes the sources without derivatives.
+    """
+    transaction.on_commit(lambda: _get_executor().submit(_generate_in_thread, sources))
@@ -0,0 +1,707 @@
+"""
+Set-based CSV import engine behind scripts/import_*.py.
+
+A step reads its CSV in batches, resolves foreign keys from lookup maps
+loaded once (car_code -> id, category key -> id, ...), parses and
+validates the batch in Python and writes it with one
+bulk_create(update_conflicts=True) against the model's unique
+constraint. What the model signals would do per saved row (aggregate
+columns, Car.updated_at, documents, cache versions) is done once per
+batch instead.
+
+Every imported row's digest is kept in ImportedRow under its natural
+key, so a re-run only parses and writes the rows that changed (and
+touches only their cars).
+
+run_jobs() runs the import scripts as a dependency graph on a pool of
+worker processes (threads where fork is unavailable), each job with its
+own DB connection and transaction.
+"""
+import csv
+import hashlib
+import multiprocessing
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from decimal import InvalidOperation
+from itertools import islice
+from pathlib import Path
+
+from django.db import connection, connections, models
+from django.db.transaction import TransactionManagementError
+
+from . import aggregates
+from .cache import invalidate_cars, invalidate_catalog
+from .conditional import touch_all_cars, touch_cars
+from .documents import invalidate_all_car_documents, invalidate_car_documents
+from .models import Car, Dealer, ImportedRow, InspectionSection, InspectionSubSection
+from .signals import CAR_CHILD_MODELS, MASTER_MODELS
+
+
+BATCH_SIZE = 2000
+# Invalid rows printed per step (all of them are counted)
+MAX_REPORTED_ERRORS = 20
+# Between the natural key columns of a manifest key
+KEY_SEPARATOR = "\x1f"
+
+_state = threading.local()
+
+
+class RowError(ValueError):
+    """A CSV row that cannot be imported (the row is skipped)."""
+
+
+def required(row, *columns):
+    """Stripped values of the given columns, RowError when one is empty."""
+    values = [(row.get(column) or "").strip() for column in columns]
+    missing = [column for column, value in zip(columns, values) if not value]
+    if missing:
+        raise RowError(f"missing {', '.join(missing)}")
+    return values[0] if len(values) == 1 else values
+
+
+# -------------------------
+# LOOKUP MAPS
+# -------------------------
+class Lookups:
+    """Natural key -> pk maps, each loaded with one query on first use."""
+
+    def __init__(self):
+        self._maps = {}
+
+    def _map(self, model, field="key"):
+        name = model.__name__
+        if name not in self._maps:
+            self._maps[name] = dict(model.objects.values_list(field, "pk"))
+        return self._maps[name]
+
+    def _resolve(self, model, key, field="key"):
+        try:
+            return self._map(model, field)[key]
+        except KeyError:
+            raise RowError(f"{model.__name__} not found: {key}") from None
+
+    def car(self, car_code):
+        return self._resolve(Car, car_code, "car_code")
+
+    def dealer(self, dealer_code):
+        return self._resolve(Dealer, dealer_code, "dealer_code")
+
+    def section(self, key):
+        return self._resolve(InspectionSection, key)
+
+    def subsection(self, key):
+        # Looked up by key alone, as the importers always did
+        return self._resolve(InspectionSubSection, key)
+
+    def category(self, model, key):
+        return self._resolve(model, key)
+
+    def ensure_categories(self, model, defaults):
+        """Create the {key: {field: value}} categories that do not exist yet."""
+        known = self._map(model)
+        missing = {key: values for key, values in defaults.items() if key not in known}
+        if not missing:
+            return
+        model.objects.bulk_create(
+            [model(key=key, **values) for key, values in missing.items()],
+            ignore_conflicts=True,
+        )
+        known.update(model.objects.filter(key__in=list(missing)).values_list("key", "pk"))
+
+
+# -------------------------
+# MANIFEST
+# -------------------------
+class Manifest:
+    """
+    The ImportedRow entries of one table: the digest of the CSV row (or
+    group of rows) last imported for each natural key, and the object it
+    was written to.
+    """
+
+    def __init__(self, table, key_columns):
+        self.table = table
+        self.key_columns = key_columns
+
+    def key(self, row):
+        return KEY_SEPARATOR.join((row.get(column) or "").strip() for column in self.key_columns)
+
+    @staticmethod
+    def digest(rows):
+        return hashlib.sha1(repr([list(row.items()) for _, row in rows]).encode("utf-8")).hexdigest()
+
+    def load(self, keys):
+        """{key: (digest, object id)}"""
+        entries = ImportedRow.objects.filter(table=self.table, key__in=keys)
+        return {key: (digest, object_id) for key, digest, object_id in entries.values_list("key", "digest", "object_id")}
+
+    def save(self, entries):
+        """Record {key: (digest, object id)}."""
+        ImportedRow.objects.bulk_create(
+            [
+                ImportedRow(table=self.table, key=key, digest=digest, object_id=str(object_id))
+                for key, (digest, object_id) in entries.items()
+            ],
+            update_conflicts=True,
+            unique_fields=["table", "key"],
+            update_fields=["digest", "object_id", "imported_at"],
+        )
+
+    def keys(self):
+        return ImportedRow.objects.filter(table=self.table).values_list("key", flat=True).iterator(chunk_size=BATCH_SIZE)
+
+    def forget(self, keys):
+        for start in range(0, len(keys), BATCH_SIZE):
+            ImportedRow.objects.filter(table=self.table, key__in=keys[start:start + BATCH_SIZE]).delete()
+
+
+def forget_imports(models):
+    """Drop the manifest of these models' tables (written by another loader: re-import every row)."""
+    ImportedRow.objects.filter(table__in=[model._meta.label_lower for model in models]).delete()
+
+
+# -------------------------
+# STEPS
+# -------------------------
+class StepResult:
+    def __init__(self, name, rows=0, errors=None, seconds=0.0):
+        self.name = name
+        self.rows = rows
+        self.inserted = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.deleted = 0
+        self.errors = errors or []
+        self.seconds = seconds
+
+    @property
+    def written(self):
+        return self.inserted + self.updated
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def report(self):
+        for number, message in self.errors[:MAX_REPORTED_ERRORS]:
+            print(f"❌ {self.name}, row {number}: {message}")
+        if len(self.errors) > MAX_REPORTED_ERRORS:
+            print(f"❌ {self.name}: {len(self.errors) - MAX_REPORTED_ERRORS} more invalid rows")
+        print(f"✅ {self}")
+
+    def __str__(self):
+        return (
+            f"{self.name}: {self.rows} rows, {self.inserted} inserted, {self.updated} updated, "
+            f"{self.unchanged} unchanged, {self.deleted} deleted, {len(self.errors)} invalid "
+            f"in {self.seconds:.2f}s ({self.rows_per_second:,.0f} rows/s)"
+        )
+
+
+class ImportStep:
+    """
+    One CSV file -> one model.
+
+    parse(row, lookups) returns the model field values of a CSV row
+    (foreign keys as `<name>_id`) or raises RowError. Rows are upserted on
+    `unique_fields` (updating `update_fields`), only inserted when
+    update_fields is empty, and always inserted when unique_fields is None.
+    `categories(row)` may return (model, key, {field: value}) for a
+    category row to create before the row is parsed.
+
+    `key_columns` are the CSV columns of the natural key: rows whose
+    content is the same as at the last import (ImportedRow) are skipped.
+    Models without a natural key are `replace_by` (CSV column, field)
+    instead: the rows of e.g. one car_code are one unit, and all of that
+    car's rows are replaced when any of them changes.
+    """
+
+    def __init__(
+        self,
+        name,
+        csv_path,
+        model,
+        parse,
+        unique_fields=None,
+        update_fields=(),
+        categories=None,
+        optional=False,
+        key_columns=None,
+        replace_by=None,
+        batch_size=BATCH_SIZE,
+    ):
+        self.name = name
+        self.csv_path = csv_path
+        self.model = model
+        self.parse = parse
+        self.unique_fields = list(unique_fields) if unique_fields else None
+        self.update_fields = list(update_fields)
+        self.categories = categories
+        self.optional = optional
+        self.replace_by = replace_by
+        self.key_columns = [replace_by[0]] if replace_by else key_columns
+        self.batch_size = batch_size
+
+        if self.update_fields:
+            # What save() would refresh on every update_or_create
+            self.update_fields += [
+                field.name for field in model._meta.concrete_fields
+                if getattr(field, "auto_now", False) and field.name not in self.update_fields
+            ]
+        self._key_attnames = [
+            model._meta.get_field(name).attname for name in self.unique_fields or ()
+        ]
+        self._constrained = self.unique_fields is None or has_unique_constraint(model, self.unique_fields)
+        self._char_limits = {
+            field.attname: field.max_length for field in model._meta.concrete_fields
+            if isinstance(field, models.CharField) and field.max_length
+        }
+        if replace_by:
+            group_field = model._meta.get_field(replace_by[1])
+            self._group_attname = group_field.attname
+            self._object_model = group_field.related_model
+        else:
+            self._object_model = model
+
+    def run(self, lookups=None, csv_dir=None, full=False, delete_missing=False):
+        """
+        Import the CSV file (the file of the same name in `csv_dir` if
+        given). Rows unchanged since the last import are skipped unless
+        `full`; `delete_missing` deletes what earlier imports wrote for
+        the keys no longer in the file.
+        """
+        lookups = lookups or Lookups()
+        csv_path = Path(csv_dir) / Path(self.csv_path).name if csv_dir else self.csv_path
+        result = StepResult(self.name)
+        start = time.monotonic()
+        try:
+            f = open(csv_path, newline="", encoding="utf-8")
+        except FileNotFoundError:
+            if not self.optional:
+                raise
+            print(f"⚠️  CSV file not found: {csv_path} (optional, skipped)")
+            return result
+
+        manifest = Manifest(self.model._meta.label_lower, self.key_columns) if self.key_columns else None
+        seen, keep = set(), set()
+        with f:
+            for units in self.read_units(csv.DictReader(f), manifest, result):
+                if manifest:
+                    seen.update(key for key, _, _ in units)
+                    if not full:
+                        units = self.changed_units(units, manifest, result, keep)
+                rows = [item for _, _, unit_rows in units for item in unit_rows]
+                objs, resolved = self.validate_batch(rows, lookups, result.errors)
+                if self.replace_by:
+                    pks = self.replace_groups(objs, result)
+                else:
+                    pks = self.write_batch(objs, result)
+                if manifest:
+                    entries = self.manifest_entries(units, objs, resolved, pks)
+                    manifest.save(entries)
+                    keep.update(str(object_id) for _, object_id in entries.values())
+
+        if delete_missing and manifest:
+            if result.errors:
+                print(f"⚠️  {self.name}: {len(result.errors)} invalid rows, nothing deleted")
+            else:
+                self.delete_missing(manifest, seen, keep, result)
+
+        result.seconds = time.monotonic() - start
+        result.report()
+        return result
+
+    def read_units(self, reader, manifest, result):
+        """
+        Batches of (manifest key, digest, [(row number, row)]) units: one
+        row each, or every row of a replace_by group (the file is read
+        whole to group them).
+        """
+        # 1-based data row numbers, as printed by the old importers
+        numbered = enumerate(reader, start=1)
+        if not self.replace_by:
+            while True:
+                batch = list(islice(numbered, self.batch_size))
+                if not batch:
+                    return
+                result.rows += len(batch)
+                if manifest:
+                    yield [(manifest.key(row), manifest.digest([(n, row)]), [(n, row)]) for n, row in batch]
+                else:
+                    yield [(None, None, [item]) for item in batch]
+
+        groups = {}
+        for number, row in numbered:
+            result.rows += 1
+            groups.setdefault(manifest.key(row), []).append((number, row))
+        batch, size = [], 0
+        for key, rows in groups.items():
+            batch.append((key, manifest.digest(rows), rows))
+            size += len(rows)
+            if size >= self.batch_size:
+                yield batch
+                batch, size = [], 0
+        if batch:
+            yield batch
+
+    def changed_units(self, units, manifest, result, keep):
+        """
+        The units that are new or changed since the last import (or whose
+        object is gone); the objects of the others are added to `keep`.
+        """
+        known = manifest.load([key for key, _, _ in units])
+        same = {}
+        for key, digest, _ in units:
+            if key in known and known[key][0] == digest:
+                same[key] = known[key][1]
+        alive = {
+            str(pk) for pk in
+            self._object_model.objects.filter(pk__in=set(same.values())).values_list("pk", flat=True)
+        } if same else set()
+
+        changed = []
+        for unit in units:
+            key, _, rows = unit
+            if same.get(key) in alive:
+                result.unchanged += len(rows)
+                keep.add(same[key])
+            else:
+                changed.append(unit)
+        return changed
+
+    def validate_batch(self, rows, lookups, errors):
+        """
+        ({key: model instance} of the valid rows (last row wins per key),
+        {row number: key}); errors appended.
+        """
+        if self.categories:
+            pending = {}
+            for _, row in rows:
+                try:
+                    model, key, values = self.categories(row)
+                except RowError:
+                    continue  # reported by parse()
+                pending.setdefault(model, {}).setdefault(key, values)
+            for model, defaults in pending.items():
+                lookups.ensure_categories(model, defaults)
+
+        objs, resolved = {}, {}
+        for number, row in rows:
+            try:
+                values = self.parse(row, lookups)
+                for attname, limit in self._char_limits.items():
+                    if len(values.get(attname) or "") > limit:
+                        raise RowError(f"{attname} longer than {limit} characters")
+            except (RowError, ValueError, InvalidOperation, SyntaxError) as e:
+                errors.append((number, str(e) or type(e).__name__))
+                continue
+
+            key = tuple(values[attname] for attname in self._key_attnames) if self.unique_fields else number
+            resolved[number] = key
+            if key in objs and not self.update_fields:
+                continue  # insert-only: the first row wins, like get_or_create
+            objs[key] = self.model(**values)
+        return objs, resolved
+
+    def write_batch(self, objs, result):
+        """Insert / update the objects; {key: pk} of their rows."""
+        if not objs:
+            return {}
+
+        existing = self._existing(objs)
+        new = {key: obj for key, obj in objs.items() if key not in existing}
+        changed = {key: obj for key, obj in objs.items() if key in existing} if self.update_fields else {}
+        result.unchanged += len(objs) - len(new) - len(changed)
+
+        if self.unique_fields is None:
+            self.model.objects.bulk_create(new.values())
+        elif not self._constrained:
+            # No DB constraint to conflict on: upsert the matched rows on their
+            # pk (one statement, unlike bulk_update()'s CASE per row), insert the rest
+            for key, obj in changed.items():
+                obj.pk = existing[key]
+            if changed:
+                self.model.objects.bulk_create(
+                    changed.values(),
+                    update_conflicts=True,
+                    unique_fields=[self.model._meta.pk.name],
+                    update_fields=self.update_fields,
+                )
+            self.model.objects.bulk_create(new.values())
+        elif changed:
+            self.model.objects.bulk_create(
+                [*new.values(), *changed.values()],
+                update_conflicts=True,
+                unique_fields=self.unique_fields,
+                update_fields=self.update_fields,
+            )
+        elif new:
+            self.model.objects.bulk_create(new.values(), ignore_conflicts=True)
+        result.inserted += len(new)
+        result.updated += len(changed)
+
+        pks = dict(existing)
+        if self.model._meta.pk.has_default():
+            pks.update((key, obj.pk) for key, obj in new.items())
+        elif new:
+            pks.update(self._existing(new))
+
+        if self.model is Car:
+            car_ids = [pks[key] for key in [*new, *changed]]
+        elif self.model in CAR_CHILD_MODELS:
+            car_ids = {obj.car_id for obj in [*new.values(), *changed.values()]}
+        else:
+            car_ids = ()
+        if new or changed:
+            rows_written(self.model, car_ids)
+        return pks
+
+    def _existing(self, objs):
+        """{key: pk} of the objects' rows already in the table."""
+        if self.unique_fields is None:
+            return {}
+        lookups = {f"{attname}__in": {key[i] for key in objs} for i, attname in enumerate(self._key_attnames)}
+        rows = self.model.objects.filter(**lookups).values_list("pk", *self._key_attnames)
+        return {tuple(row[1:]): row[0] for row in rows if tuple(row[1:]) in objs}
+
+    def replace_groups(self, objs, result):
+        """Replace all rows of the groups (e.g. cars) the objects belong to."""
+        if not objs:
+            return {}
+        attname = self._group_attname
+        counts = Counter(getattr(obj, attname) for obj in objs.values())
+        old = self.model.objects.filter(**{f"{attname}__in": list(counts)})
+        old_counts = Counter(old.values_list(attname, flat=True))
+        self._delete_groups(list(counts))
+        self.model.objects.bulk_create(objs.values())
+
+        for group, count in counts.items():
+            before = old_counts[group]
+            result.updated += min(before, count)
+            result.inserted += max(count - before, 0)
+            result.deleted += max(before - count, 0)
+        rows_written(self.model, counts)
+        return {}
+
+    def _delete_groups(self, groups):
+        """
+        DELETE the rows of `groups` in one plain statement. QuerySet.delete()
+        would collect the rows and send post_delete for each one (aggregates,
+        touches and invalidations car by car); rows_written() does that work
+        once for the batch. The grouped child tables are not referenced by
+        other rows, so there is no cascade to miss.
+        """
+        conn = connections[self.model.objects.db]
+        field = self.model._meta.get_field(self._group_attname)
+        params = [field.get_db_prep_value(group, conn) for group in groups]
+        table, column = conn.ops.quote_name(self.model._meta.db_table), conn.ops.quote_name(field.column)
+        with conn.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {table} WHERE {column} IN ({', '.join(['%s'] * len(params))})", params)
+
+    def manifest_entries(self, units, objs, resolved, pks):
+        """{key: (digest, object id)} of the units written without errors."""
+        entries = {}
+        for key, digest, rows in units:
+            if not all(number in resolved for number, _ in rows):
+                continue  # checked again next time
+            if self.replace_by:
+                object_id = getattr(objs[resolved[rows[0][0]]], self._group_attname)
+            else:
+                object_id = pks.get(resolved[rows[0][0]])
+            if object_id is not None:
+                entries[key] = (digest, object_id)
+        return entries
+
+    def delete_missing(self, manifest, seen, keep, result):
+        """Delete the rows (replace_by: groups) that are not in the file."""
+        field = self._group_attname if self.replace_by else "pk"
+        stored = self.model.objects.order_by().values_list(field, flat=True).distinct()
+        missing = [value for value in stored.iterator(chunk_size=BATCH_SIZE) if str(value) not in keep]
+        for start in range(0, len(missing), self.batch_size):
+            rows = self.model.objects.filter(**{f"{field}__in": missing[start:start + self.batch_size]})
+            # Cascades, and the delete signals keep the cars in sync
+            _, deleted = rows.delete()
+            result.deleted += deleted.get(self.model._meta.label, 0)
+        manifest.forget([key for key in manifest.keys() if key not in seen])
+
+
+def has_unique_constraint(model, field_names):
+    """Whether the fields (names or attnames) are unique together in the DB."""
+    fields = [model._meta.get_field(name) for name in field_names]
+    if len(fields) == 1 and fields[0].unique:
+        return True
+    wanted = {field.name for field in fields}
+    return any(
+        isinstance(constraint, models.UniqueConstraint)
+        and constraint.condition is None
+        and set(constraint.fields) == wanted
+        for constraint in model._meta.constraints
+    )
+
+
+def rows_written(model, car_ids):
+    """Side effects of the post_save signals (cars/signals.py) for a bulk write."""
+    collected = getattr(_state, "collected", None)
+    if collected is not None:
+        collected.append((model, list(car_ids)))
+        return
+
+    if model is Car or model in CAR_CHILD_MODELS:
+        car_ids = list(car_ids)
+        if model is not Car:
+            aggregates.child_rows_changed(model, car_ids)
+            touch_cars(car_ids)
+        invalidate_car_documents(car_ids)
+        invalidate_cars(car_ids)
+    elif model in MASTER_MODELS:
+        touch_all_cars()
+        invalidate_all_car_documents()
+        invalidate_catalog()
+
+
+@contextmanager
+def collect_rows_written():
+    """
+    Record the rows_written() calls made inside the block instead of
+    applying them (parallel workers: the Car rows are updated once, by
+    the coordinating process, not concurrently by every step).
+    """
+    _state.collected = []
+    try:
+        yield _state.collected
+    finally:
+        _state.collected = None
+
+
+# -------------------------
+# PARALLEL RUNS
+# -------------------------
+class ImportJob:
+    """A script's run(csv_dir) and the jobs whose rows it reads."""
+
+    def __init__(self, name, run, after=(), title=None):
+        self.name = name
+        self.run = run
+        self.after = list(after)
+        self.title = title or name
+
+
+class ImportFailure:
+    def __init__(self, name, message):
+        self.name = name
+        self.message = message
+
+    def __str__(self):
+        return f"{self.name}: {self.message}"
+
+
+def _run_job(run, csv_dir, options, collect):
+    """Worker side of run_jobs(): (results, collected rows_written calls, seconds)."""
+    start = time.monotonic()
+    try:
+        if not collect:
+            return run(csv_dir, **options), [], time.monotonic() - start
+        with collect_rows_written() as written, aggregates.collect_car_aggregates() as pending:
+            results = run(csv_dir, **options)
+        return results, written + pending, time.monotonic() - start
+    except Exception:
+        traceback.print_exc()
+        raise
+    finally:
+        if collect:
+            # One connection per job, never shared with the coordinator
+            connections.close_all()
+            sys.stdout.flush()
+
+
+def _executor(workers):
+    if workers <= 1:
+        return nullcontext()  # jobs run in the calling thread, in order
+    if "fork" in multiprocessing.get_all_start_methods():
+        # Forked children inherit the configured Django; nothing is open to share
+        connections.close_all()
+        return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork"))
+    return ThreadPoolExecutor(max_workers=workers)
+
+
+def _submit(executor, *args):
+    if executor is not None:
+        # Nothing buffered may be copied into a forked worker (printed twice)
+        sys.stdout.flush()
+        sys.stderr.flush()
+        return executor.submit(_run_job, *args)
+    future = Future()
+    try:
+        future.set_result(_run_job(*args))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+def run_jobs(jobs, csv_dir=None, workers=1, announce=print, **options):
+    """
+    Run the jobs (run(csv_dir, **options)) as soon as the jobs they come
+    `after` have succeeded, at most `workers` at a time (in list order
+    when workers is 1). A failed job skips its dependents but not the
+    other jobs.
+
+    Returns ({job name: [StepResult]}, {job name: seconds}, [ImportFailure]).
+    """
+    names = {job.name for job in jobs}
+    for job in jobs:
+        unknown = set(job.after) - names
+        if unknown:
+            raise ValueError(f"{job.name} runs after unknown jobs: {', '.join(sorted(unknown))}")
+    collect = workers > 1
+    if collect and connection.in_atomic_block:
+        raise TransactionManagementError("Parallel import jobs commit separately, run them outside atomic()")
+
+    results, seconds, failures = {}, {}, []
+    failed = set()
+    written = []
+    pending = list(jobs)
+    running = {}
+    with _executor(workers) as executor:
+        while pending or running:
+            progressed = False
+            for job in list(pending):
+                blocked = [name for name in job.after if name in failed]
+                if blocked:
+                    pending.remove(job)
+                    failed.add(job.name)
+                    failures.append(ImportFailure(job.name, f"skipped, {', '.join(blocked)} failed"))
+                    progressed = True
+                elif len(running) < max(workers, 1) and all(name in results for name in job.after):
+                    pending.remove(job)
+                    announce(job.title)
+                    running[_submit(executor, job.run, csv_dir, options, collect)] = job
+                    progressed = True
+            if not running:
+                if pending and not progressed:
+                    raise ValueError(f"Circular job dependencies: {', '.join(job.name for job in pending)}")
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                job = running.pop(future)
+                try:
+                    job_results, job_written, seconds[job.name] = future.result()
+                except Exception as e:
+                    failed.add(job.name)
+                    failures.append(ImportFailure(job.name, f"{type(e).__name__}: {e}"))
+                    continue
+                results[job.name] = job_results if isinstance(job_results, list) else [job_results]
+                written += job_written
+
+    # What the workers' writes mean for the cars, once per model
+    car_ids = {}
+    for model, ids in written:
+        car_ids.setdefault(model, set()).update(ids)
+    for model, ids in car_ids.items():
+        rows_written(model, ids)
+
+    return results, seconds, failures
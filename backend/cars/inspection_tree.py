@@ -0,0 +1,73 @@
+from .models import InspectionSection
+
+
+# -------------------------
+# INSPECTION TREE BUILDER
+# -------------------------
+def load_inspection_sections():
+    """
+    Inspection master data (sections + ordered subsections).
+    Two queries total, shared by every car rendered in a request.
+    """
+    return list(InspectionSection.objects.prefetch_related("subsections"))
+
+
+def build_inspection_tree(car, sections, item_serializer):
+    """
+    Build the per-car inspection tree from already-prefetched rows.
+
+    Items, subsection remarks and section scores are read through
+    `.all()` (prefetch cache) and grouped in memory, so no query is
+    issued per section / subsection.
+    """
+    items_by_sub = {}
+    for item in car.inspection_items.all():
+        items_by_sub.setdefault(item.subsection_id, []).append(item)
+
+    remarks_by_sub = {}
+    for remark in car.inspection_subsection_remarks.all():
+        remarks_by_sub.setdefault(remark.subsection_id, remark)
+
+    scores_by_section = {}
+    for score in car.inspection_section_scores.all():
+        scores_by_section.setdefault(score.section_id, score)
+
+    result = []
+    for section in sections:
+        section_score = scores_by_section.get(section.id)
+
+        subs = []
+        for sub in section.subsections.all():
+            items = items_by_sub.get(sub.id, [])
+            subsection_remarks = remarks_by_sub.get(sub.id)
+
+            # Include subsection if it has items, remarks, or if section has a score (for sections like supporting_systems)
+            if items or subsection_remarks or section_score:
+                subs.append({
+                    "key": sub.key,
+                    "title": sub.title,
+                    "status": subsection_remarks.status if subsection_remarks else "",
+                    "remarks": subsection_remarks.remarks if subsection_remarks else (sub.remarks if sub.remarks else ""),
+                    "items": item_serializer(items, many=True).data if items else []
+                })
+
+        # Include section even if no subsections, if it has a score
+        if subs or section_score:
+            section_data = {
+                "key": section.key,
+                "title": section.title,
+                "description": section.description,
+                "subsections": subs
+            }
+
+            # Add score, rating, status, and remarks if available
+            if section_score:
+                section_data["score"] = float(section_score.score)
+                section_data["rating"] = section_score.rating
+                if section_score.status:
+                    section_data["status"] = section_score.status
+                if section_score.remarks:
+                    section_data["remarks"] = section_score.remarks
+
+            result.append(section_data)
+    return result
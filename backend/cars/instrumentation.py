@@ -0,0 +1,177 @@
+import json
+import logging
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+
+logger = logging.getLogger("cars.requests")
+
+_state = threading.local()
+
+
+class QueryBudgetExceeded(Exception):
+    """A view ran more SQL queries than its budget (CAR_QUERY_BUDGET_ACTION=raise)."""
+
+
+# -------------------------
+# PER-REQUEST METRICS
+# -------------------------
+class RequestMetrics:
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.timings = {}  # "serialize" / "render" -> seconds
+        self.cache = {"hit": 0, "miss": 0}
+        self.view = None
+        self.budget = None
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper() hook
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+
+
+def current_metrics():
+    """Metrics of the request being handled on this thread, or None."""
+    return getattr(_state, "metrics", None)
+
+
+@contextmanager
+def timer(name):
+    """Add the block's wall time to the current request's `name` timing."""
+    metrics = current_metrics()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if metrics is not None:
+            metrics.timings[name] = metrics.timings.get(name, 0.0) + time.perf_counter() - start
+
+
+def record_cache(event):
+    """Count a response cache "hit" / "miss" for the current request."""
+    metrics = current_metrics()
+    if metrics is not None:
+        metrics.cache[event] += 1
+
+
+# -------------------------
+# MIDDLEWARE
+# -------------------------
+class RequestMetricsMiddleware:
+    """
+    Counts the SQL queries and DB time of every request, adds a
+    Server-Timing header (db, serialize, render, cache, total) and logs
+    one JSON line to the "cars.requests" logger. Views with a query
+    budget (`query_budget` attribute or CAR_QUERY_BUDGETS) that exceed
+    it are logged as warnings, or raise QueryBudgetExceeded when
+    CAR_QUERY_BUDGET_ACTION is "raise" (tests).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = _state.metrics = RequestMetrics()
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            _state.metrics = None
+        total = time.perf_counter() - start
+
+        response["Server-Timing"] = server_timing(metrics, total)
+        self.log(request, response, metrics, total)
+        self.check_budget(request, metrics)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = current_metrics()
+        view_class = getattr(view_func, "cls", None)  # set by View.as_view()
+        if metrics is None or view_class is None:
+            return None
+
+        metrics.view = view_class.__name__
+        budgets = getattr(settings, "CAR_QUERY_BUDGETS", {})
+        metrics.budget = budgets.get(metrics.view, getattr(view_class, "query_budget", None))
+        return None
+
+    def log(self, request, response, metrics, total):
+        logger.info(json.dumps({
+            "method": request.method,
+            "path": request.path,
+            "view": metrics.view,
+            "status": response.status_code,
+            "queries": metrics.queries,
+            "query_budget": metrics.budget,
+            "db_ms": _ms(metrics.db_time),
+            "serialize_ms": _ms(metrics.timings.get("serialize", 0.0)),
+            "render_ms": _ms(metrics.timings.get("render", 0.0)),
+            "total_ms": _ms(total),
+            "cache_hits": metrics.cache["hit"],
+            "cache_misses": metrics.cache["miss"],
+        }))
+
+    def check_budget(self, request, metrics):
+        if metrics.budget is None or metrics.queries <= metrics.budget:
+            return
+
+        message = (
+            f"{metrics.view} ran {metrics.queries} queries for {request.get_full_path()} "
+            f"(budget {metrics.budget})"
+        )
+        if settings.CAR_QUERY_BUDGET_ACTION == "raise":
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2)
+
+
+def server_timing(metrics, total):
+    entries = [f'db;dur={_ms(metrics.db_time)};desc="{metrics.queries} queries"']
+    for name in ("serialize", "render"):
+        if name in metrics.timings:
+            entries.append(f"{name};dur={_ms(metrics.timings[name])}")
+    if metrics.cache["hit"] or metrics.cache["miss"]:
+        entries.append(f'cache;desc="hit={metrics.cache["hit"]} miss={metrics.cache["miss"]}"')
+    entries.append(f"total;dur={_ms(total)}")
+    return ", ".join(entries)
+
+
+# -------------------------
+# DRF VIEW MIXIN
+# -------------------------
+class RequestMetricsMixin:
+    """
+    Adds render time to the request metrics collected by
+    RequestMetricsMiddleware (views time their own serialization with
+    timer("serialize")). Set `query_budget` to the number of SQL
+    queries a request to the view may run.
+    """
+    query_budget = None
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        metrics = current_metrics()
+        if metrics is not None and hasattr(response, "add_post_render_callback"):
+            # The response is rendered right after the view returns
+            start = time.perf_counter()
+
+            def rendered(response):
+                metrics.timings["render"] = time.perf_counter() - start
+
+            response.add_post_render_callback(rendered)
+        return response
@@ -0,0 +1,260 @@
+"""
+Django management command to benchmark the car API endpoints and write
+latency percentiles / throughput / query counts as JSON, or (--renderer)
+time JSONRenderer against FastJSONRenderer on a 30-card listing page
+Usage: python backend/manage.py benchmark_api [--requests 200] [--concurrency 4] [--base-url http://localhost:8000] [--output bench.json]
+       python backend/manage.py benchmark_api --renderer [--requests 500]
+"""
+
+import json
+import math
+import random
+import re
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from rest_framework.renderers import JSONRenderer
+
+from cars.models import Car
+from cars.renderers import FastJSONRenderer, orjson
+
+
+# (name, path); {car_id} is replaced by a random car per request
+SCENARIOS = [
+    ("list", "/api/cars/"),
+    ("list page 5", "/api/cars/?page=5"),
+    ("list expand=all", "/api/cars/?expand=all"),
+    ("list cursor by price", "/api/cars/?pagination=cursor&ordering=price"),
+    ("detail", "/api/cars/{car_id}/"),
+    ("filter brand", "/api/cars/?brand=Hyundai,Maruti"),
+    ("filter price + year", "/api/cars/?price_min=300000&price_max=900000&year_min=2018"),
+    ("filter city + fuel, by km", "/api/cars/?city=Lucknow&fuel=Petrol&ordering=km"),
+    ("filter features", "/api/cars/?has_features=Air%20conditioner,Central%20locking"),
+    ("filter inspection", "/api/cars/?overall_score_min=8&has_major_flaws=false"),
+    ("filter aggregates", "/api/cars/?image_count_min=5&ordering=-inspection_score"),
+    ("search", "/api/cars/?search=hyundai"),
+    ("facets", "/api/cars/facets/?brand=Hyundai"),
+    ("suggest", "/api/cars/suggest/?q=hy"),
+]
+
+# (name, path) of the payloads rendered by --renderer; the 30-card page first
+RENDER_PAYLOADS = [
+    ("30-card page", "/api/cars/?page_size=30"),
+    ("30-card page, expand=all", "/api/cars/?page_size=30&expand=all"),
+    ("detail", "/api/cars/{car_id}/"),
+]
+
+QUERIES_RE = re.compile(r'db;dur=([\d.]+);desc="(\d+) queries"')
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return None
+    return values[max(0, math.ceil(pct / 100 * len(values)) - 1)]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark /api/cars/, /api/cars/<id>/ and CarFilter combinations; report p50/p95/p99, throughput and queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=100, help='Measured requests per scenario')
+        parser.add_argument('--warmup', type=int, default=5, help='Unmeasured requests per scenario first')
+        parser.add_argument('--concurrency', type=int, default=1)
+        parser.add_argument(
+            '--base-url',
+            default=None,
+            help='Benchmark a running server (e.g. http://localhost:8000); default is in-process',
+        )
+        parser.add_argument(
+            '--cold',
+            action='store_true',
+            help='Clear the cache before every request (in-process only): measures uncached responses',
+        )
+        parser.add_argument('--scenario', action='append', dest='scenarios', help='Only these scenario names')
+        parser.add_argument(
+            '--renderer',
+            action='store_true',
+            help='Time JSONRenderer and FastJSONRenderer on the same payloads (--requests renders each) instead',
+        )
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', default=None, help='Write the JSON report here (default: stdout)')
+
+    def handle(self, *args, **options):
+        if (options['cold'] or options['renderer']) and options['base_url']:
+            raise CommandError("--cold and --renderer only work in-process (without --base-url)")
+
+        self.options = options
+        self.car_ids = [str(pk) for pk in Car.objects.values_list('pk', flat=True)[:5000]]
+        if not self.car_ids:
+            raise CommandError("No cars: run import_all_data / generate_catalog first")
+        self.rng = random.Random(options['seed'])
+        self.rng_lock = threading.Lock()
+        self.local = threading.local()
+
+        scenarios = [
+            (name, path) for name, path in SCENARIOS
+            if not options['scenarios'] or name in options['scenarios']
+        ]
+        if not scenarios:
+            raise CommandError(f"Unknown scenario; choose from: {', '.join(name for name, _ in SCENARIOS)}")
+
+        report = {
+            "meta": {
+                "commit": self.git_commit(),
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "target": options['base_url'] or "in-process",
+                "cars": Car.objects.count(),
+                "requests": options['requests'],
+                "warmup": options['warmup'],
+                "concurrency": options['concurrency'],
+                "cold": options['cold'],
+            },
+            "scenarios": {},
+        }
+
+        if options['renderer']:
+            report["meta"]["encoder"] = f"orjson {orjson.__version__}" if orjson else "json (orjson not installed)"
+            report["renderers"] = {}
+            for name, path in RENDER_PAYLOADS:
+                self.stderr.write(f"⏱️  render {name}")
+                report["renderers"][name] = self.run_renderers(path.format(car_id=self.car_ids[0]))
+        else:
+            for name, path in scenarios:
+                self.stderr.write(f"⏱️  {name}")
+                report["scenarios"][name] = self.run_scenario(path)
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + "\n")
+            self.stderr.write(self.style.SUCCESS(f"✅ Report written to {options['output']}"))
+        else:
+            self.stdout.write(output)
+
+    # -------------------------
+    # REQUESTS
+    # -------------------------
+    def run_scenario(self, path):
+        options = self.options
+        for _ in range(options['warmup']):
+            self.request(path)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            samples = list(pool.map(lambda _: self.request(path), range(options['requests'])))
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(sample["ms"] for sample in samples)
+        queries = sorted(sample["queries"] for sample in samples if sample["queries"] is not None)
+        db_ms = sorted(sample["db_ms"] for sample in samples if sample["db_ms"] is not None)
+        errors = [sample["status"] for sample in samples if sample["status"] >= 400]
+        return {
+            "path": path,
+            "requests": len(samples),
+            "errors": len(errors),
+            "status_codes": sorted(set(sample["status"] for sample in samples)),
+            "p50_ms": percentile(latencies, 50),
+            "p95_ms": percentile(latencies, 95),
+            "p99_ms": percentile(latencies, 99),
+            "mean_ms": round(sum(latencies) / len(latencies), 2),
+            "max_ms": latencies[-1],
+            "throughput_rps": round(len(samples) / elapsed, 2),
+            "queries": {
+                "min": queries[0] if queries else None,
+                "p50": percentile(queries, 50),
+                "max": queries[-1] if queries else None,
+            },
+            "db_p50_ms": percentile(db_ms, 50),
+        }
+
+    # -------------------------
+    # RENDERERS
+    # -------------------------
+    def run_renderers(self, path):
+        """Render one response's data with both renderers, alternating, --requests times each."""
+        host = next((h for h in settings.ALLOWED_HOSTS if h and "*" not in h), "localhost").lstrip(".")
+        response = Client().get(path, HTTP_HOST=host)
+        if response.status_code != 200:
+            raise CommandError(f"{path} returned {response.status_code}")
+        data, media_type = response.data, "application/json"
+
+        renderers = {"json": JSONRenderer(), "fast": FastJSONRenderer()}
+        output = {name: renderer.render(data, media_type) for name, renderer in renderers.items()}
+        for _ in range(self.options['warmup']):
+            for renderer in renderers.values():
+                renderer.render(data, media_type)
+
+        timings = {name: [] for name in renderers}
+        for _ in range(self.options['requests']):
+            for name, renderer in renderers.items():
+                start = time.perf_counter()
+                renderer.render(data, media_type)
+                timings[name].append((time.perf_counter() - start) * 1000)
+
+        result = {"path": path, "bytes": len(output["json"]), "identical": output["json"] == output["fast"]}
+        for name, values in timings.items():
+            values.sort()
+            result[f"{name}_p50_ms"] = round(percentile(values, 50), 4)
+            result[f"{name}_mean_ms"] = round(sum(values) / len(values), 4)
+        result["speedup"] = round(result["json_p50_ms"] / result["fast_p50_ms"], 2)
+        return result
+
+    def request(self, path):
+        with self.rng_lock:
+            path = path.format(car_id=self.rng.choice(self.car_ids))
+
+        if self.options['base_url']:
+            status, server_timing, ms = self.http_request(self.options['base_url'].rstrip('/') + path)
+        else:
+            status, server_timing, ms = self.client_request(path)
+
+        # Query count / DB time from RequestMetricsMiddleware's Server-Timing header
+        match = QUERIES_RE.search(server_timing or "")
+        return {
+            "status": status,
+            "ms": round(ms, 2),
+            "queries": int(match.group(2)) if match else None,
+            "db_ms": float(match.group(1)) if match else None,
+        }
+
+    def client_request(self, path):
+        client = getattr(self.local, "client", None)
+        if client is None:
+            client = self.local.client = Client()
+        if self.options['cold']:
+            cache.clear()
+
+        host = next((h for h in settings.ALLOWED_HOSTS if h and "*" not in h), "localhost").lstrip(".")
+        start = time.perf_counter()
+        response = client.get(path, HTTP_HOST=host)
+        ms = (time.perf_counter() - start) * 1000
+        return response.status_code, response.get("Server-Timing"), ms
+
+    def http_request(self, url):
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(url, timeout=60) as response:
+                response.read()
+                status, server_timing = response.status, response.headers.get("Server-Timing")
+        except urllib.error.HTTPError as exc:
+            status, server_timing = exc.code, exc.headers.get("Server-Timing")
+        return status, server_timing, (time.perf_counter() - start) * 1000
+
+    def git_commit(self):
+        try:
+            return subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"],
+                capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
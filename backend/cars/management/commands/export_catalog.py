@@ -0,0 +1,88 @@
+"""
+Django management command to export the catalog in the CSV layout the
+importers read (one file per table), or as a single JSONL file
+Usage: python backend/manage.py export_catalog [--format csv|jsonl] [--output exports/] [--gzip] [--filter brand=Hyundai ...]
+"""
+
+import os
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.http import QueryDict
+
+from cars.export import EXPORT_TABLES, JSONL_FILE, encode, iter_export
+from cars.filters import CarFilter
+from cars.models import Car
+
+
+class Command(BaseCommand):
+    help = 'Stream the catalog (or the cars matching CarFilter params) to CSV files or JSONL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=['csv', 'jsonl'], default='csv')
+        parser.add_argument(
+            '--output',
+            default='exports',
+            help='Directory for the CSV files, or the JSONL file path ("-" for stdout)',
+        )
+        parser.add_argument('--gzip', action='store_true', help='Compress every file (.gz)')
+        parser.add_argument(
+            '--filter',
+            action='append',
+            default=[],
+            metavar='PARAM=VALUE',
+            help='CarFilter param, as in the listing query string (repeatable)',
+        )
+        parser.add_argument(
+            '--table',
+            action='append',
+            dest='tables',
+            choices=list(EXPORT_TABLES),
+            help='Only these CSV files (repeatable)',
+        )
+
+    def handle(self, *args, **options):
+        params = QueryDict(mutable=True)
+        for item in options['filter']:
+            key, sep, value = item.partition('=')
+            if not sep:
+                raise CommandError(f"--filter expects PARAM=VALUE, got {item!r}")
+            params.appendlist(key, value)
+
+        filterset = CarFilter(params, queryset=Car.objects.all())
+        if not filterset.is_valid():
+            raise CommandError(f"Invalid filter: {filterset.errors.as_json()}")
+        cars = filterset.qs
+
+        suffix = '.gz' if options['gzip'] else ''
+        if options['format'] == 'jsonl':
+            output = options['output']
+            if output == '-':
+                self.write(JSONL_FILE, cars, sys.stdout.buffer, options['gzip'])
+                return
+            if os.path.isdir(output):
+                output = os.path.join(output, JSONL_FILE + suffix)
+            with open(output, 'wb') as f:
+                self.report(output, self.write(JSONL_FILE, cars, f, options['gzip']))
+        else:
+            os.makedirs(options['output'], exist_ok=True)
+            for filename in options['tables'] or EXPORT_TABLES:
+                path = os.path.join(options['output'], filename + suffix)
+                with open(path, 'wb') as f:
+                    self.report(path, self.write(filename, cars, f, options['gzip']))
+
+        self.stderr.write(self.style.SUCCESS("✅ Export complete"))
+
+    def write(self, filename, cars, f, compress):
+        """(bytes written, seconds)"""
+        start = time.monotonic()
+        size = 0
+        for chunk in encode(iter_export(filename, cars), compress):
+            f.write(chunk)
+            size += len(chunk)
+        return size, time.monotonic() - start
+
+    def report(self, path, result):
+        size, seconds = result
+        self.stderr.write(f"📄 {path}: {size / 1024:.1f} KiB in {seconds:.2f}s")
@@ -0,0 +1,256 @@
+"""
+Django management command to generate a synthetic catalog at scale
+(1k / 10k / 100k / 1M cars) from the imported CSV catalog. On a database
+without cars the CSV catalog (backend/csv) is imported first.
+Usage: python backend/manage.py generate_catalog --cars 100k [--clear] [--seed 42] [--csv-dir feed/]
+"""
+
+import os
+import random
+import re
+import time
+import uuid
+from collections import Counter
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models.expressions import RawSQL
+
+from cars.aggregates import sync_car_aggregates
+from cars.cache import invalidate_catalog
+from cars.documents import rebuild_car_documents
+from cars.models import (
+    Car,
+    CarFeature,
+    CarHighlight,
+    CarImage,
+    CarInspectionSectionScore,
+    CarInspectionSubSectionRemarks,
+    CarReasonToBuy,
+    CarSpec,
+    Dealer,
+    InspectionItem,
+)
+
+
+# Child rows copied from the template car, with the columns that vary
+CHILD_MODELS = [
+    (CarImage, ["category_id", "image", "caption", "sort_order"]),
+    (CarHighlight, ["text"]),
+    (CarReasonToBuy, ["title", "description", "sort_order"]),
+    (CarSpec, ["category_id", "label", "value"]),
+    (CarFeature, ["category_id", "name", "status"]),
+    (CarInspectionSectionScore, ["section_id", "score", "rating", "status", "remarks"]),
+    (CarInspectionSubSectionRemarks, ["subsection_id", "status", "remarks"]),
+    (InspectionItem, ["subsection_id", "name", "status", "remarks"]),
+]
+
+# Share of feature / inspection statuses re-drawn from the catalog-wide mix
+STATUS_NOISE = 0.2
+
+SIZE_SUFFIXES = {"k": 1_000, "m": 1_000_000}
+
+# The bundled CSV catalog, imported when there are no template cars
+CSV_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))), 'csv')
+
+
+def parse_count(value):
+    """'10k' -> 10000, '1M' -> 1000000, '2500' -> 2500"""
+    value = value.strip().lower()
+    multiplier = SIZE_SUFFIXES.get(value[-1:], 1)
+    number = value[:-1] if value[-1:] in SIZE_SUFFIXES else value
+    try:
+        count = int(float(number) * multiplier)
+    except ValueError:
+        raise CommandError(f"Invalid car count: {value}")
+    if count < 1:
+        raise CommandError("Car count must be positive")
+    return count
+
+
+def round_thousand(amount):
+    return (amount / 1000).quantize(Decimal("1")) * 1000
+
+
+class Command(BaseCommand):
+    help = 'Generate synthetic cars (with images, specs, features, inspections) from the imported catalog'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cars', default='1k', help='Number of cars: 1k, 10k, 100k, 1M or any integer')
+        parser.add_argument('--prefix', default='SYN', help='car_code prefix of the generated cars')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=1000, help='Cars per transaction')
+        parser.add_argument('--clear', action='store_true', help='Delete previously generated cars first')
+        parser.add_argument('--documents', action='store_true', help='Pre-render CarDocuments (else built on first read)')
+        parser.add_argument(
+            '--csv-dir',
+            default=CSV_DIR,
+            help='CSV catalog imported first when the database has no template cars (default: backend/csv)',
+        )
+
+    def handle(self, *args, **options):
+        count = parse_count(options['cars'])
+        prefix = options['prefix']
+        rng = random.Random(options['seed'])
+
+        if options['clear']:
+            self.clear(prefix)
+
+        templates = self.load_templates(prefix, options['csv_dir'])
+        dealers = list(Dealer.objects.values_list("pk", flat=True))
+        if not dealers:
+            raise CommandError("No dealers to assign the generated cars to: import dealers.csv first")
+
+        self.stdout.write(f"📦 Loading child rows of {len(templates)} template cars")
+        children = self.load_children(templates)
+        pools = self.value_pools(templates, children)
+
+        start_index = Car.objects.filter(car_code__startswith=prefix).count()
+        self.stdout.write(f"🚀 Generating {count} cars ({prefix}{start_index + 1:07d}...)")
+
+        started = time.monotonic()
+        created = 0
+        rows = Counter()
+        while created < count:
+            size = min(options['batch_size'], count - created)
+            with transaction.atomic():
+                cars = [
+                    self.make_car(rng, rng.choice(templates), dealers, pools, f"{prefix}{start_index + created + i + 1:07d}")
+                    for i in range(size)
+                ]
+                Car.objects.bulk_create(cars, batch_size=size)
+                for model, objects in self.make_children(rng, cars, children, pools).items():
+                    model.objects.bulk_create(objects, batch_size=5000)
+                    rows[model.__name__] += len(objects)
+                # bulk_create sends no signals: fill the aggregate columns here
+                sync_car_aggregates([car.pk for car in cars])
+                if options['documents']:
+                    rebuild_car_documents([car.pk for car in cars])
+
+            created += size
+            elapsed = time.monotonic() - started
+            self.stdout.write(f"   {created}/{count} cars ({created / elapsed:.0f} cars/s)")
+
+        self.spread_created_at(prefix, f"{prefix}{start_index + 1:07d}")
+        invalidate_catalog()
+
+        self.stdout.write("\n📊 Rows created:")
+        for name, total in rows.items():
+            self.stdout.write(f"   {name}: {total}")
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {created} synthetic cars in {time.monotonic() - started:.1f}s"
+        ))
+
+    # -------------------------
+    # TEMPLATES
+    # -------------------------
+    def load_templates(self, prefix, csv_dir):
+        """The non-generated cars, after importing the CSV catalog if there are none."""
+        templates = Car.objects.exclude(car_code__startswith=prefix).defer("search_vector").order_by("car_code")
+        if not templates.exists():
+            if not os.path.isfile(os.path.join(csv_dir, 'cars.csv')):
+                raise CommandError(f"No template cars in the database and no cars.csv in {csv_dir}")
+            self.stdout.write(f"📥 No template cars: importing the CSV catalog from {csv_dir}")
+            call_command('import_all_data', csv_dir=csv_dir, no_derivatives=True, stdout=self.stdout, stderr=self.stderr)
+
+        templates = list(templates)
+        if not templates:
+            raise CommandError(f"No template cars: {csv_dir}/cars.csv imported no cars")
+        return templates
+
+    def load_children(self, templates):
+        """{model: {template car id: [row dicts]}}"""
+        children = {}
+        for model, columns in CHILD_MODELS:
+            by_car = {}
+            for row in model.objects.filter(car__in=templates).order_by("pk").values("car_id", *columns):
+                by_car.setdefault(row.pop("car_id"), []).append(row)
+            children[model] = by_car
+        return children
+
+    def value_pools(self, templates, children):
+        """Catalog-wide value mixes the generated cars are drawn from."""
+        statuses = {}
+        for model in (CarFeature, InspectionItem, CarInspectionSubSectionRemarks):
+            statuses[model] = [row["status"] for rows in children[model].values() for row in rows]
+        return {
+            "location": [(car.city, car.rto) for car in templates],
+            "colorKey": [car.colorKey for car in templates],
+            "availability_status": [car.availability_status for car in templates],
+            "insurance_type": [car.insurance_type for car in templates],
+            "owner_count": [car.owner_count for car in templates],
+            "statuses": statuses,
+        }
+
+    # -------------------------
+    # GENERATION
+    # -------------------------
+    def make_car(self, rng, template, dealers, pools, car_code):
+        this_year = date.today().year
+        year = min(this_year, max(2005, (template.year or this_year - 5) + rng.randint(-3, 3)))
+        age_factor = Decimal(str(round(1 + (year - (template.year or year)) * 0.07, 2)))
+        price = round_thousand(template.price * age_factor * Decimal(str(round(rng.uniform(0.85, 1.15), 2))))
+        discount_price = None
+        if template.discount_price is not None or rng.random() < 0.3:
+            discount_price = round_thousand(price * Decimal(str(round(rng.uniform(0.88, 0.98), 2))))
+        city, rto = rng.choice(pools["location"])
+
+        car = Car(
+            id=uuid.UUID(int=rng.getrandbits(128), version=4),
+            car_code=car_code,
+            dealer_id=rng.choice(dealers),
+            availability_status=rng.choice(pools["availability_status"]),
+            insurance_valid_till=date.today() + timedelta(days=rng.randint(-180, 720)) if rng.random() < 0.8 else None,
+            insurance_type=rng.choice(pools["insurance_type"]),
+            emi=template.emi,
+            owner_count=rng.choice(pools["owner_count"]),
+            title=re.sub(r"^\d{4}", str(year), template.title),
+            brand=template.brand,
+            model=template.model,
+            year=year,
+            price=max(price, Decimal("50000")),
+            discount_price=discount_price,
+            km=max(500, int((this_year - year + 1) * rng.uniform(6000, 16000))),
+            fuel=template.fuel,
+            transmission=template.transmission,
+            body=template.body,
+            seats=template.seats,
+            city=city,
+            rto=rto,
+            colorKey=rng.choice(pools["colorKey"]),
+            thumbnail=template.thumbnail.name or None,
+            registration_number=f"{rto}{rng.choice('ABCDEFGHJKLMNPRSTUVWXYZ')}{rng.choice('ABCDEFGHJKLMNPRSTUVWXYZ')}{rng.randint(1, 9999):04d}",
+            tags=template.tags,
+            metadata=template.metadata,
+        )
+        car.template_id = template.pk
+        return car
+
+    def make_children(self, rng, cars, children, pools):
+        """{model: [unsaved rows]} copied from each car's template car."""
+        objects = {model: [] for model, _ in CHILD_MODELS}
+        for car in cars:
+            for model, _ in CHILD_MODELS:
+                statuses = pools["statuses"].get(model)
+                for row in children[model].get(car.template_id, []):
+                    row = dict(row)
+                    if statuses and rng.random() < STATUS_NOISE:
+                        row["status"] = rng.choice(statuses)
+                    objects[model].append(model(car_id=car.pk, **row))
+        return objects
+
+    def clear(self, prefix):
+        ids = list(Car.objects.filter(car_code__startswith=prefix).values_list("pk", flat=True))
+        self.stdout.write(f"🗑️  Deleting {len(ids)} generated cars")
+        for start in range(0, len(ids), 1000):
+            with transaction.atomic():
+                Car.objects.filter(pk__in=ids[start:start + 1000]).delete()
+
+    def spread_created_at(self, prefix, first_code):
+        """bulk_create stamps every car with now(): spread listings over the last year."""
+        Car.objects.filter(car_code__startswith=prefix, car_code__gte=first_code).update(
+            created_at=RawSQL("now() - random() * interval '365 days'", [])
+        )
@@ -0,0 +1,43 @@
+"""
+Django management command to generate responsive image derivatives
+Usage: python backend/manage.py generate_image_derivatives [--car-code CAR001 ...] [--workers 4] [--force]
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cars.images import generate_derivatives, image_sources
+from cars.models import Car
+
+
+class Command(BaseCommand):
+    help = 'Encode the CAR_IMAGE_WIDTHS x CAR_IMAGE_FORMATS variants of the car images and thumbnails'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--car-code', action='append', dest='car_codes', default=None)
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Encoder processes (default: CAR_IMAGE_WORKERS, else one per CPU)',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Also re-check the images that already have derivatives (changed files, new widths)',
+        )
+
+    def handle(self, *args, **options):
+        car_ids = None
+        if options['car_codes']:
+            car_ids = Car.objects.filter(car_code__in=options['car_codes']).values_list('pk', flat=True)
+
+        result = generate_derivatives(image_sources(car_ids), workers=options['workers'], force=options['force'])
+        for name in result.missing[:20]:
+            self.stdout.write(self.style.WARNING(f"⚠️  Source image not found: {name}"))
+        if len(result.missing) > 20:
+            self.stdout.write(self.style.WARNING(f"⚠️  {len(result.missing) - 20} more missing source images"))
+        for name, error in result.failed:
+            self.stdout.write(self.style.ERROR(f"❌ {name}: {error}"))
+        self.stdout.write(self.style.SUCCESS(f"✅ {result}"))
+        if result.failed:
+            raise CommandError(f"{len(result.failed)} images could not be encoded")
@@ -1,11 +1,15 @@
 """
 Django management command to import all car data
-Usage: python backend/manage.py import_all_data
+Usage: python backend/manage.py import_all_data [--jobs 4] [--loader orm|copy] [--csv-dir feed/] [--full] [--delete-missing] [--no-derivatives] [--no-documents]
+       python backend/manage.py import_all_data --dry-run [--csv-dir feed/] [--report errors.json]
 """
 
 import sys
 import os
-from django.core.management.base import BaseCommand
+import json
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
 
 # Get the backend directory (where manage.py is)
 backend_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
@@ -24,60 +28,171 @@ from import_inspection_items import run as import_inspection_items
 from import_car_inspection_scores import run as import_car_inspection_scores
 from import_car_subsection_remarks import run as import_car_subsection_remarks
 
+from cars import copy_import
+from cars.aggregates import defer_car_aggregates
+from cars.images import generate_derivatives, image_sources
+from cars.importer import MAX_REPORTED_ERRORS, ImportJob, run_jobs
+from cars.validation import validate_files
+from cars.documents import (
+    invalidate_all_car_documents,
+    rebuild_car_documents,
+    stale_car_documents,
+    suspend_document_rebuilds,
+)
+
+
+# Steps 1-11. A job starts once the jobs it comes after have committed
+# (the car and inspection keys its rows refer to exist).
+JOBS = [
+    ImportJob("dealers", import_dealers, title="📋 Step 1: Importing Dealers..."),
+    ImportJob("cars", import_cars, after=["dealers"], title="🚗 Step 2: Importing Cars..."),
+    ImportJob("car images", import_car_images, after=["cars"], title="🖼️  Step 3: Importing Car Images..."),
+    ImportJob("car highlights", import_car_highlights, after=["cars"], title="✨ Step 4: Importing Car Highlights..."),
+    ImportJob("car specs", import_car_specs, after=["cars"], title="⚙️  Step 5: Importing Car Specs..."),
+    ImportJob("car features", import_car_features, after=["cars"], title="🎯 Step 6: Importing Car Features..."),
+    ImportJob("car reasons", import_car_reasons, after=["cars"], title="💡 Step 7: Importing Car Reasons to Buy..."),
+    ImportJob(
+        "inspection master",
+        import_inspection_master,
+        title="🔍 Step 8: Importing Inspection Sections & Subsections...",
+    ),
+    ImportJob(
+        "inspection items",
+        import_inspection_items,
+        after=["cars", "inspection master"],
+        title="✅ Step 9: Importing Inspection Items...",
+    ),
+    ImportJob(
+        "inspection scores",
+        import_car_inspection_scores,
+        after=["cars", "inspection master"],
+        title="📊 Step 10: Importing Inspection Section Scores...",
+    ),
+    ImportJob(
+        "subsection remarks",
+        import_car_subsection_remarks,
+        after=["cars", "inspection master"],
+        title="📝 Step 11: Importing Subsection Remarks...",
+    ),
+]
+
 
 class Command(BaseCommand):
     help = 'Import all car data from CSV files'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--csv-dir',
+            default=os.path.join(backend_dir, 'csv'),
+            help='Directory with the CSV files (default: backend/csv)',
+        )
+        parser.add_argument(
+            '--loader',
+            choices=['orm', 'copy'],
+            default='orm',
+            help='copy: COPY into staging tables + set-based upserts in one transaction (Postgres only)',
+        )
+        parser.add_argument(
+            '--jobs',
+            type=int,
+            default=1,
+            help='ORM importers run at once, each in its own process and DB connection (default: 1, in order)',
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Write every row, also those unchanged since the last import',
+        )
+        parser.add_argument(
+            '--delete-missing',
+            action='store_true',
+            help='Delete the rows that are not in the CSV files (the files are the whole catalog)',
+        )
+        parser.add_argument(
+            '--dry-run', '--validate',
+            action='store_true',
+            dest='dry_run',
+            help='Only validate every CSV file (types, choices, keys, references); nothing is imported',
+        )
+        parser.add_argument(
+            '--report',
+            help='With --dry-run: write the errors as JSON to this file ("-" for stdout)',
+        )
+        parser.add_argument(
+            '--no-derivatives',
+            action='store_true',
+            help='Skip encoding the responsive image variants (generate_image_derivatives later)',
+        )
+        parser.add_argument(
+            '--no-documents',
+            action='store_true',
+            help='Drop the car documents instead of rebuilding them (each is rendered on first read)',
+        )
+
     def handle(self, *args, **options):
+        if options['dry_run']:
+            return self.validate(options['csv_dir'], options['report'])
+
         self.stdout.write("=" * 60)
         self.stdout.write(self.style.SUCCESS("🚀 Starting Complete Data Import"))
         self.stdout.write("=" * 60)
         
+        csv_dir = options['csv_dir']
+        loader = options['loader']
+        if loader == 'copy' and connection.vendor != 'postgresql':
+            self.stdout.write(self.style.WARNING(
+                f"⚠️  The COPY loader needs Postgres ({connection.vendor} in use): using the ORM importers"
+            ))
+            loader = 'orm'
+        jobs = max(options['jobs'], 1)
+        if loader == 'copy' and jobs > 1:
+            self.stdout.write(self.style.WARNING("⚠️  --jobs is ignored by the COPY loader (one transaction)"))
+
+        self.results = []
+        self.seconds = {}
+        self.failures = []
+        start = time.monotonic()
         try:
-            # Step 1: Import Dealers
-            self.stdout.write("\n📋 Step 1: Importing Dealers...")
-            import_dealers()
-            
-            # Step 2: Import Cars
-            self.stdout.write("\n🚗 Step 2: Importing Cars...")
-            import_cars()
-            
-            # Step 3: Import Car Images
-            self.stdout.write("\n🖼️  Step 3: Importing Car Images...")
-            import_car_images()
-            
-            # Step 4: Import Car Highlights
-            self.stdout.write("\n✨ Step 4: Importing Car Highlights...")
-            import_car_highlights()
-            
-            # Step 5: Import Car Specs
-            self.stdout.write("\n⚙️  Step 5: Importing Car Specs...")
-            import_car_specs()
-            
-            # Step 6: Import Car Features
-            self.stdout.write("\n🎯 Step 6: Importing Car Features...")
-            import_car_features()
-            
-            # Step 7: Import Car Reasons
-            self.stdout.write("\n💡 Step 7: Importing Car Reasons to Buy...")
-            import_car_reasons()
-            
-            # Step 8: Import Inspection Master Data
-            self.stdout.write("\n🔍 Step 8: Importing Inspection Sections & Subsections...")
-            import_inspection_master()
-            
-            # Step 9: Import Inspection Items
-            self.stdout.write("\n✅ Step 9: Importing Inspection Items...")
-            import_inspection_items()
-            
-            # Step 10: Import Inspection Section Scores
-            self.stdout.write("\n📊 Step 10: Importing Inspection Section Scores...")
-            import_car_inspection_scores()
-            
-            # Step 11: Import Subsection Remarks (optional)
-            self.stdout.write("\n📝 Step 11: Importing Subsection Remarks...")
-            import_car_subsection_remarks()
-            
+            # Per-row document rebuilds are skipped during the import,
+            # every document is rebuilt once at the end instead.
+            with suspend_document_rebuilds():
+                if loader == 'copy':
+                    self.stdout.write("\n🚚 Steps 1-11: Loading all CSV files with COPY...")
+                    self.results = copy_import.load(
+                        csv_dir, full=options['full'], delete_missing=options['delete_missing'],
+                    )
+                else:
+                    with defer_car_aggregates():
+                        self.import_steps(
+                            csv_dir, jobs, full=options['full'], delete_missing=options['delete_missing'],
+                        )
+
+            if self.failures:
+                self.report()
+                raise CommandError(f"{len(self.failures)} import steps failed")
+
+            # Step 12: Responsive image variants of the new / changed images
+            if not options['no_derivatives']:
+                self.stdout.write("\n🖼️  Step 12: Generating Image Derivatives...")
+                with suspend_document_rebuilds():
+                    derivatives = generate_derivatives(image_sources())
+                for name, error in derivatives.failed:
+                    self.stdout.write(self.style.WARNING(f"⚠️  {name}: {error}"))
+                self.stdout.write(f"✅ {derivatives}")
+
+            # Step 13: Rebuild materialized car documents
+            if options['no_documents']:
+                self.stdout.write("\n📦 Step 13: Dropping Car Documents...")
+                invalidate_all_car_documents()
+            else:
+                self.stdout.write("\n📦 Step 13: Rebuilding Car Documents...")
+                # Only those of the cars the import changed, unless --full
+                documents = rebuild_car_documents(None if options['full'] else stale_car_documents())
+                self.stdout.write(f"✅ {len(documents)} car documents rebuilt")
+
+            self.report()
+            self.stdout.write(f"   total: {time.monotonic() - start:.2f}s")
+
             self.stdout.write("\n" + "=" * 60)
             self.stdout.write(self.style.SUCCESS("✅ All Data Imported Successfully!"))
             self.stdout.write("=" * 60)
@@ -87,3 +202,78 @@ class Command(BaseCommand):
             import traceback
             traceback.print_exc()
             raise
+
+    def import_steps(self, csv_dir, jobs, **options):
+        start = time.monotonic()
+        results, self.seconds, self.failures = run_jobs(
+            JOBS,
+            csv_dir,
+            workers=jobs,
+            announce=lambda title: self.stdout.write(f"\n{title}"),
+            **options,
+        )
+        self.jobs = jobs
+        self.steps_seconds = time.monotonic() - start
+        # Summary in step order, whichever finished first
+        self.results = [result for job in JOBS for result in results.get(job.name, [])]
+
+    def report(self):
+        """Per-step timing, then every invalid row and failed step in one place."""
+        self.stdout.write("\n⏱️  Import Summary:")
+        for result in self.results:
+            self.stdout.write(f"   {result}")
+        self.stdout.write(
+            f"   rows: {sum(result.inserted for result in self.results)} inserted, "
+            f"{sum(result.updated for result in self.results)} updated, "
+            f"{sum(result.unchanged for result in self.results)} unchanged, "
+            f"{sum(result.deleted for result in self.results)} deleted"
+        )
+        if self.seconds:
+            self.stdout.write(
+                f"   steps: {sum(self.seconds.values()):.2f}s of work in {self.steps_seconds:.2f}s "
+                f"({self.jobs} jobs)"
+            )
+
+        invalid = [result for result in self.results if result.errors]
+        if invalid or self.failures:
+            self.stdout.write(self.style.ERROR("\n❌ Errors:"))
+        for result in invalid:
+            for number, message in result.errors[:MAX_REPORTED_ERRORS]:
+                self.stdout.write(f"   {result.name}, row {number}: {message}")
+            if len(result.errors) > MAX_REPORTED_ERRORS:
+                self.stdout.write(f"   {result.name}: {len(result.errors) - MAX_REPORTED_ERRORS} more invalid rows")
+        for failure in self.failures:
+            self.stdout.write(self.style.ERROR(f"   {failure}"))
+
+    def validate(self, csv_dir, report_path):
+        """--dry-run: check the whole feed, print / write the error report."""
+        self.stdout.write(f"🔎 Validating CSV files in {csv_dir} (dry run, nothing is imported)...")
+        start = time.monotonic()
+        report = validate_files(csv_dir)
+
+        for filename, summary in report.files.items():
+            if summary['invalid_rows']:
+                self.stdout.write(self.style.ERROR(
+                    f"❌ {filename}: {summary['rows']} rows, {summary['invalid_rows']} invalid"
+                ))
+            else:
+                self.stdout.write(f"✅ {filename}: {summary['rows']} rows")
+        for error in report.errors[:MAX_REPORTED_ERRORS]:
+            where = f"row {error['row']}" if error['row'] else "file"
+            value = f" {error['value']!r}" if error['value'] else ""
+            column = f", {error['column']}" if error['column'] else ""
+            self.stdout.write(f"   {error['file']}, {where}{column}:{value} {error['message']}")
+        if len(report.errors) > MAX_REPORTED_ERRORS:
+            self.stdout.write(f"   ... {len(report.errors) - MAX_REPORTED_ERRORS} more errors")
+        self.stdout.write(f"   validated in {time.monotonic() - start:.2f}s")
+
+        if report_path == '-':
+            self.stdout.write(json.dumps(report.as_dict(), ensure_ascii=False, indent=2))
+        elif report_path:
+            with open(report_path, 'w', encoding='utf-8') as f:
+                json.dump(report.as_dict(), f, ensure_ascii=False, indent=2)
+            self.stdout.write(f"📝 Error report written to {report_path}")
+
+        if not report.valid:
+            raise CommandError(f"{len(report.errors)} validation errors")
+        self.stdout.write(self.style.SUCCESS("✅ All CSV files are valid"))
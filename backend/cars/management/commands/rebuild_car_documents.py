@@ -0,0 +1,27 @@
+"""
+Django management command to rebuild materialized car documents
+Usage: python backend/manage.py rebuild_car_documents [--car-code CAR001 ...]
+"""
+
+from django.core.management.base import BaseCommand
+
+from cars.documents import rebuild_car_documents
+from cars.models import Car
+
+
+class Command(BaseCommand):
+    help = 'Rebuild CarDocument rows (all cars, or only the given car codes)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--car-code', action='append', dest='car_codes', default=None)
+        parser.add_argument('--chunk-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        car_ids = None
+        if options['car_codes']:
+            car_ids = Car.objects.filter(
+                car_code__in=options['car_codes']
+            ).values_list('pk', flat=True)
+
+        documents = rebuild_car_documents(car_ids, chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"✅ {len(documents)} car documents rebuilt"))
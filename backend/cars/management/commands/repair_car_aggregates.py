@@ -0,0 +1,48 @@
+"""
+Django management command to recompute the denormalized aggregate
+columns on Car and report drift
+Usage: python backend/manage.py repair_car_aggregates [--check] [--car-code CAR001 ...]
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cars.aggregates import AGGREGATE_FIELDS, sync_car_aggregates
+from cars.models import Car
+
+
+class Command(BaseCommand):
+    help = 'Recompute Car aggregate columns from the child tables and report drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--car-code', action='append', dest='car_codes', default=None)
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only report drift (exit with an error if any), do not write',
+        )
+
+    def handle(self, *args, **options):
+        car_ids = None
+        if options['car_codes']:
+            car_ids = Car.objects.filter(
+                car_code__in=options['car_codes']
+            ).values_list('pk', flat=True)
+
+        drift = sync_car_aggregates(
+            car_ids,
+            chunk_size=options['chunk_size'],
+            write=not options['check'],
+        )
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("✅ No drift: aggregate columns are up to date"))
+            return
+
+        for field in AGGREGATE_FIELDS:
+            if drift.get(field):
+                self.stdout.write(f"⚠️  {field}: {drift[field]} car(s) drifted")
+
+        if options['check']:
+            raise CommandError("Aggregate columns have drifted, run repair_car_aggregates")
+        self.stdout.write(self.style.SUCCESS("✅ Drifted aggregate columns repaired"))
@@ -0,0 +1,59 @@
+"""
+Django management command to import the queued dealer CSV uploads
+(the supported runner: web processes only import them with CAR_IMPORT_WORKERS)
+Usage: python backend/manage.py run_csv_imports [--requeue-stale] [--stale-after 600] [--watch 5]
+"""
+
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from cars.models import CarCSVImport
+from cars.uploads import STALE_AFTER, requeue_stale_jobs, run_import
+
+
+class Command(BaseCommand):
+    help = 'Run the queued CSV upload jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requeue-stale',
+            action='store_true',
+            help='Queue the running jobs whose heartbeat stopped again, from zero (checked on every poll)',
+        )
+        parser.add_argument(
+            '--stale-after',
+            type=float,
+            default=STALE_AFTER.total_seconds(),
+            metavar='SECONDS',
+            help='Heartbeat age after which a running job counts as abandoned',
+        )
+        parser.add_argument(
+            '--watch',
+            type=float,
+            default=None,
+            metavar='SECONDS',
+            help='Keep polling for new jobs every SECONDS',
+        )
+
+    def handle(self, *args, **options):
+        stale_after = timedelta(seconds=options['stale_after'])
+        while True:
+            if options['requeue_stale']:
+                requeued = requeue_stale_jobs(stale_after)
+                if requeued:
+                    self.stdout.write(f"🔁 {requeued} abandoned jobs queued again")
+
+            for job_id in CarCSVImport.objects.filter(status='queued').order_by('created_at').values_list('pk', flat=True):
+                if not run_import(job_id):
+                    continue  # claimed (or taken over) by another worker
+                job = CarCSVImport.objects.get(pk=job_id)
+                style = self.style.SUCCESS if job.status == 'succeeded' else self.style.ERROR
+                self.stdout.write(style(
+                    f"{'✅' if job.status == 'succeeded' else '❌'} {job.file_name} ({job.pk}): {job.status}, "
+                    f"{job.rows} rows, {job.error_count} invalid {job.message}".rstrip()
+                ))
+            if options['watch'] is None:
+                break
+            time.sleep(options['watch'])
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0016_car_emi'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CarDocument',
+            fields=[
+                ('car', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='document', serialize=False, to='cars.car')),
+                ('body', models.TextField(help_text='Rendered car detail JSON')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,51 @@
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+# Weights: A = title/brand/model, B = car_code/registration_number,
+# C = city/colorKey, D = body/fuel/transmission. The 'simple' config keeps
+# brand and model names unstemmed.
+SEARCH_VECTOR_TRIGGER = """
+CREATE OR REPLACE FUNCTION cars_car_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('simple', coalesce(NEW.title, '') || ' ' || coalesce(NEW.brand, '') || ' ' || coalesce(NEW.model, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(NEW.car_code, '') || ' ' || coalesce(NEW.registration_number, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(NEW.city, '') || ' ' || coalesce(NEW."colorKey", '')), 'C') ||
+        setweight(to_tsvector('simple', coalesce(NEW.body, '') || ' ' || coalesce(NEW.fuel, '') || ' ' || coalesce(NEW.transmission, '')), 'D');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER cars_car_search_vector_trigger
+    BEFORE INSERT OR UPDATE ON cars_car
+    FOR EACH ROW EXECUTE FUNCTION cars_car_search_vector_update();
+
+UPDATE cars_car SET search_vector = NULL;
+"""
+
+DROP_SEARCH_VECTOR_TRIGGER = """
+DROP TRIGGER IF EXISTS cars_car_search_vector_trigger ON cars_car;
+DROP FUNCTION IF EXISTS cars_car_search_vector_update();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0018_car_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='car',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunSQL(SEARCH_VECTOR_TRIGGER, DROP_SEARCH_VECTOR_TRIGGER),
+        migrations.AddIndex(
+            model_name='car',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='car_search_vector_gin'),
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:47
+
+from django.db import migrations, models
+
+
+def drop_car_documents(apps, schema_editor):
+    # Images / reasons are now rendered in sort_order; documents are
+    # rebuilt on first read (or by rebuild_car_documents)
+    apps.get_model('cars', 'CarDocument').objects.all().delete()
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0020_car_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='carimage',
+            options={'ordering': ['sort_order', 'id']},
+        ),
+        migrations.AlterModelOptions(
+            name='carreasontobuy',
+            options={'ordering': ['sort_order', 'id']},
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['-created_at'], name='car_created'),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['availability_status', 'price'], name='car_avail_price'),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['availability_status', '-created_at'], name='car_avail_created'),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['brand', 'model'], name='car_brand_model'),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['city'], name='car_city'),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['year', 'km'], name='car_year_km'),
+        ),
+        migrations.AddIndex(
+            model_name='carfeature',
+            index=models.Index(fields=['car', 'status'], name='carfeature_car_status'),
+        ),
+        migrations.AddIndex(
+            model_name='carimage',
+            index=models.Index(fields=['car', 'sort_order'], name='carimage_car_sort'),
+        ),
+        migrations.AddIndex(
+            model_name='carinspectionsectionscore',
+            index=models.Index(fields=['car', 'score'], name='carsectionscore_car_score'),
+        ),
+        migrations.AddIndex(
+            model_name='carinspectionsubsectionremarks',
+            index=models.Index(fields=['car', 'status'], name='carsubremarks_car_status'),
+        ),
+        migrations.AddIndex(
+            model_name='carreasontobuy',
+            index=models.Index(fields=['car', 'sort_order'], name='carreason_car_sort'),
+        ),
+        migrations.AddIndex(
+            model_name='inspectionitem',
+            index=models.Index(condition=models.Q(('status', 'major')), fields=['car'], name='inspitem_major_car'),
+        ),
+        migrations.RunPython(drop_car_documents, migrations.RunPython.noop),
+    ]
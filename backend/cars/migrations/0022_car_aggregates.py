@@ -0,0 +1,103 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:52
+
+from django.db import migrations, models
+
+
+# Same definitions as cars/aggregates.py; later drift is reported and
+# fixed by the repair_car_aggregates command
+BACKFILL_AGGREGATES = """
+UPDATE cars_car c SET
+    image_count = (SELECT COUNT(*) FROM cars_carimage t WHERE t.car_id = c.id),
+    reason_count = (SELECT COUNT(*) FROM cars_carreasontobuy t WHERE t.car_id = c.id),
+    highlight_count = (SELECT COUNT(*) FROM cars_carhighlight t WHERE t.car_id = c.id),
+    feature_flawless_count = (SELECT COUNT(*) FROM cars_carfeature t WHERE t.car_id = c.id AND t.status = 'flawless'),
+    feature_little_flaw_count = (SELECT COUNT(*) FROM cars_carfeature t WHERE t.car_id = c.id AND t.status = 'little_flaw'),
+    feature_damaged_count = (SELECT COUNT(*) FROM cars_carfeature t WHERE t.car_id = c.id AND t.status = 'damaged'),
+    inspection_score = (SELECT ROUND(AVG(t.score), 1) FROM cars_carinspectionsectionscore t WHERE t.car_id = c.id),
+    min_section_score = (SELECT MIN(t.score) FROM cars_carinspectionsectionscore t WHERE t.car_id = c.id),
+    has_major_flaw = EXISTS (SELECT 1 FROM cars_inspectionitem t WHERE t.car_id = c.id AND t.status = 'major');
+"""
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0021_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='car',
+            name='feature_damaged_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='car',
+            name='feature_flawless_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='car',
+            name='feature_little_flaw_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='car',
+            name='has_major_flaw',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='car',
+            name='highlight_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='car',
+            name='image_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='car',
+            name='inspection_score',
+            field=models.DecimalField(decimal_places=1, editable=False, help_text='Average of the inspection section scores', max_digits=3, null=True),
+        ),
+        migrations.AddField(
+            model_name='car',
+            name='min_section_score',
+            field=models.DecimalField(decimal_places=1, editable=False, max_digits=3, null=True),
+        ),
+        migrations.AddField(
+            model_name='car',
+            name='reason_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunSQL(BACKFILL_AGGREGATES, migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['image_count'], name='car_image_count'),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['reason_count'], name='car_reason_count'),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['highlight_count'], name='car_highlight_count'),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['inspection_score'], name='car_inspection_score'),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(fields=['min_section_score'], name='car_min_section_score'),
+        ),
+        migrations.AddIndex(
+            model_name='car',
+            index=models.Index(condition=models.Q(('has_major_flaw', True)), fields=['has_major_flaw'], name='car_major_flaw'),
+        ),
+        # has_major_flaws now filters on Car.has_major_flaw
+        migrations.RemoveIndex(
+            model_name='inspectionitem',
+            name='inspitem_major_car',
+        ),
+    ]
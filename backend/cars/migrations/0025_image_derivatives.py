@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0024_csv_import_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageDerivative',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(help_text='Source image path under MEDIA_ROOT', max_length=255)),
+                ('source_digest', models.CharField(help_text='SHA-256 of the source file', max_length=64)),
+                ('format', models.CharField(max_length=10)),
+                ('width', models.PositiveIntegerField()),
+                ('height', models.PositiveIntegerField()),
+                ('file', models.CharField(help_text='Derivative path under MEDIA_ROOT', max_length=255)),
+                ('size', models.PositiveIntegerField(default=0, help_text='Bytes')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('source', 'format', 'width'), name='unique_image_derivative')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0026_cache_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='carcsvimport',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, help_text='Saved with every batch while running', null=True),
+        ),
+    ]
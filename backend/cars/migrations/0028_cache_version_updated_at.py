@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:36
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def stamp_versions(apps, schema_editor):
+    apps.get_model('cars', 'CacheVersion').objects.update(updated_at=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cars', '0027_csv_import_heartbeat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cacheversion',
+            name='updated_at',
+            field=models.DateTimeField(blank=True, help_text='Time of the last bump', null=True),
+        ),
+        migrations.RunPython(stamp_versions, migrations.RunPython.noop),
+    ]
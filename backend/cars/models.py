@@ -146,6 +146,8 @@ class OTP(models.Model):
 
 import uuid
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 
 
 # -------------------------
@@ -265,6 +267,50 @@ class Car(models.Model):
     metadata = models.JSONField(default=dict, blank=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
+    # Also bumped when child rows / dealer change (see cars/signals.py)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    # Weighted full-text vector, maintained by a DB trigger (migration 0019)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    # Denormalized child aggregates, kept in sync by cars/aggregates.py
+    image_count = models.PositiveIntegerField(default=0, editable=False)
+    reason_count = models.PositiveIntegerField(default=0, editable=False)
+    highlight_count = models.PositiveIntegerField(default=0, editable=False)
+    feature_flawless_count = models.PositiveIntegerField(default=0, editable=False)
+    feature_little_flaw_count = models.PositiveIntegerField(default=0, editable=False)
+    feature_damaged_count = models.PositiveIntegerField(default=0, editable=False)
+    inspection_score = models.DecimalField(
+        max_digits=3,
+        decimal_places=1,
+        null=True,
+        editable=False,
+        help_text="Average of the inspection section scores"
+    )
+    min_section_score = models.DecimalField(max_digits=3, decimal_places=1, null=True, editable=False)
+    has_major_flaw = models.BooleanField(default=False, editable=False)
+
+    class Meta:
+        indexes = [
+            # CarFilter / ordering hot paths (plans checked by cars.tests.FilterIndexTests)
+            models.Index(fields=["-created_at"], name="car_created"),
+            models.Index(fields=["availability_status", "price"], name="car_avail_price"),
+            models.Index(fields=["availability_status", "-created_at"], name="car_avail_created"),
+            models.Index(fields=["brand", "model"], name="car_brand_model"),
+            models.Index(fields=["city"], name="car_city"),
+            models.Index(fields=["year", "km"], name="car_year_km"),
+            models.Index(fields=["image_count"], name="car_image_count"),
+            models.Index(fields=["reason_count"], name="car_reason_count"),
+            models.Index(fields=["highlight_count"], name="car_highlight_count"),
+            models.Index(fields=["inspection_score"], name="car_inspection_score"),
+            models.Index(fields=["min_section_score"], name="car_min_section_score"),
+            models.Index(fields=["has_major_flaw"], name="car_major_flaw", condition=models.Q(has_major_flaw=True)),
+            GinIndex(fields=["search_vector"], name="car_search_vector_gin"),
+            # pg_trgm indexes for typo-tolerant search (migration 0020)
+            GinIndex(fields=["title"], name="car_title_trgm", opclasses=["gin_trgm_ops"]),
+            GinIndex(fields=["brand"], name="car_brand_trgm", opclasses=["gin_trgm_ops"]),
+            GinIndex(fields=["model"], name="car_model_trgm", opclasses=["gin_trgm_ops"]),
+        ]
 
     def __str__(self):
         return self.title
@@ -288,6 +334,12 @@ class CarImage(models.Model):
     caption = models.CharField(max_length=255, blank=True)
     sort_order = models.PositiveIntegerField(default=0)
 
+    class Meta:
+        ordering = ["sort_order", "id"]
+        indexes = [
+            models.Index(fields=["car", "sort_order"], name="carimage_car_sort"),
+        ]
+
 
 # -------------------------
 # HIGHLIGHTS
@@ -320,12 +372,16 @@ class CarReasonToBuy(models.Model):
     sort_order = models.PositiveIntegerField(default=0)
 
     class Meta:
+        ordering = ["sort_order", "id"]
         constraints = [
             models.UniqueConstraint(
                 fields=["car", "title"],
                 name="unique_car_reason_to_buy"
             )
         ]
+        indexes = [
+            models.Index(fields=["car", "sort_order"], name="carreason_car_sort"),
+        ]
 
 
 # -------------------------
@@ -382,6 +438,9 @@ class CarFeature(models.Model):
                 name="unique_car_feature"
             )
         ]
+        indexes = [
+            models.Index(fields=["car", "status"], name="carfeature_car_status"),
+        ]
 
 
 # -------------------------
@@ -459,6 +518,9 @@ class CarInspectionSectionScore(models.Model):
                 name="unique_car_section_score"
             )
         ]
+        indexes = [
+            models.Index(fields=["car", "score"], name="carsectionscore_car_score"),
+        ]
 
 
 # Car-specific subsection remarks
@@ -480,4 +542,121 @@ class CarInspectionSubSectionRemarks(models.Model):
                 fields=["car", "subsection"],
                 name="unique_car_subsection_remarks"
             )
-        ]
\ No newline at end of file
+        ]
+        indexes = [
+            models.Index(fields=["car", "status"], name="carsubremarks_car_status"),
+        ]
+
+# -------------------------
+# MATERIALIZED CAR DOCUMENT
+# -------------------------
+class CarDocument(models.Model):
+    """
+    Fully rendered CarDetailSerializer output for one car, stored as JSON
+    text (key order preserved) and rebuilt whenever the car or one of its
+    child rows changes. See cars/documents.py.
+    """
+    car = models.OneToOneField(Car, on_delete=models.CASCADE, primary_key=True, related_name="document")
+    body = models.TextField(help_text="Rendered car detail JSON")
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+# -------------------------
+# IMPORT MANIFEST
+# -------------------------
+class ImportedRow(models.Model):
+    """
+    Digest of the CSV row last imported for one natural key of a table,
+    and the row (or, for car images, the car) it was written to. Re-runs
+    skip the rows whose digest is unchanged. See cars/importer.py.
+    """
+    table = models.CharField(max_length=100)
+    key = models.TextField(help_text="Natural key columns of the CSV row")
+    digest = models.CharField(max_length=40)
+    object_id = models.CharField(max_length=64)
+    imported_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["table", "key"], name="unique_imported_row"),
+        ]
+
+
+# -------------------------
+# CSV UPLOADS
+# -------------------------
+class CarCSVImport(models.Model):
+    """
+    One dealer CSV upload, spooled to disk and imported in the background
+    by cars/uploads.py. Progress and the heartbeat are saved after every
+    batch; a running job whose heartbeat stopped can be queued again.
+    """
+    STATUS_CHOICES = [
+        ("queued", "Queued"),
+        ("running", "Running"),
+        ("succeeded", "Succeeded"),
+        ("failed", "Failed"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    dealer = models.ForeignKey(Dealer, on_delete=models.SET_NULL, null=True, related_name="csv_imports")
+    file_name = models.CharField(max_length=255, blank=True)
+    path = models.CharField(max_length=500, help_text="Spooled upload, removed once imported")
+    size = models.PositiveBigIntegerField(default=0, help_text="Bytes")
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="queued", db_index=True)
+    bytes_read = models.PositiveBigIntegerField(default=0)
+    rows = models.PositiveIntegerField(default=0)
+    inserted = models.PositiveIntegerField(default=0)
+    updated = models.PositiveIntegerField(default=0)
+    unchanged = models.PositiveIntegerField(default=0)
+    error_count = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True, help_text="[row number, message] of the first invalid rows")
+    message = models.TextField(blank=True, help_text="Why the import failed")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True, help_text="Saved with every batch while running")
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+
+# -------------------------
+# IMAGE DERIVATIVES
+# -------------------------
+class ImageDerivative(models.Model):
+    """
+    One resized / re-encoded variant of a media image (CarImage.image,
+    Car.thumbnail), stored under a name derived from the source's content
+    hash. Keyed by the source path, not the image row: re-imports replace
+    a car's image rows. See cars/images.py.
+    """
+    source = models.CharField(max_length=255, help_text="Source image path under MEDIA_ROOT")
+    source_digest = models.CharField(max_length=64, help_text="SHA-256 of the source file")
+    format = models.CharField(max_length=10)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    file = models.CharField(max_length=255, help_text="Derivative path under MEDIA_ROOT")
+    size = models.PositiveIntegerField(default=0, help_text="Bytes")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["source", "format", "width"], name="unique_image_derivative"),
+        ]
+
+
+# -------------------------
+# CACHE VERSIONS
+# -------------------------
+class CacheVersion(models.Model):
+    """
+    Named counter bumped after every car / master data write (see
+    cars/cache.py). Kept in the database so that every process (web
+    workers, imports, the upload runner) keys its caches on the same value.
+    """
+    name = models.CharField(max_length=50, primary_key=True)
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(null=True, blank=True, help_text="Time of the last bump")
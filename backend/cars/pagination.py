@@ -1,6 +1,287 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import json
+from collections import OrderedDict
+from functools import partial
+
+from django.core.exceptions import FieldDoesNotExist
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db.models import F, Q, QuerySet
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .counts import count_cars
+
+
+class CarPage(Page):
+    """Page whose "next" is known from one extra row fetched, not from the count."""
+
+    def __init__(self, object_list, number, paginator, has_more=None):
+        super().__init__(object_list, number, paginator)
+        self.has_more = has_more
+
+    def has_next(self):
+        if self.has_more is None:
+            return super().has_next()
+        return self.has_more
+
+
+class CarCountPaginator(Paginator):
+    """
+    Paginator whose total comes from the cached / estimated count service.
+
+    A planner estimate is only displayed: pages are then sliced without
+    it (page_size + 1 rows tell whether there is a next one), so an
+    under-estimate never rejects real trailing pages and an over-estimate
+    never serves empty ones.
+    """
+
+    def __init__(self, *args, query_params=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.query_params = query_params
+        self.count_exact = True
+
+    @cached_property
+    def count(self):
+        if not isinstance(self.object_list, QuerySet):
+            # Ids already matched in memory (cars.columnar)
+            return len(self.object_list)
+        count, self.count_exact = count_cars(self.object_list, self.query_params)
+        return count
+
+    def validate_number(self, number):
+        self.count  # sets count_exact
+        if self.count_exact:
+            return super().validate_number(number)
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(_("That page number is not an integer"))
+        if number < 1:
+            raise EmptyPage(_("That page number is less than 1"))
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if self.count_exact:
+            return super().page(number)
+
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage(_("That page contains no results"))
+        return CarPage(rows[:self.per_page], number, self, has_more=len(rows) > self.per_page)
+
+    def _get_page(self, *args, **kwargs):
+        return CarPage(*args, **kwargs)
+
 
 class CarPagination(PageNumberPagination):
     page_size = 30                 # cards per page
     page_size_query_param = "page_size"
     max_page_size = 50
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.django_paginator_class = partial(CarCountPaginator, query_params=request.query_params)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ("count", self.page.paginator.count),
+            ("count_exact", self.page.paginator.count_exact),
+            ("next", self.get_next_link()),
+            ("previous", self.get_previous_link()),
+            ("results", data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema["properties"]["count_exact"] = {
+            "type": "boolean",
+            "description": "False when count is a planner estimate (pages and next do not depend on it)",
+        }
+        return response_schema
+
+
+class CarCursorPagination(BasePagination):
+    """
+    Keyset pagination: no COUNT(*), no OFFSET.
+
+    The page boundary is the (ordering fields..., id) tuple of the last /
+    first row, encoded in an opaque cursor, so page N costs the same as
+    page 1. Any ordering applied by OrderingFilter is supported; NULLs
+    sort last in both directions and `id` breaks ties.
+    """
+    page_size = 30
+    page_size_query_param = "page_size"
+    max_page_size = 50
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+
+        self.ordering = self.get_ordering(queryset)
+        self.model = queryset.model
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor["r"])
+
+        if cursor:
+            queryset = queryset.filter(self.after(cursor["v"], reverse))
+        # Cursor keys are read from annotations: ordering columns may be
+        # deferred by the card projection.
+        queryset = queryset.annotate(**{
+            f"cursor_key_{i}": F(field) for i, (field, _) in enumerate(self.ordering)
+        }).order_by(*self.order_by(reverse))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        # Walking backwards, "more" means there is a previous page
+        if reverse:
+            self.has_previous, self.has_next = has_more, True
+        else:
+            self.has_previous, self.has_next = cursor is not None, has_more
+
+        self.page = rows
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ("next", self.get_next_link()),
+            ("previous", self.get_previous_link()),
+            ("results", data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    # -------------------------
+    # ORDERING / KEYSET FILTER
+    # -------------------------
+    def get_ordering(self, queryset):
+        """[(field, descending), ...] ending with the id tie-breaker."""
+        ordering = []
+        for name in queryset.query.order_by:
+            if not isinstance(name, str):
+                continue
+            field = name.lstrip("-")
+            if field in ("pk", "id"):
+                break
+            ordering.append((field, name.startswith("-")))
+
+        descending = ordering[-1][1] if ordering else False
+        ordering.append(("pk", descending))
+        return ordering
+
+    def order_by(self, reverse):
+        # Walking backwards inverts every key, NULLs included
+        nulls = {"nulls_first": True} if reverse else {"nulls_last": True}
+        exprs = []
+        for field, descending in self.ordering:
+            if descending != reverse:
+                exprs.append(F(field).desc(**nulls))
+            else:
+                exprs.append(F(field).asc(**nulls))
+        return exprs
+
+    def after(self, values, reverse):
+        """
+        Rows strictly after `values` in the (possibly reversed) ordering:
+        OR over i of (keys[:i] equal AND key[i] past values[i]).
+        """
+        condition = Q(pk__in=[])
+        equal = Q()
+        for (field, descending), value in zip(self.ordering, values):
+            ascending = descending == reverse  # direction walked for this key
+            if value is None:
+                # NULLs sort last: nothing follows a NULL, every value precedes it
+                past = Q(**{f"{field}__isnull": False}) if reverse else None
+                eq = Q(**{f"{field}__isnull": True})
+            else:
+                past = Q(**{f"{field}__{'gt' if ascending else 'lt'}": value})
+                if not reverse:
+                    past |= Q(**{f"{field}__isnull": True})
+                eq = Q(**{field: value})
+
+            if past is not None:
+                condition |= equal & past
+            equal &= eq
+        return condition
+
+    # -------------------------
+    # CURSORS
+    # -------------------------
+    def row_values(self, row):
+        return [getattr(row, f"cursor_key_{i}") for i in range(len(self.ordering))]
+
+    def encode_cursor(self, row, reverse):
+        payload = {
+            "o": [("-" if desc else "") + field for field, desc in self.ordering],
+            "v": [None if v is None else str(v) for v in self.row_values(row)],
+            "r": reverse,
+        }
+        token = base64.urlsafe_b64encode(json.dumps(payload).encode("utf-8")).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+            ordering = [("-" if desc else "") + field for field, desc in self.ordering]
+            if payload["o"] != ordering or len(payload["v"]) != len(ordering):
+                raise ValueError
+            values = []
+            for (field, _), raw in zip(self.ordering, payload["v"]):
+                values.append(None if raw is None else self.parse_value(field, raw))
+            return {"v": values, "r": bool(payload["r"])}
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def parse_value(self, field, raw):
+        if field == "pk":
+            return self.model._meta.pk.to_python(raw)
+        try:
+            return self.model._meta.get_field(field).to_python(raw)
+        except FieldDoesNotExist:
+            # Annotation such as search_rank
+            return float(raw)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
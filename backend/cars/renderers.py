@@ -0,0 +1,49 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+# Values orjson does not handle itself (Decimal, lazy strings, sets,
+# datetimes, ...) are converted exactly as DRF's encoder does
+_drf_default = JSONEncoder().default
+
+if orjson is not None:
+    # DRF writes UTC datetimes with a "Z" suffix and dataclasses are not
+    # JSON for it: route both through _drf_default
+    ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer encoding with orjson (C) when it is installed, producing
+    the same bytes as DRF's compact UTF-8 output. Falls back to
+    JSONRenderer without orjson, for ?indent / non-compact settings and
+    for anything orjson refuses (non-string keys, huge ints).
+
+    Only differences: floats that Python writes in exponent form
+    (|x| < 1e-4 or >= 1e16) come out as "1e16" / "0.00001" instead of
+    "1e+16" / "1e-05" (same value), and NaN / Infinity, which
+    JSONRenderer rejects, are written as null.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            content = orjson.dumps(data, default=_drf_default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Escaped by JSONRenderer so the JSON is also valid JavaScript
+        return content.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
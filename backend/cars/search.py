@@ -0,0 +1,85 @@
+import re
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db import connections
+from django.db.models import F, FloatField, Q
+from django.db.models.functions import Cast, Greatest
+
+
+SEARCH_MODE_CHOICES = [
+    ("fts", "Full-text + trigram"),
+    ("legacy", "icontains"),
+]
+
+# Fields matched by the legacy icontains search
+LEGACY_SEARCH_FIELDS = [
+    "title",
+    "brand",
+    "model",
+    "city",
+    "colorKey",
+    "car_code",
+    "registration_number",
+]
+
+# Trigram (typo tolerant) matching, each backed by a gin_trgm_ops index
+TRIGRAM_SEARCH_FIELDS = ["title", "brand", "model"]
+
+
+def get_search_mode(requested, queryset):
+    """Requested mode, else CAR_SEARCH_MODE; full-text needs Postgres."""
+    mode = requested or settings.CAR_SEARCH_MODE
+    if mode == "fts" and connections[queryset.db].vendor != "postgresql":
+        return "legacy"
+    return mode
+
+
+def legacy_search(queryset, value):
+    q = Q()
+    for field in LEGACY_SEARCH_FIELDS:
+        q |= Q(**{f"{field}__icontains": value})
+    return queryset.filter(q)
+
+
+def prefix_query(value):
+    """'hyund cre' -> hyund:* & cre:* (every word, as a prefix)."""
+    words = re.findall(r"\w+", value.lower())
+    if not words:
+        return None
+    return SearchQuery(
+        " & ".join(f"{word}:*" for word in words),
+        search_type="raw",
+        config="simple",
+    )
+
+
+def fulltext_search(queryset, value):
+    """
+    Match the weighted search_vector with prefix terms, OR (when enabled)
+    trigram word similarity on title/brand/model for typos. Annotates
+    `search_rank` (ts_rank + best trigram similarity) for relevance ordering.
+    """
+    query = prefix_query(value)
+    if query is None:
+        # Punctuation only: nothing to tokenize
+        return legacy_search(queryset, value)
+
+    match = Q(search_vector=query)
+    rank = SearchRank(F("search_vector"), query)
+
+    if settings.CAR_SEARCH_TRIGRAM:
+        for field in TRIGRAM_SEARCH_FIELDS:
+            match |= Q(**{f"{field}__trigram_word_similar": value})
+        rank = rank + Greatest(*[
+            TrigramWordSimilarity(value, field) for field in TRIGRAM_SEARCH_FIELDS
+        ])
+
+    # ts_rank / similarity are float4; double precision keeps cursor values exact
+    return queryset.filter(match).annotate(search_rank=Cast(rank, FloatField()))
+
+
+def search_cars(queryset, value, mode=None):
+    if get_search_mode(mode, queryset) == "legacy":
+        return legacy_search(queryset, value)
+    return fulltext_search(queryset, value)
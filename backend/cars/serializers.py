@@ -29,8 +29,50 @@
 #         return super().create(validated_data)
 
 
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.utils import timezone
 from rest_framework import serializers
 from .models import *
+from .inspection_tree import build_inspection_tree, load_inspection_sections
+from .aggregates import AGGREGATE_FIELDS
+
+
+# -------------------------
+# IMAGE SRCSETS
+# -------------------------
+def image_srcsets(names):
+    """{source path: {format: "url 320w, url 640w, ..."}} of the recorded derivatives (cars/images.py)."""
+    names = {name for name in names if name}
+    if not names:
+        return {}
+    urls = {}
+    rows = (
+        ImageDerivative.objects
+        .filter(source__in=names)
+        .order_by("source", "width")
+        .values_list("source", "format", "width", "file")
+    )
+    for source, fmt, width, file in rows:
+        urls.setdefault(source, {}).setdefault(fmt, []).append(f"{default_storage.url(file)} {width}w")
+
+    # In CAR_IMAGE_FORMATS order: <source> elements are tried first to last
+    order = {fmt: i for i, fmt in enumerate(settings.CAR_IMAGE_FORMATS)}
+    return {
+        source: {fmt: ", ".join(by_format[fmt]) for fmt in sorted(by_format, key=lambda f: order.get(f, len(order)))}
+        for source, by_format in urls.items()
+    }
+
+
+def car_image_srcsets(cars):
+    """image_srcsets() of the cars' thumbnails and (prefetched) images, in one query."""
+    names = set()
+    for car in cars:
+        if "thumbnail" not in car.get_deferred_fields() and car.thumbnail:
+            names.add(car.thumbnail.name)
+        if "images" in getattr(car, "_prefetched_objects_cache", {}):
+            names.update(image.image.name for image in car.images.all())
+    return image_srcsets(names)
 
 
 # -------------------------
@@ -59,10 +101,18 @@ class CarReasonToBuySerializer(serializers.ModelSerializer):
 
 class CarImageSerializer(serializers.ModelSerializer):
     category = serializers.CharField(source="category.key")
+    srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = CarImage
-        fields = ["category", "image", "caption", "sort_order"]
+        fields = ["category", "image", "srcset", "caption", "sort_order"]
+
+    def get_srcset(self, obj):
+        """{format: srcset} of the image's derivatives ({} until generated)."""
+        srcsets = self.context.get("image_srcsets")
+        if srcsets is None:
+            srcsets = image_srcsets([obj.image.name])
+        return srcsets.get(obj.image.name, {})
 
 
 class CarSpecSerializer(serializers.ModelSerializer):
@@ -93,6 +143,7 @@ class InspectionItemSerializer(serializers.ModelSerializer):
 class CarDetailSerializer(serializers.ModelSerializer):
     dealer = DealerMiniSerializer(read_only=True)
 
+    thumbnail_srcset = serializers.SerializerMethodField()
     images = serializers.SerializerMethodField()
     highlights = CarHighlightSerializer(many=True)
     reasons_to_buy = CarReasonToBuySerializer(many=True)
@@ -102,13 +153,36 @@ class CarDetailSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Car
-        fields = "__all__"
+        # updated_at is exposed through ETag / Last-Modified headers,
+        # search_vector and the aggregate columns are internal (filters / ordering)
+        exclude = ["updated_at", "search_vector", *AGGREGATE_FIELDS]
+
+    def get_srcsets(self):
+        """
+        image_srcsets() of every car under the root serializer, loaded
+        once (or given as context["image_srcsets"]).
+        """
+        srcsets = self.context.get("image_srcsets")
+        if srcsets is None:
+            root = self.root
+            if not hasattr(root, "_image_srcsets"):
+                cars = root.instance if isinstance(root, serializers.ListSerializer) else [root.instance]
+                root._image_srcsets = car_image_srcsets(cars)
+            srcsets = root._image_srcsets
+        return srcsets
+
+    def get_thumbnail_srcset(self, obj):
+        if not obj.thumbnail:
+            return {}
+        return self.get_srcsets().get(obj.thumbnail.name, {})
 
     def get_images(self, obj):
         data = {}
+        # No request in the context: image URLs stay relative, as before
+        context = {"image_srcsets": self.get_srcsets()}
         for img in obj.images.all():
             data.setdefault(img.category.key, []).append(
-                CarImageSerializer(img).data
+                CarImageSerializer(img, context=context).data
             )
         return data
 
@@ -129,44 +203,80 @@ class CarDetailSerializer(serializers.ModelSerializer):
         return data
 
     def get_inspections(self, obj):
-        result = []
-        for section in InspectionSection.objects.all():
-            # Get section score and rating for this car
-            section_score = obj.inspection_section_scores.filter(section=section).first()
-            
-            subs = []
-            for sub in section.subsections.all():
-                items = obj.inspection_items.filter(subsection=sub)
-                # Get subsection remarks for this car
-                subsection_remarks = obj.inspection_subsection_remarks.filter(subsection=sub).first()
-                
-                # Include subsection if it has items, remarks, or if section has a score (for sections like supporting_systems)
-                if items.exists() or subsection_remarks or section_score:
-                    subs.append({
-                        "key": sub.key,
-                        "title": sub.title,
-                        "status": subsection_remarks.status if subsection_remarks else "",
-                        "remarks": subsection_remarks.remarks if subsection_remarks else (sub.remarks if sub.remarks else ""),
-                        "items": InspectionItemSerializer(items, many=True).data if items.exists() else []
-                    })
-            
-            # Include section even if no subsections, if it has a score
-            if subs or section_score:
-                section_data = {
-                    "key": section.key,
-                    "title": section.title,
-                    "description": section.description,
-                    "subsections": subs
-                }
-                
-                # Add score, rating, status, and remarks if available
-                if section_score:
-                    section_data["score"] = float(section_score.score)
-                    section_data["rating"] = section_score.rating
-                    if section_score.status:
-                        section_data["status"] = section_score.status
-                    if section_score.remarks:
-                        section_data["remarks"] = section_score.remarks
-                
-                result.append(section_data)
-        return result
+        # Master data is loaded once per request and shared by every car
+        # serialized under the same root (list pages included).
+        sections = self.context.get("inspection_sections")
+        if sections is None:
+            sections = load_inspection_sections()
+            self.context["inspection_sections"] = sections
+        return build_inspection_tree(obj, sections, InspectionItemSerializer)
+
+
+# -------------------------
+# CAR CARD SERIALIZER (LISTING)
+# -------------------------
+CAR_CARD_FIELDS = [
+    "id", "car_code", "title", "brand", "model", "year",
+    "price", "discount_price", "emi", "km",
+    "fuel", "transmission", "body", "seats",
+    "city", "rto", "colorKey", "thumbnail", "thumbnail_srcset",
+    "owner_count", "availability_status", "tags",
+    "dealer", "created_at",
+]
+
+# Nested sections a listing can opt into via ?expand=
+CAR_CARD_EXPANDABLE_FIELDS = [
+    "images", "highlights", "reasons_to_buy",
+    "specs", "features", "inspections",
+]
+
+
+class CarCardSerializer(CarDetailSerializer):
+    """
+    Slim listing card. Only CAR_CARD_FIELDS are rendered by default;
+    nested sections are opt-in through `expand` and top-level columns
+    can be narrowed with `fields` (both read from the serializer context).
+    """
+
+    class Meta:
+        model = Car
+        fields = CAR_CARD_FIELDS + CAR_CARD_EXPANDABLE_FIELDS
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        allowed = set(self.context.get("fields") or CAR_CARD_FIELDS)
+        allowed.update(self.context.get("expand") or ())
+        for name in list(self.fields):
+            if name not in allowed:
+                self.fields.pop(name)
+
+
+# -------------------------
+# CSV UPLOAD JOBS
+# -------------------------
+class CarCSVImportSerializer(serializers.ModelSerializer):
+    """Status / progress of a dealer CSV upload (cars/uploads.py)."""
+
+    progress = serializers.SerializerMethodField()
+    rows_per_second = serializers.SerializerMethodField()
+
+    class Meta:
+        model = CarCSVImport
+        fields = [
+            "id", "status", "dealer", "file_name", "size", "bytes_read", "progress",
+            "rows", "inserted", "updated", "unchanged", "rows_per_second",
+            "error_count", "errors", "message",
+            "created_at", "started_at", "heartbeat_at", "finished_at",
+        ]
+
+    def get_progress(self, obj):
+        """Share of the file read, 0-1."""
+        if obj.status == "succeeded" or not obj.size:
+            return 1.0 if obj.status == "succeeded" else 0.0
+        return round(min(obj.bytes_read / obj.size, 1.0), 3)
+
+    def get_rows_per_second(self, obj):
+        if not obj.started_at:
+            return None
+        seconds = ((obj.finished_at or timezone.now()) - obj.started_at).total_seconds()
+        return round(obj.rows / seconds, 1) if seconds > 0 else None
@@ -0,0 +1,125 @@
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+
+from . import aggregates
+from .cache import invalidate_cars, invalidate_catalog
+from .conditional import touch_all_cars, touch_cars
+from .documents import invalidate_all_car_documents, invalidate_car_documents
+from .images import enqueue_derivatives
+from .models import (
+    Car,
+    CarFeature,
+    CarHighlight,
+    CarImage,
+    CarImageCategory,
+    CarInspectionSectionScore,
+    CarInspectionSubSectionRemarks,
+    CarReasonToBuy,
+    CarSpec,
+    Dealer,
+    FeatureCategory,
+    InspectionItem,
+    InspectionSection,
+    InspectionSubSection,
+    SpecCategory,
+)
+
+
+# Rows rendered inside a car document (all have a `car` FK)
+CAR_CHILD_MODELS = [
+    CarImage,
+    CarHighlight,
+    CarReasonToBuy,
+    CarSpec,
+    CarFeature,
+    InspectionItem,
+    CarInspectionSectionScore,
+    CarInspectionSubSectionRemarks,
+]
+
+# Shared lookup rows whose keys/titles end up in every document
+MASTER_MODELS = [
+    CarImageCategory,
+    SpecCategory,
+    FeatureCategory,
+    InspectionSection,
+    InspectionSubSection,
+]
+
+
+def car_saved(sender, instance, **kwargs):
+    invalidate_car_documents([instance.pk])
+    invalidate_cars([instance.pk])
+
+
+def car_deleted(sender, instance, **kwargs):
+    invalidate_cars([instance.pk])
+
+
+def car_child_changed(sender, instance, origin=None, **kwargs):
+    # Rows cascading from a car delete leave nothing to aggregate
+    if not (isinstance(origin, Car) or getattr(origin, "model", None) is Car):
+        aggregates.child_rows_changed(sender, [instance.car_id])
+    touch_cars([instance.car_id])
+    invalidate_car_documents([instance.car_id])
+    invalidate_cars([instance.car_id])
+
+
+def dealer_changed(sender, instance, **kwargs):
+    # Also runs on pre_delete: cars are detached by a bulk SET NULL
+    # afterwards, which sends no per-car signals.
+    car_ids = list(instance.cars.values_list("pk", flat=True))
+    touch_cars(car_ids)
+    invalidate_car_documents(car_ids)
+    invalidate_cars(car_ids)
+
+
+def master_changed(sender, instance, **kwargs):
+    touch_all_cars()
+    invalidate_all_car_documents()
+    invalidate_catalog()
+
+
+# Image field of the models whose saved files get derivatives
+IMAGE_FIELDS = {CarImage: "image", Car: "thumbnail"}
+
+
+def image_changing(sender, instance, update_fields=None, **kwargs):
+    # The stored file name, to tell a new upload from any other save
+    field = IMAGE_FIELDS[sender]
+    instance._stored_image = None
+    if update_fields is not None and field not in update_fields:
+        instance._stored_image = getattr(instance, field).name
+    elif not instance._state.adding:
+        instance._stored_image = sender.objects.filter(pk=instance.pk).values_list(field, flat=True).first()
+
+
+def image_saved(sender, instance, **kwargs):
+    # Single uploads (admin): derivatives in the background once the row
+    # is committed, and only when the file changed. Bulk imports send no
+    # signals and run generate_derivatives() themselves.
+    name = getattr(instance, IMAGE_FIELDS[sender]).name
+    if name and name != getattr(instance, "_stored_image", None):
+        car_id = instance.car_id if sender is CarImage else instance.pk
+        enqueue_derivatives({name: {car_id}})
+
+
+def connect_signals():
+    post_save.connect(car_saved, sender=Car, dispatch_uid="cars_car_saved")
+    post_delete.connect(car_deleted, sender=Car, dispatch_uid="cars_car_deleted")
+    post_save.connect(dealer_changed, sender=Dealer, dispatch_uid="cars_dealer_saved")
+    pre_delete.connect(dealer_changed, sender=Dealer, dispatch_uid="cars_dealer_deleted")
+
+    for model in IMAGE_FIELDS:
+        uid = f"cars_{model.__name__}_derivatives"
+        pre_save.connect(image_changing, sender=model, dispatch_uid=f"{uid}_changing")
+        post_save.connect(image_saved, sender=model, dispatch_uid=f"{uid}_saved")
+
+    for model in CAR_CHILD_MODELS:
+        uid = f"cars_{model.__name__}"
+        post_save.connect(car_child_changed, sender=model, dispatch_uid=f"{uid}_saved")
+        post_delete.connect(car_child_changed, sender=model, dispatch_uid=f"{uid}_deleted")
+
+    for model in MASTER_MODELS:
+        uid = f"cars_{model.__name__}"
+        post_save.connect(master_changed, sender=model, dispatch_uid=f"{uid}_saved")
+        post_delete.connect(master_changed, sender=model, dispatch_uid=f"{uid}_deleted")
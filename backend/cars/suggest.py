@@ -0,0 +1,157 @@
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+
+from django.conf import settings
+from django.db import connections
+
+from .cache import catalog_version
+from .models import Car
+
+
+# Suggestion type -> Car field, in response order (a subset of the
+# fields ?search= covers)
+SUGGEST_FIELDS = {
+    "brand": "brand",
+    "model": "model",
+    "city": "city",
+    "title": "title",
+    "car_code": "car_code",
+}
+
+DEFAULT_LIMIT = 5
+MAX_LIMIT = 20
+
+# Top MAX_LIMIT results are precomputed for prefixes up to this length;
+# longer prefixes rank at most MAX_SCAN keys of their range.
+PRECOMPUTED_PREFIX_LENGTH = 3
+MAX_SCAN = 512
+
+
+def normalize(text):
+    return " ".join(re.findall(r"\w+", text.lower()))
+
+
+def index_keys(value):
+    """'2019 Hyundai Creta' -> ['2019 hyundai creta', 'hyundai creta', 'creta']"""
+    words = normalize(value).split()
+    return [" ".join(words[i:]) for i in range(len(words))]
+
+
+class PrefixIndex:
+    """
+    Sorted word-start keys per suggestion type, searched with bisect.
+
+    Each distinct value is indexed under every word it contains, so "cre"
+    finds "2019 Hyundai Creta". Results are ranked by car count, then value.
+    """
+
+    def __init__(self, rows):
+        counters = {name: Counter() for name in SUGGEST_FIELDS}
+        for row in rows:
+            for name, value in zip(SUGGEST_FIELDS, row):
+                if value and value.strip():
+                    counters[name][value.strip()] += 1
+
+        self.types = {}
+        for name, counter in counters.items():
+            # Entry position == rank, so "best" is simply "smallest index"
+            entries = sorted(counter.items(), key=lambda item: (-item[1], item[0]))
+            pairs = []
+            top = {}
+            for position, (value, _) in enumerate(entries):
+                for key in index_keys(value):
+                    pairs.append((key, position))
+                    for length in range(1, min(len(key), PRECOMPUTED_PREFIX_LENGTH) + 1):
+                        ranked = top.setdefault(key[:length], [])
+                        if len(ranked) < MAX_LIMIT and ranked[-1:] != [position]:
+                            ranked.append(position)
+            pairs.sort()
+
+            self.types[name] = {
+                "entries": entries,
+                "keys": [key for key, _ in pairs],
+                "positions": [position for _, position in pairs],
+                "top": top,
+            }
+
+    def lookup(self, name, prefix, limit):
+        data = self.types[name]
+        if len(prefix) <= PRECOMPUTED_PREFIX_LENGTH:
+            positions = data["top"].get(prefix, [])[:limit]
+        else:
+            keys = data["keys"]
+            start = bisect_left(keys, prefix)
+            end = bisect_left(keys, prefix + "\uffff", start, min(len(keys), start + MAX_SCAN))
+            positions = sorted(set(data["positions"][start:end]))[:limit]
+
+        return [
+            {"value": data["entries"][position][0], "count": data["entries"][position][1]}
+            for position in positions
+        ]
+
+    def suggest(self, query, limit=DEFAULT_LIMIT):
+        prefix = normalize(query)
+        if not prefix:
+            return {name: [] for name in SUGGEST_FIELDS}
+        return {name: self.lookup(name, prefix, limit) for name in SUGGEST_FIELDS}
+
+
+# -------------------------
+# PER-PROCESS INDEX
+# -------------------------
+_lock = threading.Lock()
+_state = {
+    "index": None,
+    "version": None,
+    "checked_at": 0.0,
+    "rebuilding": False,
+}
+
+
+def build_suggest_index():
+    """One query over the car columns; returns (index, catalog version)."""
+    version = catalog_version()
+    rows = Car.objects.order_by().values_list(*SUGGEST_FIELDS.values()).iterator(chunk_size=5000)
+    return PrefixIndex(rows), version
+
+
+def _rebuild():
+    try:
+        index, version = build_suggest_index()
+        with _lock:
+            _state["index"], _state["version"] = index, version
+    finally:
+        _state["rebuilding"] = False
+        connections.close_all()
+
+
+def get_suggest_index():
+    """
+    The worker's index, built on first use. Every
+    CAR_SUGGEST_REFRESH_INTERVAL seconds the catalog version is compared
+    (one primary-key read, shared by all processes, so imports and writes
+    in other workers count too); when inventory changed the index is
+    rebuilt in a background thread and the old one keeps serving meanwhile.
+    """
+    if _state["index"] is None:
+        with _lock:
+            if _state["index"] is None:
+                _state["index"], _state["version"] = build_suggest_index()
+                _state["checked_at"] = time.monotonic()
+        return _state["index"]
+
+    now = time.monotonic()
+    if now - _state["checked_at"] >= settings.CAR_SUGGEST_REFRESH_INTERVAL:
+        _state["checked_at"] = now
+        if catalog_version() != _state["version"]:
+            with _lock:
+                start = not _state["rebuilding"]
+                _state["rebuilding"] = True
+            if start:
+                threading.Thread(target=_rebuild, daemon=True).start()
+
+    return _state["index"]
+
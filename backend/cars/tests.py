@@ -0,0 +1,747 @@
+import csv
+import io
+import tempfile
+import uuid
+from contextlib import redirect_stdout
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock, skipUnless
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.db.models import F
+from django.http import QueryDict
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+
+from .aggregates import defer_car_aggregates, sync_car_aggregates
+from .cache import bump_catalog_version
+from .columnar import build_columns, evaluate, np, refresh_columns
+from .documents import rebuild_car_documents
+from .filters import CarFilter
+from .importer import ImportStep, StepResult
+from .instrumentation import QueryBudgetExceeded
+from .renderers import FastJSONRenderer, orjson
+from .uploads import JobLost, _save, requeue_stale_jobs, run_import, validate_upload
+from .models import (
+    CacheVersion,
+    Car,
+    CarCSVImport,
+    CarDocument,
+    CarFeature,
+    CarHighlight,
+    CarImage,
+    CarImageCategory,
+    CarInspectionSectionScore,
+    CarReasonToBuy,
+    CarSpec,
+    Dealer,
+    FeatureCategory,
+    InspectionItem,
+    InspectionSection,
+    InspectionSubSection,
+    SpecCategory,
+    User,
+)
+
+
+# -------------------------
+# FIXTURES
+# -------------------------
+def create_catalog():
+    """A small catalog: two dealers, four cars with every kind of child row."""
+    dealers = [
+        Dealer.objects.create(
+            dealer_code="D1", name="Lucknow Motors", city="Lucknow", tier="premium", phone="+919800000001",
+        ),
+        Dealer.objects.create(dealer_code="D2", name="Delhi Cars", city="Delhi"),
+    ]
+    exterior = CarImageCategory.objects.create(key="exterior", label="Exterior")
+    engine = SpecCategory.objects.create(key="engine", title="Engine")
+    comfort = FeatureCategory.objects.create(key="comfort", title="Comfort")
+    section = InspectionSection.objects.create(key="exterior", title="Exterior")
+    subsection = InspectionSubSection.objects.create(section=section, key="body", title="Body")
+
+    rows = [
+        ("CAR001", dealers[0], "Hyundai", "Creta", 2021, "1250000", 18000, "Petrol", "Lucknow", "available"),
+        ("CAR002", dealers[0], "Hyundai", "Venue", 2019, "850000", 42000, "Diesel", "Lucknow", "reserved"),
+        ("CAR003", dealers[1], "Toyota", "Innova Crysta", 2020, "1900000", 61000, "Diesel", "Delhi", "available"),
+        ("CAR004", dealers[1], "Maruti", "Swift", 2017, "480000", 83000, "Petrol", "Delhi", "sold"),
+    ]
+    cars = []
+    for i, (code, dealer, brand, model, year, price, km, fuel, city, status) in enumerate(rows):
+        car = Car.objects.create(
+            car_code=code, dealer=dealer, title=f"{year} {brand} {model}", brand=brand, model=model,
+            year=year, price=Decimal(price), km=km, fuel=fuel, transmission="Manual", body="SUV",
+            city=city, availability_status=status, registration_number=f"UP32AB{1000 + i}",
+        )
+        for n in range(i + 1):
+            CarImage.objects.create(car=car, category=exterior, image=f"cars/images/{code}-{n}.jpg", sort_order=n)
+        CarHighlight.objects.create(car=car, text="Single owner")
+        CarReasonToBuy.objects.create(car=car, title="Well kept", description="Serviced on time")
+        CarSpec.objects.create(car=car, category=engine, label="Engine", value=f"{1200 + 100 * i} cc")
+        CarFeature.objects.create(
+            car=car, category=comfort, name="Sunroof" if i % 2 else "Cruise Control",
+            status="damaged" if i == 3 else "flawless",
+        )
+        CarInspectionSectionScore.objects.create(car=car, section=section, score=Decimal(9 - i), rating="good")
+        InspectionItem.objects.create(
+            car=car, subsection=subsection, name="Bumper", status="major" if i == 2 else "flawless",
+        )
+        cars.append(car)
+    return cars
+
+
+# -------------------------
+# FILTER INDEXES
+# -------------------------
+# (label, listing query string, ordering served by the index, expected index).
+# Without an ordering the plan is the filter alone (count / facets).
+FILTER_PLANS = [
+    ("default listing", "", ["-created_at"], "car_created"),
+    ("reserved by price", "availability_status=reserved", ["price"], "car_avail_price"),
+    ("reserved, newest", "availability_status=reserved", ["-created_at"], "car_avail_created"),
+    ("brand + model", "brand=Hyundai&model=Creta", [], "car_brand_model"),
+    ("brand", "brand=Hyundai", [], "car_brand_model"),
+    ("city", "city=Lucknow", [], "car_city"),
+    ("year / km range", "year_min=2018&km_max=50000", [], "car_year_km"),
+    ("major flaws", "has_major_flaws=true", [], "car_major_flaw"),
+    ("image count", "image_count_min=10", [], "car_image_count"),
+    ("overall inspection score", "overall_score_min=9", [], "car_inspection_score"),
+]
+
+
+class JoinCarFilter(CarFilter):
+    """CarFilter's child-table predicates as they were before EXISTS: joins, DISTINCT."""
+
+    def filter_image_category(self, qs, name, value):
+        return qs.filter(images__category__key__in=value.split(",")).distinct()
+
+    def filter_highlight_contains(self, qs, name, value):
+        return qs.filter(highlights__text__icontains=value)
+
+    def filter_highlight_exact(self, qs, name, value):
+        return qs.filter(highlights__text__iexact=value)
+
+    def filter_reason_contains(self, qs, name, value):
+        return qs.filter(reasons_to_buy__title__icontains=value)
+
+    def filter_spec(self, qs, name, value):
+        key, val = value.split(":")
+        return qs.filter(specs__category__key=key, specs__value__iexact=val)
+
+    def filter_features(self, qs, name, value):
+        for f in value.split(","):
+            qs = qs.filter(features__name__iexact=f)
+        return qs.distinct()
+
+    def filter_feature_status(self, qs, name, value):
+        return qs.filter(features__status=value)
+
+    def filter_feature_category(self, qs, name, value):
+        return qs.filter(features__category__key__in=value.split(","))
+
+    def filter_inspection_score(self, qs, name, value):
+        return qs.filter(inspection_section_scores__score__gte=value).distinct()
+
+    def filter_inspection_rating(self, qs, name, value):
+        return qs.filter(inspection_section_scores__rating__in=value.split(","))
+
+
+class ChildFilterTests(TestCase):
+    """The EXISTS predicates match the cars the joins matched, each once."""
+
+    QUERIES = [
+        "has_features=Sunroof",
+        "has_features=sunroof",
+        "has_features=SUNROOF,cruise control",
+        "has_features=Cruise Control,cruise control",
+        "has_features=Sunroof,Cruise Control,Parking Sensors",
+        "has_features=cruise control&feature_status=flawless",
+        "has_features=sunroof&feature_category=safety",
+        "has_features=parking sensors&brand=Toyota",
+        "feature_status=damaged",
+        "feature_category=comfort,safety",
+        "has_image_category=exterior",
+        "highlight_contains=OWNER",
+        "highlight_exact=single owner",
+        "has_reason=kept&has_features=Cruise Control",
+        "spec=engine:1300 CC",
+        "inspection_score_min=7&feature_category=comfort",
+        "inspection_rating=good&brand=Hyundai",
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        cars = create_catalog()
+        comfort = FeatureCategory.objects.get(key="comfort")
+        safety = FeatureCategory.objects.create(key="safety", title="Safety")
+        # Same names in other cases and categories, several matching rows per car
+        CarFeature.objects.create(car=cars[0], category=comfort, name="SUNROOF")
+        CarFeature.objects.create(car=cars[0], category=safety, name="Cruise Control")
+        CarFeature.objects.create(car=cars[1], category=comfort, name="cruise control")
+        CarFeature.objects.create(car=cars[2], category=safety, name="Parking Sensors")
+        CarHighlight.objects.create(car=cars[0], text="Single Owner Car")
+
+    def car_codes(self, filter_class, query):
+        qs = filter_class(QueryDict(query), queryset=Car.objects.all()).qs
+        return sorted(qs.values_list("car_code", flat=True))
+
+    def test_same_cars_as_joins(self):
+        for query in self.QUERIES:
+            with self.subTest(query):
+                codes = self.car_codes(CarFilter, query)
+                self.assertEqual(len(codes), len(set(codes)), "a car matched twice")
+                self.assertEqual(codes, sorted(set(self.car_codes(JoinCarFilter, query))))
+
+    def test_feature_names_ignore_case(self):
+        self.assertEqual(self.car_codes(CarFilter, "has_features=SUNROOF,cruise control"), ["CAR001", "CAR002"])
+        self.assertEqual(self.car_codes(CarFilter, "has_features=Cruise Control,cruise control"), ["CAR001", "CAR002", "CAR003"])
+
+
+@skipUnless(connection.vendor == "postgresql", "EXPLAIN plans are PostgreSQL specific")
+class FilterIndexTests(TestCase):
+    """The main CarFilter combinations must be able to use their indexes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cars = create_catalog()
+        # Statistics of the fixture, not of whatever earlier tests (or
+        # autovacuum after their rollbacks) left in a kept test database
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {Car._meta.db_table}, {CarImage._meta.db_table}, {CarReasonToBuy._meta.db_table}")
+
+    def explain(self, queryset, ordered):
+        with transaction.atomic(), connection.cursor() as cursor:
+            # A test catalog would always seq-scan / sort: ask whether an
+            # index *can* serve the filter (and ordering)
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute(f"SET LOCAL enable_sort = {'off' if ordered else 'on'}")
+            return queryset.explain()
+
+    def test_filter_plans_use_indexes(self):
+        for label, params, ordering, index in FILTER_PLANS:
+            with self.subTest(label):
+                queryset = CarFilter(QueryDict(params), queryset=Car.objects.all()).qs.order_by(*ordering)
+                # Ordered: first listing page, ORDER BY ... LIMIT as CarListAPIView runs it
+                plan = self.explain(queryset[:30] if ordering else queryset, bool(ordering))
+                self.assertIn(index, plan)
+
+    def test_child_rows_use_car_sort_indexes(self):
+        # One car's rows in display order (document build). For an IN list
+        # of cars neither index returns sort_order order, so either may win.
+        car = self.cars[-1]
+        for label, queryset, index in [
+            ("ordered images", CarImage.objects.filter(car=car), "carimage_car_sort"),
+            ("ordered reasons", CarReasonToBuy.objects.filter(car=car), "carreason_car_sort"),
+        ]:
+            with self.subTest(label):
+                self.assertIn(index, self.explain(queryset, ordered=True))
+
+
+# -------------------------
+# QUERY COUNTS
+# -------------------------
+@override_settings(CAR_QUERY_BUDGET_ACTION="raise")
+class QueryCountTests(TestCase):
+    """SQL per request for the listing and the detail, cold and cached."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cars = create_catalog()
+        rebuild_car_documents()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_list(self):
+        # Catalog version (ETag and response cache), catalog version (count
+        # cache), count estimate, exact count, page
+        with self.assertNumQueries(5):
+            response = self.client.get("/api/cars/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 4)
+
+        # Catalog version
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/cars/")
+        self.assertEqual(response["X-Cache"], "HIT")
+
+    def test_list_not_modified(self):
+        first = self.client.get("/api/cars/?brand=Hyundai")
+        self.assertIn("Last-Modified", first)
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/cars/?brand=Hyundai", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(response.status_code, 304)
+
+        # Any catalog write is a new ETag (what the write's on-commit bump does)
+        bump_catalog_version()
+        response = self.client.get("/api/cars/?brand=Hyundai", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], first["ETag"])
+
+    def test_cursor_page_counts_nothing(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/cars/?pagination=cursor&ordering=price")
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([query["sql"] for query in queries if "COUNT(" in query["sql"]])
+
+    def test_list_filtered_and_expanded(self):
+        # + images (and their categories), highlights, image srcsets
+        with self.assertNumQueries(9):
+            response = self.client.get("/api/cars/?brand=Hyundai&expand=images,highlights")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 2)
+
+    def test_detail(self):
+        car = self.cars[0]
+        # car / document timestamps, stored document
+        with self.assertNumQueries(2):
+            response = self.client.get(f"/api/cars/{car.pk}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["car_code"], "CAR001")
+
+        with self.assertNumQueries(1):
+            response = self.client.get(f"/api/cars/{car.pk}/")
+        self.assertEqual(response["X-Cache"], "HIT")
+
+    def test_detail_not_modified(self):
+        car = self.cars[0]
+        etag = self.client.get(f"/api/cars/{car.pk}/")["ETag"]
+        with self.assertNumQueries(1):
+            response = self.client.get(f"/api/cars/{car.pk}/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_over_budget_fails(self):
+        with override_settings(CAR_QUERY_BUDGETS={"CarListAPIView": 4}):
+            with self.assertRaisesMessage(QueryBudgetExceeded, "CarListAPIView ran 5 queries"):
+                self.client.get("/api/cars/")
+
+    def test_serialize_timing(self):
+        for path in ("/api/cars/?brand=Hyundai", "/api/cars/?expand=all"):
+            response = self.client.get(path)
+            self.assertIn("serialize;dur=", response["Server-Timing"], path)
+            self.assertIn("render;dur=", response["Server-Timing"], path)
+
+
+# -------------------------
+# PAGINATION
+# -------------------------
+@override_settings(CAR_COUNT_ESTIMATE_THRESHOLD=1)
+class EstimatedCountPaginationTests(TestCase):
+    """A planner estimate is only displayed: pages and next come from the rows."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cars = create_catalog()
+
+    def setUp(self):
+        cache.clear()
+
+    def get_page(self, estimate, page, page_size):
+        with mock.patch("cars.counts.estimate_count", return_value=estimate):
+            return self.client.get(f"/api/cars/?page={page}&page_size={page_size}")
+
+    def test_underestimate_keeps_trailing_pages(self):
+        response = self.get_page(estimate=2, page=3, page_size=1)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 2)
+        self.assertFalse(response.data["count_exact"])
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertIn("page=4", response.data["next"])
+
+        response = self.get_page(estimate=2, page=4, page_size=1)
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.data["next"])
+
+    def test_overestimate_ends_at_the_last_row(self):
+        response = self.get_page(estimate=100, page=2, page_size=2)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 100)
+        self.assertEqual(len(response.data["results"]), 2)
+        self.assertIsNone(response.data["next"])
+
+        self.assertEqual(self.get_page(estimate=100, page=3, page_size=2).status_code, 404)
+
+    def test_exact_count_below_threshold(self):
+        response = self.get_page(estimate=0, page=2, page_size=2)
+        self.assertEqual(response.data["count"], 4)
+        self.assertTrue(response.data["count_exact"])
+        self.assertIsNone(response.data["next"])
+        self.assertEqual(self.get_page(estimate=0, page=3, page_size=2).status_code, 404)
+
+
+# -------------------------
+# CACHE FRESHNESS
+# -------------------------
+class ForeignWriteTests(TestCase):
+    """
+    Writes made by another process (only the rows and the database
+    catalog version move, nothing in this process) must not be served
+    from this process's caches.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cars = create_catalog()
+
+    def setUp(self):
+        cache.clear()
+
+    def write_elsewhere(self, **changes):
+        Car.objects.filter(pk=self.cars[3].pk).update(**changes)
+        CacheVersion.objects.filter(name="catalog").update(version=F("version") + 1)
+
+    def brand_counts(self):
+        response = self.client.get("/api/cars/facets/?fuel=Petrol")
+        return {row["value"]: row["count"] for row in response.data["facets"]["brand"]}
+
+    def test_facets(self):
+        self.assertEqual(self.brand_counts(), {"Hyundai": 1, "Maruti": 1})
+        self.write_elsewhere(brand="Hyundai")
+        self.assertEqual(self.brand_counts(), {"Hyundai": 2})
+
+    def test_list_and_count(self):
+        self.assertEqual(self.client.get("/api/cars/?fuel=Petrol").data["count"], 2)
+        self.write_elsewhere(fuel="Diesel")
+        response = self.client.get("/api/cars/?fuel=Petrol")
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data["count"], 1)
+
+
+# -------------------------
+# CSV UPLOAD JOBS
+# -------------------------
+UPLOAD_CSV = """registration_number,title,brand,model,year,price,km,fuel,transmission,city,highlights,reasons_to_buy
+UP32XY0001,2018 Honda City,Honda,City,2018,650000,52000,Petrol,Manual,Lucknow,Single owner,
+UP32XY0002,2020 Kia Seltos,Kia,Seltos,2020,1350000,30000,Diesel,Automatic,Lucknow,,Warranty::Till 2026
+,No registration,Kia,Sonet,2021,900000,12000,Petrol,Manual,Lucknow,,
+"""
+
+
+class UploadJobTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dealer = create_catalog()[0].dealer
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / "upload.csv"
+        self.path.write_text(UPLOAD_CSV)
+
+    def create_job(self, **fields):
+        return CarCSVImport.objects.create(dealer=self.dealer, path=str(self.path), size=len(UPLOAD_CSV), **fields)
+
+    def test_run(self):
+        job = self.create_job()
+        self.assertTrue(run_import(job.pk))
+        job.refresh_from_db()
+        self.assertEqual(job.status, "succeeded")
+        self.assertEqual((job.rows, job.inserted, job.error_count), (3, 4, 1))  # 2 cars, 1 highlight, 1 reason
+        self.assertIsNotNone(job.heartbeat_at)
+        self.assertFalse(self.path.exists())
+
+    def test_duplicate_registration_numbers(self):
+        # The import rejects the rows a dry run reports: the first row wins
+        self.path.write_text(UPLOAD_CSV + "UP32XY0001,2018 Honda City ZX,Honda,City,2018,600000,52000,Petrol,Manual,Lucknow,,\n")
+        with open(self.path, "rb") as f:
+            report = validate_upload(f)
+        self.assertEqual([(e["row"], e["code"]) for e in report.errors if e["column"] == "registration_number"],
+                         [(3, "required"), (4, "duplicate")])
+
+        job = self.create_job()
+        self.assertTrue(run_import(job.pk))
+        job.refresh_from_db()
+        self.assertEqual((job.rows, job.inserted, job.error_count), (4, 4, 2))
+        self.assertIn([4, "same registration_number as row 1"], job.errors)
+        car = Car.objects.get(dealer=self.dealer, registration_number="UP32XY0001")
+        self.assertEqual(car.title, "2018 Honda City")
+
+    def test_requeued_job_restarts_from_zero(self):
+        # Half done when its worker died: counters and errors must not add up
+        old = timezone.now() - timedelta(hours=1)
+        job = self.create_job(
+            status="running", started_at=old, heartbeat_at=old,
+            rows=2000, inserted=2000, error_count=1, errors=[[7, "title: required"]],
+        )
+        self.assertEqual(requeue_stale_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.rows, job.error_count, job.errors), ("queued", 0, 0, []))
+
+        self.assertTrue(run_import(job.pk))
+        job.refresh_from_db()
+        self.assertEqual((job.rows, job.inserted, job.error_count), (3, 4, 1))  # 2 cars, 1 highlight, 1 reason
+        self.assertEqual(len(job.errors), 1)
+
+    def test_live_job_is_not_requeued(self):
+        now = timezone.now()
+        self.create_job(status="running", started_at=now, heartbeat_at=now)
+        self.assertEqual(requeue_stale_jobs(), 0)
+
+    def test_taken_over_job_stops_writing(self):
+        old = timezone.now() - timedelta(hours=1)
+        job = self.create_job(status="running", started_at=old, heartbeat_at=old)
+        requeue_stale_jobs()
+        job.rows = 10
+        with self.assertRaises(JobLost):
+            _save(job, ["rows"])
+        job.refresh_from_db()
+        self.assertEqual(job.rows, 0)
+
+
+class ExportPermissionTests(TestCase):
+    """The export streams dealer contacts: staff only."""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_catalog()
+
+    def test_anonymous_is_refused(self):
+        for name in ("cars.csv", "dealers.csv", "catalog.jsonl"):
+            self.assertEqual(self.client.get("/api/cars/export/", {"file": name}).status_code, 403)
+
+    def test_non_staff_is_refused(self):
+        self.client.force_login(User.objects.create_user(phone_number="+919800000010"))
+        self.assertEqual(self.client.get("/api/cars/export/", {"file": "dealers.csv"}).status_code, 403)
+
+    def test_staff_gets_the_file(self):
+        self.client.force_login(User.objects.create_user(phone_number="+919800000011", is_staff=True))
+        response = self.client.get("/api/cars/export/", {"file": "dealers.csv"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("+919800000001", b"".join(response.streaming_content).decode())
+
+
+class ImageDerivativeSignalTests(TestCase):
+    """Admin saves queue derivatives only for a new image or thumbnail."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.car = create_catalog()[0]
+
+    def save(self, instance, **kwargs):
+        with mock.patch("cars.signals.enqueue_derivatives") as enqueue:
+            instance.save(**kwargs)
+        return [sources for (sources,), _ in enqueue.call_args_list]
+
+    def test_other_edits_encode_nothing(self):
+        self.car.thumbnail = "cars/thumbnails/creta.jpg"
+        self.car.save()
+        self.car.price = Decimal("1200000")
+        self.assertEqual(self.save(self.car), [])
+        self.assertEqual(self.save(self.car, update_fields=["price"]), [])
+
+    def test_new_thumbnail_is_queued(self):
+        self.car.thumbnail = "cars/thumbnails/creta-2.jpg"
+        self.assertEqual(self.save(self.car), [{"cars/thumbnails/creta-2.jpg": {self.car.pk}}])
+
+    def test_new_and_replaced_car_images_are_queued(self):
+        image = CarImage(car=self.car, category=CarImageCategory.objects.get(), image="cars/images/new.jpg")
+        self.assertEqual(self.save(image), [{"cars/images/new.jpg": {self.car.pk}}])
+        image.image = "cars/images/replaced.jpg"
+        self.assertEqual(self.save(image), [{"cars/images/replaced.jpg": {self.car.pk}}])
+        self.assertEqual(self.save(image), [])
+
+
+class CarAggregateTests(TestCase):
+    """The denormalized child-row counts on Car."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.car = create_catalog()[0]
+        cls.category = CarImageCategory.objects.get()
+
+    def add_image(self):
+        return CarImage.objects.create(car=self.car, category=self.category, image="cars/images/extra.jpg")
+
+    def test_sync_locks_the_cars_before_counting(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.add_image()
+        sql = [query["sql"] for query in queries]
+        locked = next(i for i, query in enumerate(sql) if "FOR UPDATE" in query)
+        counted = next(i for i, query in enumerate(sql) if 'COUNT(' in query and "cars_carimage" in query)
+        self.assertLess(locked, counted)
+        self.car.refresh_from_db()
+        self.assertEqual(self.car.image_count, 2)
+
+    def test_deferred_sync_runs_on_exit(self):
+        with defer_car_aggregates():
+            self.add_image()
+            self.add_image()
+            self.car.refresh_from_db()
+            self.assertEqual(self.car.image_count, 1)
+        self.car.refresh_from_db()
+        self.assertEqual(self.car.image_count, 3)
+
+    def test_deferred_sync_skipped_when_the_block_raises(self):
+        with mock.patch("cars.aggregates.sync_car_aggregates") as sync:
+            with self.assertRaises(ValueError), transaction.atomic(), defer_car_aggregates():
+                self.add_image()
+                raise ValueError
+        sync.assert_not_called()
+        self.car.refresh_from_db()
+        self.assertEqual(self.car.image_count, 1)
+
+
+class RendererTests(TestCase):
+    """FastJSONRenderer writes the bytes of DRF's JSONRenderer."""
+
+    PAYLOAD = {
+        "price": Decimal("1250000.00"),
+        "prices": [Decimal("0.10"), Decimal("-3"), Decimal("1E+3")],
+        "created_at": datetime(2024, 5, 1, 9, 30, 15, 123456, tzinfo=dt_timezone.utc),
+        "local": datetime(2024, 5, 1, 9, 30, tzinfo=dt_timezone(timedelta(hours=5, minutes=30))),
+        "naive": datetime(2024, 5, 1, 9, 30),
+        "day": date(2024, 5, 1),
+        "at": time(9, 30, 15),
+        "id": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+        "label": gettext_lazy("Lucknow"),
+        "text": "Créta – ₹12.5 lakh \u2028 \u2029 \"quoted\"",
+        "nested": [{"score": 8.5, "ok": True, "none": None, "ids": [1, 2, 2 ** 40]}, [], {}],
+        "tags": ("premium",),
+    }
+
+    def render(self, renderer, data):
+        return renderer.render(data, "application/json")
+
+    def assertSameBytes(self, data):
+        self.assertEqual(self.render(FastJSONRenderer(), data), self.render(JSONRenderer(), data))
+
+    def test_payload(self):
+        self.assertSameBytes(self.PAYLOAD)
+        self.assertSameBytes([self.PAYLOAD, {"page": [self.PAYLOAD] * 3}])
+
+    def test_api_responses(self):
+        car = create_catalog()[0]
+        rebuild_car_documents()
+        for path in ("/api/cars/?page_size=30&expand=all", f"/api/cars/{car.pk}/", "/api/cars/facets/"):
+            response = self.client.get(path)
+            self.assertEqual(response.status_code, 200, path)
+            self.assertSameBytes(response.data)
+
+    def test_fallbacks(self):
+        # Indented output, non-string keys and ints orjson refuses go through JSONRenderer
+        self.assertEqual(
+            FastJSONRenderer().render(self.PAYLOAD, "application/json; indent=2"),
+            JSONRenderer().render(self.PAYLOAD, "application/json; indent=2"),
+        )
+        self.assertSameBytes({1: "a", "b": 2 ** 70})
+
+    @skipUnless(orjson, "orjson not installed")
+    def test_float_exponent_form_differs(self):
+        floats = [1e16, 1e-05, 1.5e300, 0.0001, 123.25]
+        self.assertEqual(self.render(JSONRenderer(), floats), b"[1e+16,1e-05,1.5e+300,0.0001,123.25]")
+        self.assertEqual(self.render(FastJSONRenderer(), floats), b"[1e16,0.00001,1.5e300,0.0001,123.25]")
+
+    @skipUnless(orjson, "orjson not installed")
+    def test_nan_and_infinity_become_null(self):
+        values = [float("nan"), float("inf"), -float("inf")]
+        with self.assertRaises(ValueError):
+            self.render(JSONRenderer(), values)
+        self.assertEqual(self.render(FastJSONRenderer(), values), b"[null,null,null]")
+
+
+class ReplaceGroupsTests(TestCase):
+    """replace_by steps swap a car's rows with one DELETE, no per-row signals."""
+
+    def test_replace_groups(self):
+        cars = create_catalog()
+        exterior = CarImageCategory.objects.get()
+        step = ImportStep("car images", "car_images.csv", CarImage, parse=None, replace_by=("car_code", "car"))
+        objs = {
+            1: CarImage(car=cars[1], category=exterior, image="cars/images/venue.jpg"),
+            2: CarImage(car=cars[2], category=exterior, image="cars/images/innova-1.jpg"),
+            3: CarImage(car=cars[2], category=exterior, image="cars/images/innova-2.jpg"),
+        }
+        result = StepResult(step.name)
+        with CaptureQueriesContext(connection) as queries:
+            step.replace_groups(objs, result)
+
+        deletes = [query["sql"] for query in queries if query["sql"].startswith("DELETE")]
+        self.assertEqual(len(deletes), 1)
+        self.assertEqual((result.inserted, result.updated, result.deleted), (0, 3, 2))
+        for car, images in [
+            (cars[0], ["cars/images/CAR001-0.jpg"]),
+            (cars[1], ["cars/images/venue.jpg"]),
+            (cars[2], ["cars/images/innova-1.jpg", "cars/images/innova-2.jpg"]),
+        ]:
+            car.refresh_from_db()
+            self.assertEqual(sorted(car.images.values_list("image", flat=True)), images)
+            self.assertEqual(car.image_count, len(images))
+
+
+class GenerateCatalogTests(TestCase):
+    """generate_catalog on a database without cars."""
+
+    def test_imports_the_csv_catalog_first(self):
+        with open(Path(__file__).resolve().parent.parent / "csv" / "cars.csv", newline="", encoding="utf-8") as f:
+            csv_cars = sum(1 for _ in csv.DictReader(f))
+        out = io.StringIO()
+        with redirect_stdout(out):  # the import scripts print
+            call_command("generate_catalog", "--cars", "3", stdout=out)
+        self.assertIn("importing the CSV catalog", out.getvalue())
+        self.assertEqual(Car.objects.exclude(car_code__startswith="SYN").count(), csv_cars)
+        self.assertEqual(Car.objects.filter(car_code__startswith="SYN").count(), 3)
+
+    def test_no_csv_catalog(self):
+        with tempfile.TemporaryDirectory() as empty:
+            with self.assertRaisesMessage(CommandError, f"no cars.csv in {empty}"):
+                call_command("generate_catalog", "--cars", "3", "--csv-dir", empty, stdout=io.StringIO())
+
+
+@skipUnless(np is not None, "numpy not installed")
+class ColumnarRefreshTests(TestCase):
+    """The column store catches up with writes that bypass the signals."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cars = create_catalog()
+
+    def matching(self, columns, query):
+        filterset = CarFilter(QueryDict(query), queryset=Car.objects.all())
+        self.assertTrue(filterset.is_valid())
+        result = evaluate(columns, filterset.form.cleaned_data, [], Car.objects.all())
+        return sorted(car.car_code for car in result[:len(result)])
+
+    def test_repaired_aggregates(self):
+        # Drifted counts on cars last written before the newest car, by
+        # more than the refresh overlap: only a moved updated_at re-reads them
+        Car.objects.update(image_count=0, updated_at=timezone.now() - timedelta(hours=2))
+        Car.objects.filter(car_code="CAR001").update(updated_at=timezone.now() - timedelta(hours=1))
+        columns = build_columns()
+        self.assertEqual(self.matching(columns, "image_count_min=3"), [])
+
+        sync_car_aggregates()
+        columns = refresh_columns(columns)
+        self.assertEqual(self.matching(columns, "image_count_min=3"), ["CAR003", "CAR004"])
+
+
+class DocumentFreshnessTests(TestCase):
+    """Stored documents older than their car are rebuilt when read."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.car = create_catalog()[0]
+        rebuild_car_documents()
+
+    def test_write_without_signals(self):
+        Car.objects.filter(pk=self.car.pk).update(title="2021 Hyundai Creta SX", updated_at=timezone.now())
+
+        response = self.client.get(f"/api/cars/{self.car.pk}/")
+        self.assertEqual(response.data["title"], "2021 Hyundai Creta SX")
+        response = self.client.get("/api/cars/?expand=all&brand=Hyundai&model=Creta")
+        self.assertEqual([car["title"] for car in response.data["results"]], ["2021 Hyundai Creta SX"])
+
+    def test_missing_documents_are_built(self):
+        CarDocument.objects.filter(car__car_code__in=["CAR001", "CAR003"]).delete()
+        response = self.client.get("/api/cars/?expand=all")
+        self.assertEqual(response.data["count"], 4)
+        self.assertEqual(
+            sorted(car["car_code"] for car in response.data["results"]), ["CAR001", "CAR002", "CAR003", "CAR004"],
+        )
+        self.assertEqual(CarDocument.objects.count(), 4)
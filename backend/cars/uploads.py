@@ -0,0 +1,328 @@
+"""
+Background import of dealer CSV uploads (CarCSVImportAPIView).
+
+The upload is spooled to CAR_IMPORT_DIR and a CarCSVImport job is queued;
+`manage.py run_csv_imports --watch` (or, opted into with
+CAR_IMPORT_WORKERS, a thread in the web process) then reads the file in
+batches of BATCH_SIZE rows and validates / writes each batch set-based
+with the cars/importer.py steps, in its own transaction, saving the job's
+progress (rows, bytes read, row errors) and heartbeat with it. Jobs whose
+heartbeat stopped are queued again from the top (requeue_stale_jobs).
+
+Upload columns: registration_number, title, brand, model, year, price,
+km, fuel, transmission, city, highlights ("a|b") and reasons_to_buy
+("title::description||..."). Cars are matched on dealer +
+registration_number; highlights are added, reasons upserted on title.
+A dry run validates the upload in the request instead (UPLOAD_SCHEMA).
+"""
+import csv
+import io
+import os
+import threading
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from itertools import islice
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .aggregates import defer_car_aggregates
+from .importer import BATCH_SIZE, ImportStep, Lookups, RowError, StepResult, required
+from .models import Car, CarCSVImport, CarHighlight, CarReasonToBuy
+from .validation import CSVSchema, validate_file
+
+
+# [row number, message] kept on the job (all of them are counted)
+MAX_STORED_ERRORS = 1000
+
+# Counters a claimed job restarts from, saved after every batch
+PROGRESS_FIELDS = {
+    "bytes_read": 0, "rows": 0, "inserted": 0, "updated": 0, "unchanged": 0,
+    "error_count": 0, "errors": [], "message": "",
+}
+
+# A running job without a batch saved for this long has lost its worker
+STALE_AFTER = timedelta(minutes=10)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+# -------------------------
+# ROWS
+# -------------------------
+def parse_car(r, lookups):
+    registration_number, title = required(r, "registration_number", "title")
+    return {
+        # Only used when the car is new: uploads carry no car_code
+        "car_code": f"UP{uuid.uuid4().hex[:10].upper()}",
+        "dealer_id": r["dealer_id"],
+        "registration_number": registration_number,
+        "title": title,
+        "brand": (r.get("brand") or "").strip(),
+        "model": (r.get("model") or "").strip(),
+        "year": int(r["year"]) if r.get("year") else None,
+        "price": Decimal(r["price"]) if r.get("price") else 0,
+        "km": int(r["km"]) if r.get("km") else None,
+        "fuel": (r.get("fuel") or "").strip(),
+        "transmission": (r.get("transmission") or "").strip(),
+        "city": (r.get("city") or "").strip(),
+    }
+
+
+def parse_highlight(r, lookups):
+    return {"car_id": r["car_id"], "text": r["text"]}
+
+
+def parse_reason(r, lookups):
+    title, separator, description = r["reason"].partition("::")
+    if not separator or not title.strip():
+        raise RowError(f"reasons_to_buy: expected title::description, got {r['reason']!r}")
+    return {"car_id": r["car_id"], "title": title.strip(), "description": description.strip()}
+
+
+CAR_STEP = ImportStep(
+    "cars",
+    None,
+    Car,
+    parse_car,
+    unique_fields=["dealer", "registration_number"],
+    update_fields=["title", "brand", "model", "year", "price", "km", "fuel", "transmission", "city"],
+)
+HIGHLIGHT_STEP = ImportStep("car highlights", None, CarHighlight, parse_highlight, unique_fields=["car", "text"])
+REASON_STEP = ImportStep(
+    "car reasons",
+    None,
+    CarReasonToBuy,
+    parse_reason,
+    unique_fields=["car", "title"],
+    update_fields=["description"],
+)
+
+
+def check_highlights(value):
+    limit = CarHighlight._meta.get_field("text").max_length
+    if any(len(text.strip()) > limit for text in value.split("|")):
+        return f"a highlight is longer than {limit} characters"
+    return None
+
+
+def check_reasons(value):
+    limit = CarReasonToBuy._meta.get_field("title").max_length
+    for reason in value.split("||"):
+        if not reason.strip():
+            continue
+        title, separator, _ = reason.partition("::")
+        if not separator or not title.strip():
+            return f"expected title::description, got {reason!r}"
+        if len(title.strip()) > limit:
+            return f"a reason title is longer than {limit} characters"
+    return None
+
+
+# Dry runs (?dry_run=1): the rules parse_car / child_rows apply, for the whole file at once
+UPLOAD_SCHEMA = CSVSchema(
+    "upload",
+    Car,
+    fields={
+        column: column for column in [
+            "registration_number", "title", "brand", "model", "year", "price", "km", "fuel",
+            "transmission", "city",
+        ]
+    },
+    required=["registration_number", "title"],
+    key=["registration_number"],
+    checks={"highlights": check_highlights, "reasons_to_buy": check_reasons},
+)
+
+
+def child_rows(batch, resolved, pks):
+    """(highlight rows, reason rows) of the batch's imported cars, numbered by upload row."""
+    highlights, reasons = [], []
+    for number, row in batch:
+        if number not in resolved:
+            continue  # the car row is invalid
+        car_id = pks[resolved[number]]
+        for text in (row.get("highlights") or "").split("|"):
+            if text.strip():
+                highlights.append((number, {"car_id": car_id, "text": text.strip()}))
+        for reason in (row.get("reasons_to_buy") or "").split("||"):
+            if reason.strip():
+                reasons.append((number, {"car_id": car_id, "reason": reason}))
+    return highlights, reasons
+
+
+def import_batch(batch, dealer_id, lookups, seen):
+    """
+    Write one batch of (row number, row) in one transaction; its StepResult.
+    `seen` maps the file's registration numbers to their first row: a later
+    row repeating one is invalid, as UPLOAD_SCHEMA reports it in dry runs.
+    """
+    result = StepResult("upload", rows=len(batch))
+    with transaction.atomic(), defer_car_aggregates():
+        rows = []
+        for number, row in batch:
+            registration_number = (row.get("registration_number") or "").strip()
+            if registration_number in seen:
+                result.errors.append((number, f"same registration_number as row {seen[registration_number]}"))
+                continue
+            if registration_number:
+                seen[registration_number] = number
+            rows.append((number, {**row, "dealer_id": dealer_id}))
+        objs, resolved = CAR_STEP.validate_batch(rows, lookups, result.errors)
+        pks = CAR_STEP.write_batch(objs, result)
+
+        highlights, reasons = child_rows(batch, resolved, pks)
+        for step, rows in ((HIGHLIGHT_STEP, highlights), (REASON_STEP, reasons)):
+            objs, _ = step.validate_batch(rows, lookups, result.errors)
+            step.write_batch(objs, result)
+    result.errors.sort()
+    return result
+
+
+# -------------------------
+# JOBS
+# -------------------------
+def spool_upload(upload, dealer):
+    """Queued CarCSVImport of an UploadedFile, copied to CAR_IMPORT_DIR chunk by chunk."""
+    directory = Path(settings.CAR_IMPORT_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    job_id = uuid.uuid4()
+    path = directory / f"{job_id}.csv"
+    with open(path, "wb") as f:
+        for chunk in upload.chunks():
+            f.write(chunk)
+    return CarCSVImport.objects.create(
+        id=job_id,
+        dealer=dealer,
+        file_name=(upload.name or "")[:255],
+        path=str(path),
+        size=upload.size or 0,
+    )
+
+
+def validate_upload(upload):
+    """Validation Report of an UploadedFile, nothing written."""
+    return validate_file(io.TextIOWrapper(upload, encoding="utf-8-sig", newline=""), UPLOAD_SCHEMA)
+
+
+class JobLost(Exception):
+    """The job was queued again (stale heartbeat): another worker owns it now."""
+
+
+def _save(job, fields):
+    """
+    Save `fields` of a running job and its heartbeat, provided this worker
+    still owns it (same status and claim time); JobLost otherwise.
+    """
+    job.heartbeat_at = timezone.now()
+    owned = CarCSVImport.objects.filter(pk=job.pk, status="running", started_at=job.started_at)
+    if not owned.update(heartbeat_at=job.heartbeat_at, **{name: getattr(job, name) for name in fields}):
+        raise JobLost(job.pk)
+
+
+def import_upload(job):
+    """Import the job's file batch by batch, saving its progress after each."""
+    lookups = Lookups()
+    seen = {}
+    with open(job.path, "rb") as raw:
+        reader = csv.DictReader(io.TextIOWrapper(raw, encoding="utf-8-sig", newline=""))
+        numbered = enumerate(reader, start=1)
+        while True:
+            batch = list(islice(numbered, BATCH_SIZE))
+            if not batch:
+                break
+            # The batch only commits while the job is still ours
+            with transaction.atomic():
+                result = import_batch(batch, job.dealer_id, lookups, seen)
+
+                job.rows += result.rows
+                job.inserted += result.inserted
+                job.updated += result.updated
+                job.unchanged += result.unchanged
+                job.error_count += len(result.errors)
+                room = MAX_STORED_ERRORS - len(job.errors)
+                job.errors += [list(error) for error in result.errors[:max(room, 0)]]
+                # Buffered position: exact once the file is read
+                job.bytes_read = raw.tell()
+                _save(job, PROGRESS_FIELDS)
+
+
+def run_import(job_id):
+    """
+    Run a queued job; False when another worker has already claimed it,
+    or took it over while it ran.
+    """
+    now = timezone.now()
+    # Claiming restarts the file from the top: progress counts from zero
+    claimed = CarCSVImport.objects.filter(pk=job_id, status="queued").update(
+        status="running", started_at=now, heartbeat_at=now, finished_at=None, **PROGRESS_FIELDS,
+    )
+    if not claimed:
+        return False
+
+    job = CarCSVImport.objects.get(pk=job_id)
+    try:
+        import_upload(job)
+        job.status = "succeeded"
+    except JobLost:
+        return False
+    except Exception as e:
+        traceback.print_exc()
+        job.status = "failed"
+        job.message = f"{type(e).__name__}: {e}"
+    job.finished_at = timezone.now()
+    try:
+        _save(job, ["status", "message", "finished_at"])
+    except JobLost:
+        return False
+
+    try:
+        os.remove(job.path)
+    except FileNotFoundError:
+        pass
+    return True
+
+
+def requeue_stale_jobs(stale_after=STALE_AFTER):
+    """
+    Queue again, from zero, the running jobs whose heartbeat is older
+    than `stale_after` (their worker died or was recycled). Returns how many.
+    """
+    stale = Q(heartbeat_at__lt=timezone.now() - stale_after) | Q(heartbeat_at__isnull=True)
+    return CarCSVImport.objects.filter(stale, status="running").update(
+        status="queued", started_at=None, heartbeat_at=None, **PROGRESS_FIELDS,
+    )
+
+
+def _run_in_thread(job_id):
+    try:
+        run_import(job_id)
+    finally:
+        connection.close()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.CAR_IMPORT_WORKERS, thread_name_prefix="csv-import",
+            )
+        return _executor
+
+
+def enqueue(job):
+    """
+    Import the job in a web-process thread once the current transaction
+    commits, when CAR_IMPORT_WORKERS allows; else it waits for
+    run_csv_imports.
+    """
+    if settings.CAR_IMPORT_WORKERS > 0:
+        transaction.on_commit(lambda: _get_executor().submit(_run_in_thread, job.pk))
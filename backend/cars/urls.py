@@ -3,6 +3,11 @@ from .views import (
     CarListAPIView,
     CarDetailAPIView,
     CarCSVImportAPIView,
+    CarCSVImportStatusAPIView,
+    CarExportAPIView,
+    CarCacheStatsAPIView,
+    CarFacetsAPIView,
+    CarSuggestAPIView,
 )
 from django.urls import path
 
@@ -17,6 +22,11 @@ from django.urls import path
 urlpatterns = [
     path("cars/", CarListAPIView.as_view()),
     path("cars/<uuid:id>/", CarDetailAPIView.as_view()),
+    path("cars/facets/", CarFacetsAPIView.as_view()),
+    path("cars/suggest/", CarSuggestAPIView.as_view()),
     path("cars/import/csv/", CarCSVImportAPIView.as_view()),
+    path("imports/<uuid:id>/", CarCSVImportStatusAPIView.as_view(), name="csv-import"),
+    path("cars/export/", CarExportAPIView.as_view()),
+    path("cars/cache-stats/", CarCacheStatsAPIView.as_view()),
 ]
 
@@ -0,0 +1,14 @@
+from django.db import connection, transaction
+
+
+def on_commit_once(func):
+    """
+    transaction.on_commit(func), unless func is already queued for the
+    current transaction. A rolled back transaction (or savepoint) drops
+    the queued callback, so the next call schedules it again.
+    """
+    if connection.in_atomic_block and any(
+        callback is func for _, callback, *_ in connection.run_on_commit
+    ):
+        return
+    transaction.on_commit(func)
@@ -0,0 +1,432 @@
+"""
+Whole-file validation of import CSVs, writing nothing
+(import_all_data --dry-run, POST /api/cars/import/csv/?dry_run=1).
+
+Each file is read once into columns and every rule runs over a whole
+column, once per distinct value: types, lengths and enum values from the
+model fields, foreign keys as set differences against the keys in the
+other files and in the database, duplicate natural keys with a Counter.
+The Report lists every problem as a dict (file, row, column, value,
+code, message), ready for JSON.
+"""
+import ast
+import csv
+import re
+from collections import Counter
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+
+from django.db import models
+
+from .models import (
+    Car,
+    CarFeature,
+    CarHighlight,
+    CarImage,
+    CarInspectionSectionScore,
+    CarInspectionSubSectionRemarks,
+    CarReasonToBuy,
+    CarSpec,
+    Dealer,
+    InspectionItem,
+    InspectionSection,
+    InspectionSubSection,
+)
+
+
+POSITIVE_INTEGER_FIELDS = (
+    models.PositiveIntegerField,
+    models.PositiveSmallIntegerField,
+    models.PositiveBigIntegerField,
+)
+ISO_DATE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+# Longest cell value copied into a report entry
+MAX_VALUE_LENGTH = 200
+
+# Reference name -> (file, column) of the keys in the feed, (model, field) in the DB
+REFERENCES = {
+    "car": ("cars.csv", "car_code", Car, "car_code"),
+    "dealer": ("dealers.csv", "dealer_code", Dealer, "dealer_code"),
+    "section": ("inspection_sections.csv", "key", InspectionSection, "key"),
+    "subsection": ("inspection_subsections.csv", "key", InspectionSubSection, "key"),
+}
+
+
+# -------------------------
+# SCHEMAS
+# -------------------------
+class CSVSchema:
+    """
+    The rules of one CSV file, mirroring its scripts/import_*.py parser.
+
+    `fields` maps CSV columns to the model fields they are written to
+    (type, max_length and choices are checked from those), `required`
+    columns must be non-empty, `key` columns are the natural key (unique
+    in the file), `references` map columns to REFERENCES, `literals` to
+    the type ast.literal_eval must return, and `checks` to callables
+    returning an error message for a bad value. `lower` columns are
+    lowercased by the parser before their choices apply.
+    """
+
+    def __init__(
+        self,
+        filename,
+        model,
+        fields,
+        required=(),
+        key=(),
+        references=None,
+        literals=None,
+        checks=None,
+        lower=(),
+        optional=False,
+    ):
+        self.filename = filename
+        self.model = model
+        self.fields = fields
+        self.required = list(required)
+        self.key = list(key)
+        self.references = references or {}
+        self.literals = literals or {}
+        self.checks = checks or {}
+        self.lower = set(lower)
+        self.optional = optional
+
+    def field(self, column):
+        name = self.fields.get(column)
+        return self.model._meta.get_field(name) if name else None
+
+
+IMPORT_SCHEMAS = [
+    CSVSchema(
+        "dealers.csv", Dealer,
+        fields={
+            "dealer_code": "dealer_code", "name": "name", "phone": "phone", "email": "email",
+            "address": "address", "city": "city", "state": "state", "postal_code": "postal_code",
+            "tier": "tier",
+        },
+        required=["dealer_code"],
+        key=["dealer_code"],
+        literals={"tags": list},
+    ),
+    CSVSchema(
+        "inspection_sections.csv", InspectionSection,
+        fields={"key": "key", "title": "title", "description": "description"},
+        required=["key"],
+        key=["key"],
+    ),
+    CSVSchema(
+        "inspection_subsections.csv", InspectionSubSection,
+        fields={"key": "key", "title": "title", "order": "order"},
+        required=["section_key", "key"],
+        key=["section_key", "key"],
+        references={"section_key": "section"},
+    ),
+    CSVSchema(
+        "cars.csv", Car,
+        fields={
+            field: field for field in [
+                "car_code", "availability_status", "insurance_valid_till", "insurance_type",
+                "owner_count", "title", "brand", "model", "year", "price", "discount_price", "emi",
+                "km", "fuel", "transmission", "body", "seats", "city", "rto", "colorKey",
+                "registration_number",
+            ]
+        },
+        required=["car_code"],
+        key=["car_code"],
+        references={"dealer_code": "dealer"},
+        literals={"tags": list, "metadata": dict},
+    ),
+    CSVSchema(
+        "car_images.csv", CarImage,
+        fields={"image": "image", "caption": "caption", "sort_order": "sort_order"},
+        required=["car_code", "category_key", "image"],
+        references={"car_code": "car"},
+    ),
+    CSVSchema(
+        "car_highlights.csv", CarHighlight,
+        fields={"text": "text"},
+        required=["car_code", "text"],
+        key=["car_code", "text"],
+        references={"car_code": "car"},
+    ),
+    CSVSchema(
+        "car_specs.csv", CarSpec,
+        fields={"label": "label", "value": "value"},
+        required=["car_code", "category_key", "label"],
+        key=["car_code", "category_key", "label"],
+        references={"car_code": "car"},
+    ),
+    CSVSchema(
+        "car_features.csv", CarFeature,
+        fields={"name": "name", "status": "status"},
+        required=["car_code", "category_key", "name"],
+        key=["car_code", "category_key", "name"],
+        references={"car_code": "car"},
+    ),
+    CSVSchema(
+        "car_reasons.csv", CarReasonToBuy,
+        fields={"title": "title", "description": "description", "sort_order": "sort_order"},
+        required=["car_code", "title"],
+        key=["car_code", "title"],
+        references={"car_code": "car"},
+    ),
+    CSVSchema(
+        "inspection_items.csv", InspectionItem,
+        fields={"name": "name", "status": "status", "remarks": "remarks"},
+        required=["car_code", "subsection_key", "name"],
+        key=["car_code", "subsection_key", "name"],
+        references={"car_code": "car", "subsection_key": "subsection"},
+    ),
+    CSVSchema(
+        "car_inspection_scores.csv", CarInspectionSectionScore,
+        fields={"score": "score", "rating": "rating", "status": "status", "remarks": "remarks"},
+        required=["car_code", "section_key", "score", "rating"],
+        key=["car_code", "section_key"],
+        references={"car_code": "car", "section_key": "section"},
+        lower=["rating"],
+    ),
+    CSVSchema(
+        "car_subsection_remarks.csv", CarInspectionSubSectionRemarks,
+        fields={"status": "status", "remarks": "remarks"},
+        required=["car_code", "subsection_key"],
+        key=["car_code", "subsection_key"],
+        references={"car_code": "car", "subsection_key": "subsection"},
+        optional=True,
+    ),
+]
+
+
+# -------------------------
+# COLUMNS
+# -------------------------
+class Table:
+    """A CSV file as columns: {header: [cell, ...]}, rows numbered from 1."""
+
+    def __init__(self, headers, columns, rows):
+        self.headers = headers
+        self.columns = columns
+        self.rows = rows
+
+    @classmethod
+    def read(cls, f):
+        reader = csv.reader(f)
+        headers = [header.strip() for header in next(reader, [])]
+        cells = [[] for _ in headers]
+        rows = 0
+        for row in reader:
+            if not row:
+                continue  # skipped by csv.DictReader too
+            rows += 1
+            for i, values in enumerate(cells):
+                values.append(row[i] if i < len(row) else "")
+        return cls(headers, dict(zip(headers, cells)), rows)
+
+    def column(self, name):
+        return self.columns.get(name) or [""] * self.rows
+
+
+class Report:
+    def __init__(self):
+        self.files = {}
+        self.errors = []
+
+    def add_file(self, filename, rows):
+        self.files[filename] = {"rows": rows, "invalid_rows": 0}
+
+    def add(self, filename, row, column, value, code, message):
+        if value is not None and len(value) > MAX_VALUE_LENGTH:
+            value = value[:MAX_VALUE_LENGTH] + "…"
+        self.errors.append({
+            "file": filename, "row": row, "column": column, "value": value, "code": code, "message": message,
+        })
+
+    @property
+    def valid(self):
+        return not self.errors
+
+    def finish(self):
+        """Sort the errors by file and row, count the invalid rows per file."""
+        order = {filename: i for i, filename in enumerate(self.files)}
+        self.errors.sort(key=lambda e: (order.get(e["file"], len(order)), e["row"] or 0))
+        invalid = Counter()
+        for filename, row in {(e["file"], e["row"]) for e in self.errors if e["row"]}:
+            invalid[filename] += 1
+        for filename, summary in self.files.items():
+            summary["invalid_rows"] = invalid[filename]
+        return self
+
+    def as_dict(self, limit=None):
+        """JSON-ready report, with the first `limit` errors if given."""
+        errors = self.errors if limit is None else self.errors[:limit]
+        return {"valid": self.valid, "files": self.files, "error_count": len(self.errors), "errors": errors}
+
+
+# -------------------------
+# RULES
+# -------------------------
+def _field_error(field, value):
+    """(code, message) when the parser / DB would reject a non-empty value."""
+    if isinstance(field, models.IntegerField):
+        try:
+            number = int(value)
+        except ValueError:
+            return "integer", "not an integer"
+        if number < 0 and isinstance(field, POSITIVE_INTEGER_FIELDS):
+            return "integer", "must not be negative"
+    elif isinstance(field, models.DecimalField):
+        try:
+            number = Decimal(value)
+        except InvalidOperation:
+            return "decimal", "not a number"
+        if not number.is_finite() or abs(number) >= 10 ** (field.max_digits - field.decimal_places):
+            return "decimal", f"out of range ({field.max_digits} digits, {field.decimal_places} decimals)"
+    elif isinstance(field, models.DateField):
+        try:
+            if not ISO_DATE.match(value):
+                raise ValueError
+            date.fromisoformat(value)
+        except ValueError:
+            return "date", "not a YYYY-MM-DD date"
+    if field.choices:
+        allowed = [choice for choice, _ in field.choices]
+        if value not in allowed:
+            return "choice", f"not one of {', '.join(allowed)}"
+    if field.max_length and len(value) > field.max_length:
+        return "too_long", f"longer than {field.max_length} characters"
+    return None
+
+
+def _literal_error(expected, value):
+    try:
+        parsed = ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return "literal", "not a Python literal"
+    if not isinstance(parsed, expected):
+        return "literal", f"not a {expected.__name__}"
+    return None
+
+
+def _check_error(check, value):
+    message = check(value)
+    return ("format", message) if message else None
+
+
+def _empty_error(field):
+    """(code, message) for an empty value of a field the parser has no default for."""
+    if field.choices and not field.blank and not field.has_default():
+        return "choice", f"not one of {', '.join(choice for choice, _ in field.choices)}"
+    return None
+
+
+def check_column(report, schema, table, column, rule):
+    """Report the rows whose value fails rule(value) -> (code, message) | None, checked once per value."""
+    values = table.column(column)
+    failed = {}
+    for value in set(values):
+        error = rule(value)
+        if error:
+            failed[value] = error
+    if not failed:
+        return
+    for number, value in enumerate(values, start=1):
+        if value in failed:
+            code, message = failed[value]
+            report.add(schema.filename, number, column, value, code, message)
+
+
+def validate_table(report, schema, table, known):
+    """Every rule of the schema over the table; `known` = {reference: set of keys}."""
+    missing = [column for column in schema.required if column not in table.columns]
+    for column in missing:
+        report.add(schema.filename, None, column, None, "missing_column", "required column missing")
+
+    for column in schema.required:
+        if column not in missing:
+            check_column(report, schema, table, column, lambda v: None if v.strip() else ("required", "empty"))
+
+    for column in table.headers:
+        field = schema.field(column)
+        if field is not None:
+            lower = column in schema.lower
+            check_column(report, schema, table, column, lambda v, field=field, lower=lower: (
+                _field_error(field, v.strip().lower() if lower else v.strip())
+                if v.strip() else _empty_error(field)
+            ))
+        if column in schema.literals:
+            expected = schema.literals[column]
+            check_column(report, schema, table, column, lambda v, expected=expected: (
+                _literal_error(expected, v) if v.strip() else None
+            ))
+        if column in schema.checks:
+            check = schema.checks[column]
+            check_column(report, schema, table, column, lambda v, check=check: _check_error(check, v))
+
+    for column, reference in schema.references.items():
+        if column in table.columns:
+            keys = known[reference]
+            check_column(report, schema, table, column, lambda v, keys=keys, reference=reference: (
+                None if not v.strip() or v.strip() in keys else ("reference", f"unknown {reference}")
+            ))
+
+    if schema.key and all(column in table.columns for column in schema.key):
+        keys = list(zip(*[[value.strip() for value in table.column(column)] for column in schema.key]))
+        counts = Counter(keys)
+        first = {}
+        for number, key in enumerate(keys, start=1):
+            if counts[key] < 2:
+                continue
+            if key in first:
+                report.add(
+                    schema.filename, number, ",".join(schema.key), " / ".join(key),
+                    "duplicate", f"same {', '.join(schema.key)} as row {first[key]}",
+                )
+            else:
+                first[key] = number
+
+
+def known_keys(references, tables):
+    """{reference: keys in the feed's file | keys in the database} of the references in use."""
+    known = {}
+    for reference in references:
+        filename, column, model, field = REFERENCES[reference]
+        keys = set(model.objects.values_list(field, flat=True))
+        if filename in tables:
+            keys.update(value.strip() for value in tables[filename].column(column))
+        known[reference] = keys
+    return known
+
+
+# -------------------------
+# ENTRY POINTS
+# -------------------------
+def validate_files(csv_dir, schemas=IMPORT_SCHEMAS):
+    """Report of the feed in `csv_dir` (the importer CSV layout)."""
+    report = Report()
+    tables = {}
+    for schema in schemas:
+        path = Path(csv_dir) / schema.filename
+        try:
+            with open(path, newline="", encoding="utf-8") as f:
+                tables[schema.filename] = Table.read(f)
+        except FileNotFoundError:
+            if not schema.optional:
+                report.add(schema.filename, None, None, None, "missing_file", f"{path} not found")
+            continue
+        report.add_file(schema.filename, tables[schema.filename].rows)
+
+    known = known_keys({ref for schema in schemas for ref in schema.references.values()}, tables)
+    for schema in schemas:
+        if schema.filename in tables:
+            validate_table(report, schema, tables[schema.filename], known)
+    return report.finish()
+
+
+def validate_file(f, schema):
+    """Report of one CSV text file `f` against `schema`."""
+    report = Report()
+    table = Table.read(f)
+    report.add_file(schema.filename, table.rows)
+    validate_table(report, schema, table, known_keys(set(schema.references.values()), {}))
+    return report.finish()
@@ -21,18 +21,37 @@
 
 
 
-import csv
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.db import transaction
+from django.urls import reverse
+from django.http import StreamingHttpResponse
 from rest_framework import generics, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from rest_framework.permissions import IsAdminUser
 
 from .models import *
 from .serializers import *
-from .filters import CarFilter 
+from .filters import CarFilter, CarOrderingFilter
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.filters import OrderingFilter
-from .pagination import CarPagination
+from .pagination import CarCursorPagination, CarPagination
+from .documents import get_car_documents, load_document
+from rest_framework.exceptions import NotFound, ValidationError
+from .conditional import ConditionalGetMixin
+from .facets import DEFAULT_BUCKETS, MAX_BUCKETS, get_facets
+from .suggest import DEFAULT_LIMIT, MAX_LIMIT, get_suggest_index
+from .columnar import ColumnarResult, evaluate, get_columns
+from .instrumentation import RequestMetricsMixin, timer
+from .export import EXPORT_FILES, JSONL_FILE, encode, iter_export
+from .uploads import MAX_STORED_ERRORS, enqueue, spool_upload, validate_upload
+from django_filters.utils import translate_validation
+from .cache import (
+    VersionedResponseCacheMixin,
+    car_version,
+    catalog_state,
+    get_cache_stats,
+    normalize_query_params,
+)
 
 
 
@@ -48,26 +67,92 @@ from .pagination import CarPagination
 # -------------------------
 # DETAIL VIEW
 # -------------------------
-class CarDetailAPIView(generics.RetrieveAPIView):
+class CarDetailAPIView(RequestMetricsMixin, ConditionalGetMixin, VersionedResponseCacheMixin, generics.RetrieveAPIView):
     queryset = Car.objects.select_related("dealer").prefetch_related(
         "images__category",
         "highlights",
         "reasons_to_buy",
         "specs__category",
         "features__category",
-        "inspection_items__subsection__section",
+        "inspection_section_scores",
+        "inspection_subsection_remarks",
+        "inspection_items",
     )
     serializer_class = CarDetailSerializer
     lookup_field = "id"
+    response_cache_name = "detail"
+    # Building a missing CarDocument prefetches every section
+    query_budget = 20
 
-class CarListAPIView(generics.ListAPIView):
-    serializer_class = CarDetailSerializer
+    def get_car_timestamps(self):
+        """(Car.updated_at, CarDocument.updated_at), one query for the ETag and the cache version."""
+        if not hasattr(self, "_car_timestamps"):
+            self._car_timestamps = (
+                Car.objects.filter(pk=self.kwargs[self.lookup_field])
+                .values_list("updated_at", "document__updated_at")
+                .first()
+            ) or (None, None)
+        return self._car_timestamps
+
+    def get_response_cache_version(self):
+        return car_version(*self.get_car_timestamps())
+
+    def get_conditional_validators(self):
+        updated_at, _ = self.get_car_timestamps()
+        if updated_at is None:
+            return None
+        return (str(self.kwargs[self.lookup_field]), updated_at.isoformat()), updated_at
+
+    def retrieve(self, request, *args, **kwargs):
+        # Served from the materialized CarDocument row (built on demand)
+        car_id = kwargs[self.lookup_field]
+        body = get_car_documents([car_id]).get(car_id)
+        if body is None:
+            raise NotFound()
+        with timer("serialize"):
+            return Response(load_document(body, request))
+
+
+# Relations fetched for each card section opted into via ?expand=
+CARD_EXPAND_PREFETCHES = {
+    "images": ["images__category"],
+    "highlights": ["highlights"],
+    "reasons_to_buy": ["reasons_to_buy"],
+    "specs": ["specs__category"],
+    "features": ["features__category"],
+    "inspections": [
+        "inspection_section_scores",
+        "inspection_subsection_remarks",
+        "inspection_items",
+    ],
+}
+
+# Columns DealerMiniSerializer reads
+DEALER_MINI_COLUMNS = [
+    "dealer__id",
+    "dealer__dealer_code",
+    "dealer__name",
+    "dealer__city",
+    "dealer__tier",
+]
+
+
+class CarListAPIView(RequestMetricsMixin, ConditionalGetMixin, VersionedResponseCacheMixin, generics.ListAPIView):
+    """
+    Listing cards.
+
+    ?fields=title,price,...   narrow the card columns
+    ?expand=images,specs,...  add nested sections (only those are prefetched)
+    ?expand=all               full CarDetailSerializer shape (from CarDocument)
+    ?cursor=... / ?pagination=cursor   keyset pages (no count, no offset)
+    """
     pagination_class = CarPagination
+    cursor_pagination_class = CarCursorPagination
 
     # 🔥 THIS ACTIVATES ALL FILTERS (INCLUDING COLOR)
     filter_backends = [
         DjangoFilterBackend,
-        OrderingFilter,
+        CarOrderingFilter,
     ]
     filterset_class = CarFilter
 
@@ -78,25 +163,242 @@ class CarListAPIView(generics.ListAPIView):
         "year",
         "km",
         "created_at",
+        "image_count",
+        "reason_count",
+        "highlight_count",
+        "inspection_score",
+        "min_section_score",
     ]
     ordering = ["-created_at"]
 
+    response_cache_name = "list"
+    # Count + page + one prefetch per expanded relation
+    query_budget = 25
+
+    def get_catalog_state(self):
+        """(catalog version, last bump), one read for the ETag and the cache version."""
+        if not hasattr(self, "_catalog_state"):
+            self._catalog_state = catalog_state()
+        return self._catalog_state
+
+    def get_response_cache_version(self):
+        return self.get_catalog_state()[0]
+
+    def get_conditional_validators(self):
+        # Any car / master write bumps the catalog version: no query over
+        # the filtered cars, so cursor pages and deep pages stay count-free
+        version, bumped_at = self.get_catalog_state()
+        return (version, normalize_query_params(self.request.query_params)), bumped_at
+
+    @property
+    def paginator(self):
+        """Page numbers for the web UI, keyset cursors when asked for."""
+        if not hasattr(self, "_paginator"):
+            params = self.request.query_params
+            if "cursor" in params or params.get("pagination") == "cursor":
+                self._paginator = self.cursor_pagination_class()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+    def filter_queryset(self, queryset):
+        result = self.get_columnar_result(queryset)
+        if result is not None:
+            return result
+        return super().filter_queryset(queryset)
+
+    def get_columnar_result(self, queryset):
+        """
+        Filtered, ordered cars from the in-process column store
+        (cars.columnar), or None when SQL has to serve the request: engine
+        disabled or stale, cursor pages, invalid or unsupported params.
+        """
+        if isinstance(self.paginator, self.cursor_pagination_class):
+            return None
+        columns = get_columns()
+        if columns is None:
+            return None
+
+        filterset = CarFilter(self.request.query_params, queryset=queryset, request=self.request)
+        if not filterset.is_valid():
+            return None
+        ordering = CarOrderingFilter().get_ordering(self.request, queryset, self)
+        return evaluate(columns, filterset.form.cleaned_data, ordering, queryset)
+
+    def get_projection(self):
+        """
+        (fields, expand) requested by the client, or (None, None) for
+        the full detail shape. Unknown names are ignored.
+        """
+        if hasattr(self, "_projection"):
+            return self._projection
+
+        params = self.request.query_params
+        requested = [
+            name.strip()
+            for name in (params.get("fields", "") + "," + params.get("expand", "")).split(",")
+            if name.strip()
+        ]
+
+        if "all" in requested:
+            self._projection = (None, None)
+        else:
+            fields = [f for f in requested if f in CAR_CARD_FIELDS]
+            expand = [e for e in requested if e in CAR_CARD_EXPANDABLE_FIELDS]
+            self._projection = (fields or list(CAR_CARD_FIELDS), expand)
+        return self._projection
+
+    def get_serializer_class(self):
+        fields, expand = self.get_projection()
+        return CarDetailSerializer if fields is None else CarCardSerializer
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["fields"], context["expand"] = self.get_projection()
+        return context
+
     def get_queryset(self):
-        return (
-            Car.objects
-            .select_related("dealer")
-            .prefetch_related(
-                "images",
-                "highlights",
-                "reasons_to_buy",
-                "specs",
-                "features",
-                "inspection_section_scores",
-                "inspection_subsection_remarks",
-                "inspection_items",
-            )
-            .distinct()
+        fields, expand = self.get_projection()
+
+        if fields is None:
+            # Full shape is rendered from CarDocument rows, see list()
+            return Car.objects.only("id")
+
+        car_columns = {f.name for f in Car._meta.concrete_fields}
+        columns = {"id"} | {f for f in fields if f in car_columns}
+        if "thumbnail_srcset" in fields:
+            columns.add("thumbnail")
+
+        qs = Car.objects.all()
+        if "dealer" in fields:
+            qs = qs.select_related("dealer")
+            columns.update(DEALER_MINI_COLUMNS)
+
+        prefetches = [p for e in expand for p in CARD_EXPAND_PREFETCHES[e]]
+
+        # CarFilter tests child rows with EXISTS only, so no DISTINCT is needed
+        return qs.only(*columns).prefetch_related(*prefetches)
+
+    def list(self, request, *args, **kwargs):
+        fields, expand = self.get_projection()
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        cars = page if page is not None else list(queryset)
+
+        documents = None
+        if fields is None:
+            # Full shape: the stored CarDocument rows, no serializer.
+            # get_car_documents() renders the missing and stale ones, so
+            # only a car deleted since the page was read has none.
+            documents = get_car_documents([car.id for car in cars])
+            cars = [car for car in cars if car.id in documents]
+        with timer("serialize"):
+            if documents is None:
+                data = self.get_serializer(cars, many=True).data
+            else:
+                data = [load_document(documents[car.id], request) for car in cars]
+
+            if page is not None:
+                return self.get_paginated_response(data)
+            return Response(data)
+
+
+# -------------------------
+# FACETS (FILTER SIDEBAR)
+# -------------------------
+class CarFacetsAPIView(RequestMetricsMixin, APIView):
+    """
+    Per-value counts and numeric histograms for the cars matching the
+    same CarFilter params as the listing. ?buckets= sets histogram size.
+    """
+    query_budget = 15
+
+    def get(self, request):
+        filterset = CarFilter(request.query_params, queryset=Car.objects.all(), request=request)
+        if not filterset.is_valid():
+            raise translate_validation(filterset.errors)
+
+        try:
+            buckets = int(request.query_params.get("buckets", DEFAULT_BUCKETS))
+        except ValueError:
+            buckets = DEFAULT_BUCKETS
+        buckets = max(1, min(buckets, MAX_BUCKETS))
+
+        return Response(get_facets(filterset.qs, request.query_params, buckets))
+
+
+# -------------------------
+# AUTOCOMPLETE
+# -------------------------
+class CarSuggestAPIView(RequestMetricsMixin, APIView):
+    """
+    ?q= prefix suggestions (brand, model, city, title, car_code) with car
+    counts, served from the in-process prefix index (no SQL per keystroke).
+    ?limit= caps each type.
+    """
+    query_budget = 5
+
+    def get(self, request):
+        try:
+            limit = int(request.query_params.get("limit", DEFAULT_LIMIT))
+        except ValueError:
+            limit = DEFAULT_LIMIT
+        limit = max(1, min(limit, MAX_LIMIT))
+
+        query = request.query_params.get("q", "")
+        return Response({
+            "query": query,
+            "suggestions": get_suggest_index().suggest(query, limit),
+        })
+
+
+# -------------------------
+# EXPORT (STREAMED)
+# -------------------------
+class CarExportAPIView(APIView):
+    """
+    Streams one export file for the cars matching the CarFilter params:
+    ?file=cars.csv (default), car_specs.csv, ... in the importers' CSV
+    layout, or catalog.jsonl (one car per line, child rows nested).
+    ?gzip=1 compresses on the fly.
+
+    Staff only: the files carry dealer phone / email and registration
+    numbers. The export_catalog command has no such restriction.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        filename = request.query_params.get("file", "cars.csv")
+        if filename not in EXPORT_FILES:
+            raise ValidationError({"file": [f"Choose one of: {', '.join(EXPORT_FILES)}"]})
+
+        filterset = CarFilter(request.query_params, queryset=Car.objects.all(), request=request)
+        if not filterset.is_valid():
+            raise translate_validation(filterset.errors)
+
+        compress = request.query_params.get("gzip") in ("1", "true")
+        content_type = "application/x-ndjson" if filename == JSONL_FILE else "text/csv; charset=utf-8"
+        download_name = filename
+        if compress:
+            download_name, content_type = filename + ".gz", "application/gzip"
+
+        response = StreamingHttpResponse(
+            encode(iter_export(filename, filterset.qs), compress),
+            content_type=content_type,
         )
+        response["Content-Disposition"] = f'attachment; filename="{download_name}"'
+        return response
+
+
+# -------------------------
+# RESPONSE CACHE STATS
+# -------------------------
+class CarCacheStatsAPIView(APIView):
+    """Hit / miss counters of the car detail and list response caches."""
+
+    def get(self, request):
+        return Response(get_cache_stats())
+
 
 # -------------------------
 # CSV IMPORT (SINGLE FILE)
@@ -105,46 +407,44 @@ class CarCSVImportAPIView(APIView):
     """
     Dealer uploads ONE CSV.
     Dealer is inferred from request.user or passed explicitly.
+
+    The file is spooled to disk and imported in the background
+    (cars/uploads.py): 202 with the job, whose progress is at Location.
+    With ?dry_run=1 (or a dry_run form field) the whole file is only
+    validated: 200 with the error report, 400 when it has errors.
     """
 
     def post(self, request):
-        file = request.FILES["file"]
-        dealer = Dealer.objects.get(id=request.data.get("dealer_id"))
+        file = request.FILES.get("file")
+        if file is None:
+            raise ValidationError({"file": "A CSV file is required."})
+        try:
+            dealer = Dealer.objects.get(id=request.data.get("dealer_id"))
+        except (Dealer.DoesNotExist, DjangoValidationError):
+            raise ValidationError({"dealer_id": "Unknown dealer."})
 
-        reader = csv.DictReader(file.read().decode("utf-8").splitlines())
+        dry_run = request.query_params.get("dry_run") or request.data.get("dry_run")
+        if str(dry_run).lower() in ("1", "true", "yes"):
+            report = validate_upload(file)
+            return Response(
+                report.as_dict(limit=MAX_STORED_ERRORS),
+                status=status.HTTP_200_OK if report.valid else status.HTTP_400_BAD_REQUEST,
+            )
 
         with transaction.atomic():
-            for row in reader:
-                car, _ = Car.objects.update_or_create(
-                    registration_number=row["registration_number"],
-                    dealer=dealer,
-                    defaults={
-                        "title": row["title"],
-                        "brand": row["brand"],
-                        "model": row["model"],
-                        "year": row["year"],
-                        "price": row["price"],
-                        "km": row["km"],
-                        "fuel": row["fuel"],
-                        "transmission": row["transmission"],
-                        "city": row["city"],
-                    }
-                )
-
-                # Highlights
-                for text in row["highlights"].split("|"):
-                    CarHighlight.objects.get_or_create(car=car, text=text.strip())
-
-                # Reasons
-                for r in row["reasons_to_buy"].split("||"):
-                    title, desc = r.split("::")
-                    CarReasonToBuy.objects.update_or_create(
-                        car=car,
-                        title=title.strip(),
-                        defaults={"description": desc.strip()}
-                    )
+            job = spool_upload(file, dealer)
+            enqueue(job)
 
         return Response(
-            {"status": "CSV imported successfully"},
-            status=status.HTTP_201_CREATED
+            CarCSVImportSerializer(job).data,
+            status=status.HTTP_202_ACCEPTED,
+            headers={"Location": reverse("csv-import", kwargs={"id": job.pk})},
         )
+
+
+class CarCSVImportStatusAPIView(generics.RetrieveAPIView):
+    """Progress, row errors and throughput of one CSV upload."""
+
+    queryset = CarCSVImport.objects.all()
+    serializer_class = CarCSVImportSerializer
+    lookup_field = "id"
@@ -1,37 +1,33 @@
 
 
-import csv
 from pathlib import Path
 from django.db import transaction
-from cars.models import Car, CarHighlight
+from cars.models import CarHighlight
+from cars.aggregates import defer_car_aggregates
+from cars.importer import ImportStep, required
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 CSV_PATH = BASE_DIR / "csv" / "car_highlights.csv"
 
 
-@transaction.atomic
-def run():
-    with open(CSV_PATH, newline="") as f:
-        reader = csv.DictReader(f)
-
-        for r in reader:
-            car_code = r.get("car_code")
-            text = r.get("text")
+def parse(r, lookups):
+    car_code, text = required(r, "car_code", "text")
+    return {"car_id": lookups.car(car_code), "text": text}
 
-            if not car_code or not text:
-                continue
 
-            try:
-                car = Car.objects.get(car_code=car_code)
-            except Car.DoesNotExist:
-                print("❌ Car not found:", car_code)
-                continue
+STEP = ImportStep(
+    "car highlights",
+    CSV_PATH,
+    CarHighlight,
+    parse,
+    unique_fields=["car", "text"],
+    key_columns=["car_code", "text"],
+)
 
-            highlight, created = CarHighlight.objects.get_or_create(
-                car=car,
-                text=text.strip()
-            )
-
-            print("🆕 Created" if created else "⏭️ Skipped", text)
 
+@transaction.atomic
+@defer_car_aggregates()
+def run(csv_dir=None, **options):
+    result = STEP.run(csv_dir=csv_dir, **options)
     print("🎉 Car highlights import completed safely")
+    return result
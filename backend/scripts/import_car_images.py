@@ -1,49 +1,48 @@
-import csv
 from pathlib import Path
-from cars.models import Car, CarImage, CarImageCategory
+from django.db import transaction
+from cars.models import CarImage, CarImageCategory
+from cars.aggregates import defer_car_aggregates
+from cars.importer import ImportStep, RowError, required
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 CSV_PATH = BASE_DIR / "csv" / "car_images.csv"
 
 
-
-def run():
-    with open(CSV_PATH, newline="") as f:
-        reader = csv.DictReader(f)
-        print("CSV columns:", reader.fieldnames)
-
-        for r in reader:
-            car_code = r.get("car_code")
-            if not car_code:
-                print("❌ Missing car_code, skipping row")
-                continue
-
-            car = Car.objects.filter(car_code=car_code).first()
-            if not car:
-                print(f"❌ Car not found for code: {car_code}")
-                continue
-
-            category_key = r.get("category_key")
-            category_label = r.get("category_label", category_key)
-
-            category, _ = CarImageCategory.objects.get_or_create(
-                key=category_key,
-                defaults={"label": category_label},
-            )
-
-            image_path = r.get("image")
-            if not image_path:
-                print("⚠️ Missing image path, skipping")
-                continue
-
-            CarImage.objects.create(
-                car=car,
-                category=category,
-                image=image_path.strip(),
-                caption=r.get("caption", ""),
-                sort_order=int(r.get("sort_order") or 0),
-            )
-
-            print(f"✅ Image added → {car_code} | {image_path}")
-
-    print("🎉 Car images import completed")
\ No newline at end of file
+def category(r):
+    category_key = required(r, "category_key")
+    return CarImageCategory, category_key, {"label": r.get("category_label") or category_key}
+
+
+def parse(r, lookups):
+    car_id = lookups.car(required(r, "car_code"))
+    image_path = (r.get("image") or "").strip()
+    if not image_path:
+        raise RowError("missing image path")
+
+    return {
+        "car_id": car_id,
+        "category_id": lookups.category(CarImageCategory, required(r, "category_key")),
+        "image": image_path,
+        "caption": r.get("caption", ""),
+        "sort_order": int(r.get("sort_order") or 0),
+    }
+
+
+# CarImage has no natural key: a car's images are replaced together
+# whenever any of its rows changes
+STEP = ImportStep(
+    "car images",
+    CSV_PATH,
+    CarImage,
+    parse,
+    categories=category,
+    replace_by=("car_code", "car"),
+)
+
+
+@transaction.atomic
+@defer_car_aggregates()
+def run(csv_dir=None, **options):
+    result = STEP.run(csv_dir=csv_dir, **options)
+    print("🎉 Car images import completed")
+    return result
@@ -1,44 +1,37 @@
-import csv
 from pathlib import Path
 from django.db import transaction
-from cars.models import Car, CarReasonToBuy
+from cars.models import CarReasonToBuy
+from cars.aggregates import defer_car_aggregates
+from cars.importer import ImportStep, required
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 CSV_PATH = BASE_DIR / "csv" / "car_reasons.csv"
 
 
-@transaction.atomic
-def run():
-    with open(CSV_PATH, newline="") as f:
-        reader = csv.DictReader(f)
-        print("CSV columns:", reader.fieldnames)
-
-        for r in reader:
-            car_code = r.get("car_code")
-            title = r.get("title")
+def parse(r, lookups):
+    car_code, title = required(r, "car_code", "title")
+    return {
+        "car_id": lookups.car(car_code),
+        "title": title,
+        "description": r.get("description", "").strip(),
+        "sort_order": int(r.get("sort_order") or 0),
+    }
 
-            if not car_code or not title:
-                print("❌ Missing required fields, skipping:", r)
-                continue
 
-            try:
-                car = Car.objects.get(car_code=car_code)
-            except Car.DoesNotExist:
-                print(f"❌ Car not found: {car_code}")
-                continue
+STEP = ImportStep(
+    "car reasons",
+    CSV_PATH,
+    CarReasonToBuy,
+    parse,
+    unique_fields=["car", "title"],
+    update_fields=["description", "sort_order"],
+    key_columns=["car_code", "title"],
+)
 
-            obj, created = CarReasonToBuy.objects.update_or_create(
-                car=car,
-                title=title.strip(),
-                defaults={
-                    "description": r.get("description", "").strip(),
-                    "sort_order": int(r.get("sort_order") or 0),
-                }
-            )
-
-            print(
-                "🆕 Created" if created else "🔄 Updated",
-                f"reason '{title}' for {car_code}"
-            )
 
+@transaction.atomic
+@defer_car_aggregates()
+def run(csv_dir=None, **options):
+    result = STEP.run(csv_dir=csv_dir, **options)
     print("🎉 Reasons import completed safely")
+    return result
@@ -1,52 +1,43 @@
-import csv
 from pathlib import Path
 from django.db import transaction
-from cars.models import Car, CarSpec, SpecCategory
+from cars.models import CarSpec, SpecCategory
+from cars.importer import ImportStep, required
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 CSV_PATH = BASE_DIR / "csv" / "car_specs.csv"
 
 
-@transaction.atomic
-def run():
-    with open(CSV_PATH, newline="") as f:
-        reader = csv.DictReader(f)
-        print("CSV columns:", reader.fieldnames)
-
-        for r in reader:
-            car_code = r.get("car_code")
-            category_key = r.get("category_key")
-            label = r.get("label")
-
-            if not car_code or not category_key or not label:
-                print("❌ Missing required fields, skipping:", r)
-                continue
-
-            try:
-                car = Car.objects.get(car_code=car_code)
-            except Car.DoesNotExist:
-                print(f"❌ Car not found: {car_code}")
-                continue
-
-            category, _ = SpecCategory.objects.get_or_create(
-                key=category_key.strip(),
-                defaults={
-                    "title": (r.get("category_title") or category_key).strip().title()
-                },
-            )
-
-            obj, created = CarSpec.objects.update_or_create(
-                car=car,
-                category=category,
-                label=label.strip(),
-                defaults={
-                    "value": (r.get("value") or "").strip()
-                }
-            )
-
-            print(
-                "🆕 Created" if created else "🔄 Updated",
-                f"spec '{label}' for {car_code}"
-            )
+def category(r):
+    category_key = required(r, "category_key")
+    return SpecCategory, category_key, {
+        "title": (r.get("category_title") or category_key).strip().title()
+    }
+
+
+def parse(r, lookups):
+    car_code, category_key, label = required(r, "car_code", "category_key", "label")
+    return {
+        "car_id": lookups.car(car_code),
+        "category_id": lookups.category(SpecCategory, category_key),
+        "label": label,
+        "value": (r.get("value") or "").strip(),
+    }
+
 
+STEP = ImportStep(
+    "car specs",
+    CSV_PATH,
+    CarSpec,
+    parse,
+    unique_fields=["car", "category", "label"],
+    update_fields=["value"],
+    categories=category,
+    key_columns=["car_code", "category_key", "label"],
+)
+
+
+@transaction.atomic
+def run(csv_dir=None, **options):
+    result = STEP.run(csv_dir=csv_dir, **options)
     print("🎉 Car specs import completed safely")
+    return result
@@ -1,52 +1,37 @@
-import csv
 from pathlib import Path
 from django.db import transaction
-from cars.models import Car, InspectionSubSection, CarInspectionSubSectionRemarks
+from cars.models import CarInspectionSubSectionRemarks
+from cars.importer import ImportStep, required
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 CSV_PATH = BASE_DIR / "csv" / "car_subsection_remarks.csv"
 
 
-@transaction.atomic
-def run():
-    # Check if CSV file exists
-    try:
-        with open(CSV_PATH, newline="") as f:
-            reader = csv.DictReader(f)
-            print("CSV columns:", reader.fieldnames)
-
-            for r in reader:
-                car_code = r.get("car_code")
-                subsection_key = r.get("subsection_key")
-                status = r.get("status", "").strip()
-                remarks = r.get("remarks", "")
+def parse(r, lookups):
+    car_code, subsection_key = required(r, "car_code", "subsection_key")
+    return {
+        "car_id": lookups.car(car_code),
+        "subsection_id": lookups.subsection(subsection_key),
+        "status": r.get("status", "").strip(),
+        "remarks": r.get("remarks", "").strip(),
+    }
 
-                if not all([car_code, subsection_key]):
-                    print("❌ Missing required fields, skipping:", r)
-                    continue
 
-                try:
-                    car = Car.objects.get(car_code=car_code)
-                    subsection = InspectionSubSection.objects.get(key=subsection_key)
-                except (Car.DoesNotExist, InspectionSubSection.DoesNotExist) as e:
-                    print(f"❌ Reference not found: {e}")
-                    continue
+# The CSV file is optional
+STEP = ImportStep(
+    "car subsection remarks",
+    CSV_PATH,
+    CarInspectionSubSectionRemarks,
+    parse,
+    unique_fields=["car", "subsection"],
+    update_fields=["status", "remarks"],
+    optional=True,
+    key_columns=["car_code", "subsection_key"],
+)
 
-                obj, created = CarInspectionSubSectionRemarks.objects.update_or_create(
-                    car=car,
-                    subsection=subsection,
-                    defaults={
-                        "status": status if status else "",
-                        "remarks": remarks.strip(),
-                    }
-                )
 
-                print(
-                    "🆕 Created" if created else "🔄 Updated",
-                    f"remarks for {car_code} - {subsection_key}"
-                )
-
-        print("🎉 Car inspection subsection remarks import completed safely")
-    except FileNotFoundError:
-        print(f"⚠️  CSV file not found: {CSV_PATH}")
-        print("   Skipping subsection remarks import (optional)")
+@transaction.atomic
+def run(csv_dir=None, **options):
+    result = STEP.run(csv_dir=csv_dir, **options)
+    print("🎉 Car inspection subsection remarks import completed safely")
+    return result
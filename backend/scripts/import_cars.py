@@ -1,8 +1,9 @@
-import csv
 import ast
 from datetime import datetime
+from decimal import Decimal
 from pathlib import Path
-from cars.models import Car, Dealer
+from cars.models import Car
+from cars.importer import ImportStep, required
 
 
 # Resolve project base directory safely
@@ -19,67 +20,66 @@ def parse_date(value):
         return None
 
 
-def run():
-    with open(CSV_PATH, newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-
-        for row_num, r in enumerate(reader, start=1):
-            try:
-                # 🔹 Dealer mapping
-                dealer = Dealer.objects.get(dealer_code=r["dealer_code"])
-
-                car, created = Car.objects.update_or_create(
-                    car_code=r["car_code"],
-                    defaults={
-                        "dealer": dealer,
-
-                        # --- Core info ---
-                        "title": r["title"],
-                        "brand": r.get("brand", ""),
-                        "model": r.get("model", ""),
-                        "year": int(r["year"]) if r.get("year") else None,
-
-                        # --- Pricing ---
-                        "price": float(r["price"]) if r.get("price") else 0,
-                        "discount_price": float(r["discount_price"]) if r.get("discount_price") else None,
-
-                        "emi": r.get("emi", "").strip(),
-
-                        # --- Usage ---
-                        "km": int(r["km"]) if r.get("km") else None,
-                        "owner_count": int(r.get("owner_count", 1)),
-
-                        # --- Status ---
-                        "availability_status": r.get("availability_status", "available"),
-
-                        # --- Insurance ---
-                        "insurance_type": r.get("insurance_type", ""),
-                        "insurance_valid_till": parse_date(r.get("insurance_valid_till")),
-
-                        # --- Vehicle details ---
-                        "fuel": r.get("fuel", ""),
-                        "transmission": r.get("transmission", ""),
-                        "body": r.get("body", ""),
-                        "seats": int(r.get("seats")) if r.get("seats") else None,
-                        "city": r.get("city", ""),
-                        "rto": r.get("rto", ""),
-                        "colorKey": r.get("colorKey", ""),
-                        "registration_number": r.get("registration_number", ""),
-
-                        # --- JSON fields (SAFE parsing) ---
-                        "tags": ast.literal_eval(r.get("tags", "[]")),
-                        "metadata": ast.literal_eval(r.get("metadata", "{}")),
-                    }
-                )
-
-                print(
-                    f"✅ Row {row_num}:",
-                    "Created" if created else "Updated",
-                    car.car_code
-                )
-
-            except Dealer.DoesNotExist:
-                print(f"❌ Row {row_num}: Dealer not found → {r.get('dealer_code')}")
-
-            except Exception as e:
-                print(f"❌ Row {row_num}: Error importing car {r.get('car_code')} → {e}")
+def parse(r, lookups):
+    return {
+        "car_code": required(r, "car_code"),
+        # 🔹 Dealer mapping
+        "dealer_id": lookups.dealer(r.get("dealer_code")),
+
+        # --- Core info ---
+        "title": r["title"],
+        "brand": r.get("brand", ""),
+        "model": r.get("model", ""),
+        "year": int(r["year"]) if r.get("year") else None,
+
+        # --- Pricing ---
+        "price": Decimal(r["price"]) if r.get("price") else 0,
+        "discount_price": Decimal(r["discount_price"]) if r.get("discount_price") else None,
+
+        "emi": r.get("emi", "").strip(),
+
+        # --- Usage ---
+        "km": int(r["km"]) if r.get("km") else None,
+        "owner_count": int(r.get("owner_count") or 1),
+
+        # --- Status ---
+        "availability_status": r.get("availability_status", "available"),
+
+        # --- Insurance ---
+        "insurance_type": r.get("insurance_type", ""),
+        "insurance_valid_till": parse_date(r.get("insurance_valid_till")),
+
+        # --- Vehicle details ---
+        "fuel": r.get("fuel", ""),
+        "transmission": r.get("transmission", ""),
+        "body": r.get("body", ""),
+        "seats": int(r.get("seats")) if r.get("seats") else None,
+        "city": r.get("city", ""),
+        "rto": r.get("rto", ""),
+        "colorKey": r.get("colorKey", ""),
+        "registration_number": r.get("registration_number", ""),
+
+        # --- JSON fields (SAFE parsing) ---
+        "tags": ast.literal_eval(r.get("tags") or "[]"),
+        "metadata": ast.literal_eval(r.get("metadata") or "{}"),
+    }
+
+
+STEP = ImportStep(
+    "cars",
+    CSV_PATH,
+    Car,
+    parse,
+    unique_fields=["car_code"],
+    update_fields=[
+        "dealer", "title", "brand", "model", "year", "price", "discount_price", "emi",
+        "km", "owner_count", "availability_status", "insurance_type", "insurance_valid_till",
+        "fuel", "transmission", "body", "seats", "city", "rto", "colorKey",
+        "registration_number", "tags", "metadata",
+    ],
+    key_columns=["car_code"],
+)
+
+
+def run(csv_dir=None, **options):
+    return STEP.run(csv_dir=csv_dir, **options)
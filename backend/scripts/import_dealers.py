@@ -1,28 +1,32 @@
-import csv
+import ast
 from pathlib import Path
 from cars.models import Dealer
+from cars.importer import ImportStep, required
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 CSV_PATH = BASE_DIR / "csv" / "dealers.csv"
 
-def run():
-    with open(CSV_PATH, newline="") as f:
-        reader = csv.DictReader(f)
 
-        for row in reader:
-            Dealer.objects.get_or_create(
-                dealer_code=row["dealer_code"],
-                defaults={
-                    "name": row["name"],
-                    "phone": row.get("phone", ""),
-                    "email": row.get("email", ""),
-                    "address": row.get("address", ""),
-                    "city": row.get("city", ""),
-                    "state": row.get("state", ""),
-                    "postal_code": row.get("postal_code", ""),
-                    "tier": row.get("tier", "standard"),
-                    "tags": eval(row.get("tags", "[]")),
-                },
-            )
+def parse(row, lookups):
+    return {
+        "dealer_code": required(row, "dealer_code"),
+        "name": row["name"],
+        "phone": row.get("phone", ""),
+        "email": row.get("email", ""),
+        "address": row.get("address", ""),
+        "city": row.get("city", ""),
+        "state": row.get("state", ""),
+        "postal_code": row.get("postal_code", ""),
+        "tier": row.get("tier", "standard"),
+        "tags": ast.literal_eval(row.get("tags") or "[]"),
+    }
 
-    print("✅ Dealers imported")
\ No newline at end of file
+
+# Existing dealers are left as they are
+STEP = ImportStep("dealers", CSV_PATH, Dealer, parse, unique_fields=["dealer_code"], key_columns=["dealer_code"])
+
+
+def run(csv_dir=None, **options):
+    result = STEP.run(csv_dir=csv_dir, **options)
+    print("✅ Dealers imported")
+    return result
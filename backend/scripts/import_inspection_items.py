@@ -1,44 +1,38 @@
-import csv
 from django.db import transaction
-from cars.models import Car, InspectionSubSection, InspectionItem
+from cars.models import InspectionItem
+from cars.aggregates import defer_car_aggregates
+from cars.importer import ImportStep, required
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 CSV_PATH = BASE_DIR / "csv" / "inspection_items.csv"
 
 
-@transaction.atomic
-def run():
-    with open(CSV_PATH, newline="") as f:
-        reader = csv.DictReader(f)
-        print("CSV columns:", reader.fieldnames)
-
-        for r in reader:
-            car_code = r.get("car_code")
-            subsection_key = r.get("subsection_key")
-            name = r.get("name")
+def parse(r, lookups):
+    car_code, subsection_key, name = required(r, "car_code", "subsection_key", "name")
+    return {
+        "car_id": lookups.car(car_code),
+        "subsection_id": lookups.subsection(subsection_key),
+        "name": name,
+        "status": r.get("status", "pending"),
+        "remarks": r.get("remarks", ""),
+    }
 
-            if not all([car_code, subsection_key, name]):
-                print("❌ Missing required fields, skipping:", r)
-                continue
 
-            try:
-                car = Car.objects.get(car_code=car_code)
-                subsection = InspectionSubSection.objects.get(key=subsection_key)
-            except (Car.DoesNotExist, InspectionSubSection.DoesNotExist) as e:
-                print("❌ Reference not found:", e)
-                continue
+STEP = ImportStep(
+    "inspection items",
+    CSV_PATH,
+    InspectionItem,
+    parse,
+    unique_fields=["car", "subsection", "name"],
+    update_fields=["status", "remarks"],
+    key_columns=["car_code", "subsection_key", "name"],
+)
 
-            obj, created = InspectionItem.objects.update_or_create(
-                car=car,
-                subsection=subsection,
-                name=name,
-                defaults={
-                    "status": r.get("status", "pending"),
-                    "remarks": r.get("remarks", ""),
-                }
-            )
-
-            print("🆕 Created" if created else "🔄 Updated", name)
 
+@transaction.atomic
+@defer_car_aggregates()
+def run(csv_dir=None, **options):
+    result = STEP.run(csv_dir=csv_dir, **options)
     print("🎉 Inspection items import completed safely")
+    return result
@@ -1,5 +1,5 @@
-import csv
 from cars.models import InspectionSection, InspectionSubSection
+from cars.importer import ImportStep, required
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -7,44 +7,48 @@ CSV_SECTIONS = BASE_DIR / "csv" / "inspection_sections.csv"
 CSV_SUBSECTIONS = BASE_DIR / "csv" / "inspection_subsections.csv"
 
 
-def run():
-    with open(CSV_SECTIONS, newline="") as f:
-        for r in csv.DictReader(f):
-            section, created = InspectionSection.objects.get_or_create(
-                key=r["key"], 
-                defaults={
-                    "title": r["title"],
-                    "description": r.get("description", ""),
-                }
-            )
-            # Update description if section already exists
-            if not created:
-                section.description = r.get("description", "")
-                section.title = r["title"]
-                section.save()
-
-    with open(CSV_SUBSECTIONS, newline="") as f:
-        for r in csv.DictReader(f):
-            if not r.get("section_key") or not r.get("key"):
-                continue
-            try:
-                section = InspectionSection.objects.get(key=r["section_key"])
-                subsection, created = InspectionSubSection.objects.get_or_create(
-                    section=section,
-                    key=r["key"],
-                    defaults={
-                        "title": r["title"],
-                        "order": int(r.get("order", 0)),
-                        "remarks": r.get("remarks", ""),
-                    },
-                )
-                # Update order if subsection already exists
-                if not created:
-                    subsection.title = r["title"]
-                    subsection.order = int(r.get("order", 0))
-                    subsection.remarks = r.get("remarks", "")
-                    subsection.save()
-            except InspectionSection.DoesNotExist:
-                print(f"❌ Section not found: {r['section_key']}")
-
-    print("✅ Inspection sections imported")
\ No newline at end of file
+def parse_section(r, lookups):
+    return {
+        "key": required(r, "key"),
+        "title": r["title"],
+        "description": r.get("description", ""),
+    }
+
+
+def parse_subsection(r, lookups):
+    section_key, key = required(r, "section_key", "key")
+    return {
+        "section_id": lookups.section(section_key),
+        "key": key,
+        "title": r["title"],
+        "order": int(r.get("order") or 0),
+        "remarks": r.get("remarks", ""),
+    }
+
+
+SECTIONS = ImportStep(
+    "inspection sections",
+    CSV_SECTIONS,
+    InspectionSection,
+    parse_section,
+    unique_fields=["key"],
+    update_fields=["title", "description"],
+    key_columns=["key"],
+)
+
+# (section, key) has no unique constraint: existing rows are matched first
+SUBSECTIONS = ImportStep(
+    "inspection subsections",
+    CSV_SUBSECTIONS,
+    InspectionSubSection,
+    parse_subsection,
+    unique_fields=["section", "key"],
+    update_fields=["title", "order", "remarks"],
+    key_columns=["section_key", "key"],
+)
+
+
+def run(csv_dir=None, **options):
+    results = [SECTIONS.run(csv_dir=csv_dir, **options), SUBSECTIONS.run(csv_dir=csv_dir, **options)]
+    print("✅ Inspection sections imported")
+    return results